@@ -0,0 +1,43 @@
+# Generated by Django 5.2 on 2026-10-18 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coffee', '0018_remove_coffeeproduct_embed_video_url_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='coffeecategory',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='coffeecategory',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='coffeecategory',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='coffeeproduct',
+            name='images_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='coffeeproduct',
+            name='images_placeholder',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='coffeeproduct',
+            name='images_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
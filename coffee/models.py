@@ -75,6 +75,9 @@ class CoffeeProduct(models.Model):
     ]
     name = models.CharField(max_length=100)
     images = models.ImageField(upload_to="products/")
+    images_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    images_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    images_placeholder = models.TextField(blank=True, editable=False)
     coffee_bean = models.ForeignKey(CoffeeBean, on_delete=models.CASCADE)
     roast_level = models.ForeignKey(RoastLevel, on_delete=models.CASCADE)
     grind_type = models.CharField(max_length=20, choices=GRIND_CHOICES)
@@ -183,6 +186,9 @@ class CoffeeCategory(models.Model):
     slug = models.SlugField(max_length=60, unique=True, blank=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to="categories/", blank=True, null=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
 
     # class Meta:
     #     verbose_name = 'ໝວດໝູ່ກາເຟ'
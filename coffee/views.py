@@ -1,11 +1,13 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.http import JsonResponse
 from django.core.paginator import Paginator
-from django.db.models import Q, Avg, Count, Min, Max
+from django.db.models import Q, Avg, Count, Min, Max, FloatField
+from django.db.models.functions import Coalesce
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from .models import CoffeeProduct, CoffeeBean, RoastLevel, CoffeeCategory, CoffeeReview
+from home.pagination import paginate
 import json
 from django.utils.safestring import mark_safe
 
@@ -62,53 +64,36 @@ def coffee_list_view(request):
         .annotate(avg_rating=Avg("reviews__rating"), review_count=Count("reviews"))
     )
 
-    initial_count = coffees.count()
-    print(f"Initial product count: {initial_count}")
-
-    # Apply filters one by one with debug info
+    # Apply filters; invalid numbers are ignored
     if category:
         try:
-            category_id = int(category)
-            coffees = coffees.filter(categories__id=category_id)
-            print(f"After category filter ({category_id}): {coffees.count()} products")
+            coffees = coffees.filter(categories__id=int(category))
         except (ValueError, TypeError):
-            print(f"Invalid category ID: {category}")
+            pass
 
     if roast_level:
         try:
-            roast_id = int(roast_level)
-            coffees = coffees.filter(roast_level__id=roast_id)
-            print(f"After roast filter ({roast_id}): {coffees.count()} products")
+            coffees = coffees.filter(roast_level__id=int(roast_level))
         except (ValueError, TypeError):
-            print(f"Invalid roast level ID: {roast_level}")
+            pass
 
     if bean_type:
         coffees = coffees.filter(coffee_bean__origin=bean_type)
-        print(f"After bean type filter ({bean_type}): {coffees.count()} products")
 
     if grind_type:
         coffees = coffees.filter(grind_type=grind_type)
-        print(f"After grind type filter ({grind_type}): {coffees.count()} products")
 
     if min_price:
         try:
-            min_price_val = float(min_price)
-            coffees = coffees.filter(price__gte=min_price_val)
-            print(
-                f"After min price filter ({min_price_val}): {coffees.count()} products"
-            )
+            coffees = coffees.filter(price__gte=float(min_price))
         except (ValueError, TypeError):
-            print(f"Invalid min price: {min_price}")
+            pass
 
     if max_price:
         try:
-            max_price_val = float(max_price)
-            coffees = coffees.filter(price__lte=max_price_val)
-            print(
-                f"After max price filter ({max_price_val}): {coffees.count()} products"
-            )
+            coffees = coffees.filter(price__lte=float(max_price))
         except (ValueError, TypeError):
-            print(f"Invalid max price: {max_price}")
+            pass
 
     if search:
         coffees = coffees.filter(
@@ -117,36 +102,31 @@ def coffee_list_view(request):
             | Q(description__icontains=search)
             | Q(coffee_bean__flavor_notes__icontains=search)
         )
-        print(f"After search filter ('{search}'): {coffees.count()} products")
 
-    # Apply sorting
+    # Apply sorting; every order ends with the id so cursor pages are stable
     sort_options = {
-        "name": "name",
-        "price_low": "price",
-        "price_high": "-price",
-        "newest": "-created_at",
-        "rating": "-avg_rating",
+        "name": ("name", "id"),
+        "price_low": ("price", "id"),
+        "price_high": ("-price", "id"),
+        "newest": ("-created_at", "id"),
+        "rating": ("-rating_order", "-review_count", "name", "id"),
     }
 
     if sort_by in sort_options:
+        sort_keys = sort_options[sort_by]
         if sort_by == "rating":
-            coffees = coffees.order_by("-avg_rating", "-review_count", "name")
-        else:
-            coffees = coffees.order_by(sort_options[sort_by])
-        print(f"Applied sorting: {sort_by}")
+            # Unrated coffees sort last, and cursors need a non-null key
+            coffees = coffees.annotate(
+                rating_order=Coalesce("avg_rating", 0.0, output_field=FloatField())
+            )
     else:
-        coffees = coffees.order_by("name")
-        print(f"Applied default sorting: name")
+        sort_keys = sort_options["name"]
 
     # Remove duplicates (in case of multiple categories per product)
     coffees = coffees.distinct()
-    final_count = coffees.count()
-    print(f"Final product count after distinct(): {final_count}")
 
-    # Pagination
-    paginator = Paginator(coffees, 6)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Pagination, numbered or by cursor
+    page_obj = paginate(request, coffees, sort_keys, 6)
 
     # Get filter options
     categories = CoffeeCategory.objects.all().order_by("name")
@@ -46,6 +46,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "home.middleware.VisitorCounterMiddleware",
+    "home.middleware.PageViewLogMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -110,4 +111,53 @@ STATICFILES_DIRS = [
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
-DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
\ No newline at end of file
+DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Cache (file based so every gunicorn worker sees the same entries)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.getenv("CACHE_LOCATION", BASE_DIR / ".django_cache"),
+    }
+}
+
+# Seconds a rendered home page stays cached; signals drop it earlier on edits
+HOME_PAGE_CACHE_TIMEOUT = 60 * 15
+
+# Seconds between writes of buffered visitor counts to the database
+VISITOR_COUNT_FLUSH_INTERVAL = 30
+# Seconds the footer visitor count may be served from the cache
+VISITOR_COUNT_CACHE_TIMEOUT = 60
+
+# Append-only page view log, rolled up by the rollup_page_views command
+PAGE_VIEW_LOG_DIR = os.getenv("PAGE_VIEW_LOG_DIR", BASE_DIR / "logs" / "pageviews")
+# Buffered page views are appended when either limit is reached
+PAGE_VIEW_BUFFER_SIZE = 200
+PAGE_VIEW_FLUSH_INTERVAL = 10
+
+# Widths (px) of the resized copies made of every uploaded image, ascending
+RESPONSIVE_IMAGE_WIDTHS = (320, 640, 960, 1280, 1920)
+
+# Per night charges added to every stay quote by hotel.rates
+HOTEL_SERVICE_FEE_PER_NIGHT = 15
+HOTEL_TAX_PER_NIGHT = 12
+# Days ahead (from January 1st of the current year) covered by the rate table
+HOTEL_RATE_HORIZON_DAYS = 365 * 3
+# Longest stay, in nights, that can be quoted or booked; stay dates must also
+# lie within HOTEL_RATE_HORIZON_DAYS of today
+HOTEL_MAX_STAY_NIGHTS = 90
+
+# Seconds a review API response stays cached; review changes replace it earlier
+REVIEW_API_CACHE_TIMEOUT = 60 * 10
+# Most reviews one review API call returns, the rest are reached by cursor
+REVIEW_API_MAX_LIMIT = 50
+
+# Pre-rendered rating widget files (hotel.widget), served by nginx from the media volume
+RATING_WIDGET_DIR = MEDIA_ROOT / "widgets"
+RATING_WIDGET_URL = f"{MEDIA_URL}widgets/"
+
+# Error reports of CSV review imports (hotel.review_import), downloadable by staff
+REVIEW_IMPORT_REPORT_DIR = os.getenv("REVIEW_IMPORT_REPORT_DIR", BASE_DIR / "logs" / "review-imports")
+
+# Platform review exports picked up by the sync_reviews command, one directory per platform
+REVIEW_SYNC_DIR = os.getenv("REVIEW_SYNC_DIR", BASE_DIR / "review-exports")
@@ -0,0 +1,27 @@
+# config/settings/test.py
+
+import atexit
+import shutil
+import tempfile
+from pathlib import Path
+
+from .dev import *
+
+# Tests get their own process-local cache, so counters, version stamps and
+# cached responses neither touch the project's .django_cache nor carry over
+# from one run to the next
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Files written by tests (uploads, image derivatives, widgets, page view logs,
+# import reports) go to a scratch directory instead of the checkout
+TEST_FILES_DIR = Path(tempfile.mkdtemp(prefix="pilgrims-tests-"))
+atexit.register(shutil.rmtree, TEST_FILES_DIR, ignore_errors=True)
+MEDIA_ROOT = TEST_FILES_DIR / "media"
+RATING_WIDGET_DIR = MEDIA_ROOT / "widgets"
+PAGE_VIEW_LOG_DIR = TEST_FILES_DIR / "pageviews"
+REVIEW_IMPORT_REPORT_DIR = TEST_FILES_DIR / "review-imports"
+REVIEW_SYNC_DIR = TEST_FILES_DIR / "review-exports"
@@ -1,4 +1,5 @@
 python manage.py makemigrations --no-input
 python manage.py migrate --no-input
+python manage.py publish_rating_widget
 
 gunicorn config.wsgi.application --bind 0.0.0.0:8000
\ No newline at end of file
@@ -25,6 +25,9 @@ class GalleryCategory(models.Model):
 class GalleryImage(models.Model):
     category = models.ForeignKey(GalleryCategory, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='gallery/')
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     title = models.CharField(max_length=200, blank=True, help_text="Title in English")
     title_lo = models.CharField(max_length=200, blank=True, help_text="Title in Lao")
     description = models.TextField(blank=True, help_text="Description in English")
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import HeroSlide, VisitorCount
+from .models import HeroSlide, VisitorCount, PageViewHourly, PageViewDaily
 
 
 # Register your models here.
@@ -34,3 +34,27 @@ class VisitorCountAdmin(admin.ModelAdmin):
         return False
     
 
+
+
+@admin.register(PageViewDaily)
+class PageViewDailyAdmin(admin.ModelAdmin):
+    list_display = ("date", "path", "language", "referrer", "views")
+    list_filter = ("language", "date")
+    search_fields = ("path", "referrer")
+    date_hierarchy = "date"
+
+    def has_add_permission(self, request):
+        """Rows are created by the rollup_page_views command"""
+        return False
+
+
+@admin.register(PageViewHourly)
+class PageViewHourlyAdmin(admin.ModelAdmin):
+    list_display = ("period_start", "path", "language", "referrer", "views")
+    list_filter = ("language",)
+    search_fields = ("path", "referrer")
+    date_hierarchy = "period_start"
+
+    def has_add_permission(self, request):
+        """Rows are created by the rollup_page_views command"""
+        return False
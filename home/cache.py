@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+# Must match the fragment names used by {% cache %} in templates/index.html
+HOME_PAGE_FRAGMENT = "home_page"
+HOME_PAGE_PRELOAD_FRAGMENT = "home_page_preload"
+
+
+def home_page_cache_keys():
+    """Cache keys of the rendered home page fragments, one per site language"""
+    return [
+        make_template_fragment_key(fragment, [language_code])
+        for fragment in (HOME_PAGE_FRAGMENT, HOME_PAGE_PRELOAD_FRAGMENT)
+        for language_code, _name in settings.LANGUAGES
+    ]
+
+
+def invalidate_home_page():
+    """Drop the cached home page for every language"""
+    cache.delete_many(home_page_cache_keys())
@@ -1,10 +1,11 @@
-from .models import VisitorCount
+from .visitors import get_visitor_count
 
 
 def visitor_count(request):
     """
     Context processor to make visitor count available in all templates.
+    The count is cached and refreshed whenever buffered visits are flushed.
     """
     return {
-        'visitor_count': VisitorCount.get_count()
+        'visitor_count': get_visitor_count()
     }
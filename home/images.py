@@ -0,0 +1,243 @@
+"""
+Responsive image derivatives.
+
+Every uploaded ImageField file gets resized copies next to it in a
+``_responsive`` folder, one per width in ``RESPONSIVE_IMAGE_WIDTHS`` and
+per format (WebP plus a JPEG or PNG fallback). Names are derived from the
+original file name, extension included (``photo.jpg-480w.webp``), so
+templates can build ``srcset`` without a lookup and ``photo.jpg`` and
+``photo.png`` never share derivatives. Derivatives are deleted along with
+a replaced or deleted image.
+
+Models may also store the intrinsic size and a tiny blurred placeholder of
+an image in ``<field>_width``, ``<field>_height`` and ``<field>_placeholder``
+so templates can reserve its space and paint something before it loads.
+"""
+import base64
+import os
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.base import ContentFile
+from django.db import models
+from PIL import Image, ImageOps
+
+DERIVATIVE_DIR = "_responsive"
+WEBP = "webp"
+PLACEHOLDER_SIZE = 16
+
+# Originals in these formats may carry transparency, so fall back to PNG
+TRANSPARENT_EXTENSIONS = {".png", ".gif", ".webp"}
+
+SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+    "png": {"format": "PNG", "optimize": True},
+}
+
+# Names already confirmed to have derivatives, so templates stat them once
+_ready = set()
+
+
+def image_fields():
+    """(model, field name) for every ImageField of the installed apps"""
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.ImageField):
+                yield model, field.name
+
+
+def metadata_field_names(field_name):
+    return f"{field_name}_width", f"{field_name}_height", f"{field_name}_placeholder"
+
+
+def has_metadata_fields(model, field_name):
+    """Whether ``model`` stores size and placeholder for ``field_name``"""
+    try:
+        for name in metadata_field_names(field_name):
+            model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def image_metadata(fieldfile):
+    """(width, height, placeholder) stored for an ImageField file, or Nones"""
+    if not fieldfile or not has_metadata_fields(type(fieldfile.instance), fieldfile.field.name):
+        return None, None, ""
+    return tuple(
+        getattr(fieldfile.instance, name)
+        for name in metadata_field_names(fieldfile.field.name)
+    )
+
+
+def fallback_extension(name):
+    extension = posixpath.splitext(name)[1].lower()
+    return "png" if extension in TRANSPARENT_EXTENSIONS else "jpg"
+
+
+def derivative_name(name, width, extension):
+    """Storage name of the ``width`` pixel wide copy of ``name``"""
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, DERIVATIVE_DIR, f"{filename}-{width}w.{extension}")
+
+
+def derivative_names(name):
+    """Every derivative name of ``name``"""
+    extensions = (WEBP, fallback_extension(name))
+    return [
+        derivative_name(name, width, extension)
+        for width in settings.RESPONSIVE_IMAGE_WIDTHS
+        for extension in extensions
+    ]
+
+
+def has_derivatives(fieldfile):
+    """Whether derivatives of ``fieldfile`` exist (the largest one is checked)"""
+    if fieldfile.name in _ready:
+        return True
+    largest = derivative_name(
+        fieldfile.name,
+        settings.RESPONSIVE_IMAGE_WIDTHS[-1],
+        fallback_extension(fieldfile.name),
+    )
+    if fieldfile.storage.exists(largest):
+        _ready.add(fieldfile.name)
+        return True
+    return False
+
+
+def render_derivatives(source, name):
+    """
+    Resize the image in ``source`` (a path or file object) for every width.
+    Yields (derivative name, encoded bytes). Images are never upscaled, so
+    widths above the original width hold the original size.
+    """
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        fallback = fallback_extension(name)
+        if fallback == "jpg":
+            original = original.convert("RGB")
+        elif original.mode not in ("RGB", "RGBA"):
+            original = original.convert("RGBA")
+
+        for width in settings.RESPONSIVE_IMAGE_WIDTHS:
+            resized = original.copy()
+            resized.thumbnail((width, resized.height), Image.LANCZOS)
+            for extension in (WEBP, fallback):
+                buffer = BytesIO()
+                resized.save(buffer, **SAVE_OPTIONS[extension])
+                yield derivative_name(name, width, extension), buffer.getvalue()
+
+
+def read_metadata(source):
+    """
+    Width and height (after EXIF rotation) of the image in ``source`` and a
+    tiny WebP version of it as a data URI for use as a blurred placeholder.
+    """
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        width, height = original.size
+        tiny = original.convert("RGB")
+        tiny.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        buffer = BytesIO()
+        tiny.save(buffer, format="WEBP", quality=40)
+    placeholder = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+    return width, height, placeholder
+
+
+def store_metadata(instance, field_name, metadata=None):
+    """Save size and placeholder of an image field without calling save()"""
+    fieldfile = getattr(instance, field_name)
+    if metadata is None:
+        if fieldfile:
+            with fieldfile.storage.open(fieldfile.name, "rb") as source:
+                metadata = read_metadata(source)
+        else:
+            metadata = (None, None, "")
+    values = dict(zip(metadata_field_names(field_name), metadata))
+    for name, value in values.items():
+        setattr(instance, name, value)
+    type(instance)._default_manager.filter(pk=instance.pk).update(**values)
+
+
+def generate_derivatives(fieldfile, force=False):
+    """
+    Write the derivatives of an ImageField file to its storage.
+    Returns the number of files written.
+    """
+    if not fieldfile:
+        return 0
+    if not force and has_derivatives(fieldfile):
+        return 0
+
+    storage = fieldfile.storage
+    written = 0
+    with storage.open(fieldfile.name, "rb") as source:
+        for name, content in render_derivatives(source, fieldfile.name):
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(content))
+            written += 1
+    _ready.add(fieldfile.name)
+    return written
+
+
+def delete_derivatives(storage, name):
+    """Delete the derivatives of the image ``name``, returns the number deleted"""
+    _ready.discard(name)
+    deleted = 0
+    for derivative in derivative_names(name):
+        if storage.exists(derivative):
+            storage.delete(derivative)
+            deleted += 1
+    return deleted
+
+
+def local_derivatives_current(path):
+    """Whether every derivative of a local file exists and is newer than it"""
+    source_mtime = os.path.getmtime(path)
+    for name in derivative_names(path):
+        try:
+            if os.path.getmtime(name) < source_mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def write_local_derivatives(path, force=False):
+    """
+    Create the derivatives of an image file on the local filesystem unless
+    they are all present and newer than the file. Safe to run in a worker
+    process. Returns (path, files written, bytes read, error message).
+    """
+    try:
+        if not force and local_derivatives_current(path):
+            return path, 0, 0, None
+        written = 0
+        for name, content in render_derivatives(path, path):
+            os.makedirs(os.path.dirname(name), exist_ok=True)
+            # Write then rename so an interrupted run never leaves a partial file
+            temporary = f"{name}.part"
+            with open(temporary, "wb") as output:
+                output.write(content)
+            os.replace(temporary, name)
+            written += 1
+        return path, written, os.path.getsize(path), None
+    except Exception as error:
+        return path, 0, 0, f"{type(error).__name__}: {error}"
+
+
+def read_local_metadata(path):
+    """
+    read_metadata() for a local file that never raises, for worker processes.
+    Returns (path, metadata, error message).
+    """
+    try:
+        return path, read_metadata(path), None
+    except Exception as error:
+        return path, None, f"{type(error).__name__}: {error}"
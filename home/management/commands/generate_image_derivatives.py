@@ -0,0 +1,139 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.images import (
+    has_metadata_fields,
+    image_fields,
+    metadata_field_names,
+    read_local_metadata,
+    store_metadata,
+    write_local_derivatives,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Create missing responsive image derivatives for uploaded media '
+        'and fill in missing image sizes and placeholders'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Number of worker processes (defaults to the number of CPU cores)',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate derivatives, sizes and placeholders even when they are up to date',
+        )
+
+    def handle(self, *args, **options):
+        paths = sorted(set(self.media_paths()))
+
+        if not paths:
+            self.stdout.write('No images found')
+            return
+
+        self.stdout.write(f"Checking {len(paths):,} images with {options['workers']} workers...")
+
+        started = time.monotonic()
+        processed = skipped = files_written = bytes_read = 0
+        errors = []
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            results = executor.map(
+                write_local_derivatives,
+                paths,
+                [options['force']] * len(paths),
+                chunksize=4,
+            )
+            for done, (path, written, size, error) in enumerate(results, start=1):
+                if error:
+                    errors.append((path, error))
+                elif written:
+                    processed += 1
+                    files_written += written
+                    bytes_read += size
+                else:
+                    skipped += 1
+                if done % 100 == 0:
+                    self.stdout.write(f'  {done:,}/{len(paths):,} checked')
+
+        elapsed = max(time.monotonic() - started, 0.001)
+        for path, error in errors:
+            self.stderr.write(f'{path}: {error}')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Processed {processed:,} images ({files_written:,} files written), '
+                f'skipped {skipped:,} up to date, {len(errors)} errors in {elapsed:.1f}s '
+                f'({processed / elapsed:.1f} images/s, {bytes_read / elapsed / 1_000_000:.1f} MB/s)'
+            )
+        )
+
+        self.fill_metadata(options['workers'], options['force'])
+
+    def fill_metadata(self, workers, force):
+        """Store size and placeholder for images that do not have them yet"""
+        pending = []
+        for model, field_name in image_fields():
+            if not has_metadata_fields(model, field_name):
+                continue
+            width_field = metadata_field_names(field_name)[0]
+            rows = model._default_manager.exclude(**{field_name: ''}).exclude(
+                **{f'{field_name}__isnull': True}
+            )
+            if not force:
+                rows = rows.filter(**{f'{width_field}__isnull': True})
+            for row in rows.only('pk', field_name).iterator():
+                fieldfile = getattr(row, field_name)
+                path = fieldfile.path
+                if os.path.exists(path):
+                    pending.append((row, field_name, path))
+
+        if not pending:
+            return
+
+        started = time.monotonic()
+        errors = 0
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(read_local_metadata, [path for _row, _field, path in pending])
+            for (row, field_name, _path), (path, metadata, error) in zip(pending, results):
+                if error:
+                    errors += 1
+                    self.stderr.write(f'{path}: {error}')
+                    continue
+                store_metadata(row, field_name, metadata)
+
+        elapsed = max(time.monotonic() - started, 0.001)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Stored size and placeholder for {len(pending) - errors:,} images, '
+                f'{errors} errors in {elapsed:.1f}s'
+            )
+        )
+
+    def media_paths(self):
+        """Local paths of every file referenced by an ImageField"""
+        paths = []
+        for model, field_name in image_fields():
+            storage = model._meta.get_field(field_name).storage
+            names = (
+                model._default_manager.exclude(**{field_name: ''})
+                .exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True)
+                .distinct()
+            )
+            for name in names.iterator():
+                try:
+                    path = storage.path(name)
+                except NotImplementedError:
+                    raise CommandError('Media storage is not on the local filesystem')
+                if os.path.exists(path):
+                    paths.append(path)
+        return paths
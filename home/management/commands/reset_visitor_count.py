@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from home.models import VisitorCount
+from home.visitors import clear_cached_count
 
 
 class Command(BaseCommand):
@@ -25,3 +26,5 @@ class Command(BaseCommand):
                     'Created new visitor count record initialized to 0'
                 )
             )
+
+        clear_cached_count()
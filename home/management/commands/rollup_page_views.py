@@ -0,0 +1,123 @@
+import json
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from home.models import PageViewHourly, PageViewDaily
+from home.pageviews import (
+    CLAIMED_SUFFIX,
+    LOG_FILE_PREFIX,
+    LOG_FILE_SUFFIX,
+    claim_log_file,
+    claimed_log_name,
+    log_dir,
+    log_file_hour,
+)
+
+
+class Command(BaseCommand):
+    help = 'Roll up finished page view log files into hourly and daily page view tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete',
+            action='store_true',
+            help='Delete processed log files instead of moving them to the archive folder',
+        )
+
+    def handle(self, *args, **options):
+        directory = log_dir()
+        current_hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+        # Files of the current hour are still being appended to
+        finished = sorted(
+            path for path in directory.glob(f"{LOG_FILE_PREFIX}*{LOG_FILE_SUFFIX}")
+            if log_file_hour(path) < current_hour
+        )
+        # Files claimed by an earlier run that stopped before archiving them
+        log_files = sorted(directory.glob(f"{LOG_FILE_PREFIX}*{CLAIMED_SUFFIX}"))
+        # Claim the files before reading them, so that late appends by
+        # workers go to new files, counted by the next run
+        for path in finished:
+            try:
+                log_files.append(claim_log_file(path))
+            except FileNotFoundError:
+                continue
+        if not log_files:
+            self.stdout.write('No finished page view logs to roll up')
+            return
+
+        hourly = Counter()
+        daily = Counter()
+        skipped = 0
+        for path in log_files:
+            with open(path, encoding='utf-8') as log_file:
+                for line in log_file:
+                    try:
+                        event = json.loads(line)
+                        viewed_at = datetime.fromtimestamp(event['ts'], tz=dt_timezone.utc)
+                        key = (event['path'], event.get('lang', ''), event.get('ref', ''))
+                    except (ValueError, KeyError, TypeError):
+                        skipped += 1
+                        continue
+                    hour = viewed_at.replace(minute=0, second=0, microsecond=0)
+                    hourly[(hour,) + key] += 1
+                    daily[(timezone.localtime(viewed_at).date(),) + key] += 1
+
+        with transaction.atomic():
+            self.add_views(PageViewHourly, 'period_start', hourly)
+            self.add_views(PageViewDaily, 'date', daily)
+
+        archive = directory / 'archive'
+        for path in log_files:
+            if options['delete']:
+                path.unlink()
+            else:
+                archive.mkdir(exist_ok=True)
+                target = archive / claimed_log_name(path)
+                if target.exists():
+                    # Late appends to an hour that was already rolled up
+                    with open(target, 'a', encoding='utf-8') as archived:
+                        archived.write(path.read_text(encoding='utf-8'))
+                    path.unlink()
+                else:
+                    path.rename(target)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rolled up {sum(hourly.values()):,} page views from {len(log_files)} files '
+                f'into {len(hourly):,} hourly and {len(daily):,} daily rows '
+                f'({skipped} malformed lines skipped)'
+            )
+        )
+
+    def add_views(self, model, period_field, counts):
+        """Add counted views to existing rollup rows and create the missing ones"""
+        periods = {key[0] for key in counts}
+        existing = {
+            (getattr(row, period_field), row.path, row.language, row.referrer): row
+            for row in model.objects.select_for_update().filter(**{f'{period_field}__in': periods})
+        }
+
+        to_update = []
+        to_create = []
+        for key, views in counts.items():
+            row = existing.get(key)
+            if row:
+                row.views += views
+                to_update.append(row)
+            else:
+                period, path, language, referrer = key
+                to_create.append(model(**{
+                    period_field: period,
+                    'path': path,
+                    'language': language,
+                    'referrer': referrer,
+                    'views': views,
+                }))
+
+        model.objects.bulk_update(to_update, ['views'], batch_size=500)
+        model.objects.bulk_create(to_create, batch_size=500)
@@ -1,19 +1,79 @@
+import re
+
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
-from .models import VisitorCount
+from . import pageviews, visitors
+
+VISITOR_COOKIE_NAME = "pilgrims_visited"
+VISITOR_COOKIE_SALT = "home.visitor"
+
+# User agents of crawlers, link previewers and scripts that should not count
+BOT_USER_AGENT_RE = re.compile(
+    r"bot|crawl|spider|slurp|archiver|facebookexternalhit|embedly|preview|"
+    r"lighthouse|pingdom|uptime|monitor|headless|phantomjs|curl|wget|"
+    r"python-requests|python-urllib|httpclient|okhttp|go-http-client|java/",
+    re.IGNORECASE,
+)
+
+
+def is_bot(request):
+    user_agent = request.META.get("HTTP_USER_AGENT", "")
+    return not user_agent or bool(BOT_USER_AGENT_RE.search(user_agent))
 
 
 class VisitorCounterMiddleware(MiddlewareMixin):
     """
     Middleware to track unique visitors to the website.
-    Uses session to ensure each visitor is counted only once per session.
+    Uses a signed cookie so each visitor is counted once per cookie lifetime
+    without creating a session row; known bots are not counted at all.
+    Counts are buffered by home.visitors and written in batches.
     """
 
     def process_request(self, request):
-        # Check if this visitor has already been counted in this session
-        if not request.session.get('has_been_counted', False):
+        request.count_visitor = False
+
+        if is_bot(request):
+            return None
+
+        # Check if this visitor has already been counted
+        counted = request.get_signed_cookie(
+            VISITOR_COOKIE_NAME, default=None, salt=VISITOR_COOKIE_SALT
+        )
+        if not counted:
             # Increment the visitor count
-            VisitorCount.increment()
-            # Mark this session as counted
-            request.session['has_been_counted'] = True
+            visitors.record_visit()
+            request.count_visitor = True
 
         return None
+
+    def process_response(self, request, response):
+        # Mark this browser as counted
+        if getattr(request, "count_visitor", False):
+            response.set_signed_cookie(
+                VISITOR_COOKIE_NAME,
+                "1",
+                salt=VISITOR_COOKIE_SALT,
+                max_age=settings.SESSION_COOKIE_AGE,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class PageViewLogMiddleware(MiddlewareMixin):
+    """
+    Middleware to append successful HTML page views to the event log.
+    Views are buffered by home.pageviews, so no database write happens here.
+    """
+
+    def process_response(self, request, response):
+        if (
+            request.method == "GET"
+            and response.status_code == 200
+            and response.get("Content-Type", "").startswith("text/html")
+            and not is_bot(request)
+            and not (request.resolver_match and request.resolver_match.app_name == "admin")
+        ):
+            pageviews.record_page_view(request)
+        return response
@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-18 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0005_visitorcount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('path', models.CharField(max_length=255, verbose_name='Path')),
+                ('language', models.CharField(blank=True, max_length=10, verbose_name='Language')),
+                ('referrer', models.CharField(blank=True, max_length=255, verbose_name='Referrer')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Views')),
+            ],
+            options={
+                'verbose_name': 'Daily Page Views',
+                'verbose_name_plural': 'Daily Page Views',
+                'ordering': ['-date', '-views'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'path', 'language', 'referrer'), name='unique_page_view_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PageViewHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateTimeField(verbose_name='Hour')),
+                ('path', models.CharField(max_length=255, verbose_name='Path')),
+                ('language', models.CharField(blank=True, max_length=10, verbose_name='Language')),
+                ('referrer', models.CharField(blank=True, max_length=255, verbose_name='Referrer')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Views')),
+            ],
+            options={
+                'verbose_name': 'Hourly Page Views',
+                'verbose_name_plural': 'Hourly Page Views',
+                'ordering': ['-period_start', '-views'],
+                'constraints': [models.UniqueConstraint(fields=('period_start', 'path', 'language', 'referrer'), name='unique_page_view_hour')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0006_pageviewhourly_pageviewdaily'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='heroslide',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Image Height'),
+        ),
+        migrations.AddField(
+            model_name='heroslide',
+            name='image_placeholder',
+            field=models.TextField(blank=True, editable=False, verbose_name='Image Placeholder'),
+        ),
+        migrations.AddField(
+            model_name='heroslide',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Image Width'),
+        ),
+    ]
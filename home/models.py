@@ -1,8 +1,13 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class HeroSlide(models.Model):
     image = models.ImageField(_("Image"), upload_to='hero_slides/')
+    image_width = models.PositiveIntegerField(_("Image Width"), null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(_("Image Height"), null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(_("Image Placeholder"), blank=True, editable=False)
     caption = models.CharField(_("Caption"), max_length=255, blank=True, null=True)
     link_url = models.URLField(_("Link URL"), max_length=200, blank=True, null=True)
     order = models.IntegerField(_("Order"), default=0, help_text=_("Order in which the slide appears"))
@@ -68,13 +73,72 @@ class VisitorCount(models.Model):
     @classmethod
     def increment(cls):
         """Increment visitor count"""
-        obj, created = cls.objects.get_or_create(id=1)
-        obj.count += 1
-        obj.save()
-        return obj.count
+        return cls.add(1)
+
+    @classmethod
+    def add(cls, amount):
+        """Atomically add ``amount`` visitors in a single UPDATE"""
+        updated = cls.objects.filter(id=1).update(
+            count=F("count") + amount, last_updated=timezone.now()
+        )
+        if not updated:
+            obj, created = cls.objects.get_or_create(id=1, defaults={"count": amount})
+            if not created:
+                cls.objects.filter(id=1).update(
+                    count=F("count") + amount, last_updated=timezone.now()
+                )
+        return cls.get_count()
 
     @classmethod
     def get_count(cls):
         """Get current visitor count"""
         obj, created = cls.objects.get_or_create(id=1)
         return obj.count
+
+
+class PageViewHourly(models.Model):
+    """Page views per hour, rolled up from the page view event log"""
+
+    period_start = models.DateTimeField(_("Hour"))
+    path = models.CharField(_("Path"), max_length=255)
+    language = models.CharField(_("Language"), max_length=10, blank=True)
+    referrer = models.CharField(_("Referrer"), max_length=255, blank=True)
+    views = models.PositiveIntegerField(_("Views"), default=0)
+
+    class Meta:
+        verbose_name = _("Hourly Page Views")
+        verbose_name_plural = _("Hourly Page Views")
+        ordering = ['-period_start', '-views']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['period_start', 'path', 'language', 'referrer'],
+                name='unique_page_view_hour',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.period_start:%Y-%m-%d %H:00} {self.path}: {self.views}"
+
+
+class PageViewDaily(models.Model):
+    """Page views per local day, rolled up from the page view event log"""
+
+    date = models.DateField(_("Date"))
+    path = models.CharField(_("Path"), max_length=255)
+    language = models.CharField(_("Language"), max_length=10, blank=True)
+    referrer = models.CharField(_("Referrer"), max_length=255, blank=True)
+    views = models.PositiveIntegerField(_("Views"), default=0)
+
+    class Meta:
+        verbose_name = _("Daily Page Views")
+        verbose_name_plural = _("Daily Page Views")
+        ordering = ['-date', '-views']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'path', 'language', 'referrer'],
+                name='unique_page_view_day',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.path}: {self.views}"
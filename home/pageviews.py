@@ -0,0 +1,182 @@
+"""
+Append-only page view event log.
+
+Page views are buffered in process memory and appended as JSON lines to
+hourly files in ``PAGE_VIEW_LOG_DIR``, one file per hour and process, so
+recording a view never touches the database. The ``rollup_page_views``
+management command folds finished files into ``PageViewHourly`` and
+``PageViewDaily``.
+
+Each process also runs a flusher thread that appends the buffer every
+``PAGE_VIEW_FLUSH_INTERVAL`` seconds, so views of a quiet worker reach
+their hour's file in time for its rollup. Appends hold an exclusive lock
+on the file; the rollup renames a finished file before counting it and
+takes the lock once, so an append still in progress lands in the renamed
+file before it is read and later appends start a new file.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends and rollups are not serialized
+    fcntl = None
+
+LOG_FILE_PREFIX = "pageviews-"
+LOG_FILE_SUFFIX = ".jsonl"
+# Suffix of log files claimed by a rollup
+CLAIMED_SUFFIX = ".rollup"
+
+_lock = threading.Lock()
+_buffer = []
+_last_flush = time.monotonic()
+# Process the flusher thread was started in; a forked worker starts its own
+_flusher_pid = None
+
+
+def log_dir():
+    return Path(settings.PAGE_VIEW_LOG_DIR)
+
+
+def log_file_hour(path):
+    """UTC hour a log file belongs to, parsed from its name"""
+    stamp = path.name[len(LOG_FILE_PREFIX):].split("-", 1)[0]
+    return datetime.strptime(stamp, "%Y%m%d%H").replace(tzinfo=dt_timezone.utc)
+
+
+def claim_log_file(path):
+    """
+    Rename a finished log file for the rollup and wait for an append in
+    progress to end, returns the claimed path
+    """
+    claimed = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}{CLAIMED_SUFFIX}")
+    path.rename(claimed)
+    if fcntl:
+        with open(claimed, "rb") as log_file:
+            fcntl.flock(log_file, fcntl.LOCK_EX)
+    return claimed
+
+
+def claimed_log_name(path):
+    """Name a claimed log file had before the rollup claimed it"""
+    return path.name.split(LOG_FILE_SUFFIX, 1)[0] + LOG_FILE_SUFFIX
+
+
+def referrer_host(request):
+    """Host of the referring site, empty for direct and internal traffic"""
+    host = urlsplit(request.META.get("HTTP_REFERER", "")).hostname or ""
+    if host == request.get_host().split(":", 1)[0]:
+        return ""
+    return host[:255]
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(settings.PAGE_VIEW_FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError:
+            # The events stay buffered and go out with the next flush
+            pass
+
+
+def _start_flusher():
+    global _flusher_pid
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(
+        target=_flush_periodically, name="page-view-flusher", daemon=True
+    ).start()
+
+
+def record_page_view(request):
+    """Buffer one page view and flush the buffer when it is due"""
+    if _flusher_pid != os.getpid():
+        _start_flusher()
+    event = {
+        "ts": int(time.time()),
+        "path": request.path[:255],
+        "lang": getattr(request, "LANGUAGE_CODE", ""),
+        "ref": referrer_host(request),
+    }
+    with _lock:
+        _buffer.append(event)
+        due = (
+            len(_buffer) >= settings.PAGE_VIEW_BUFFER_SIZE
+            or time.monotonic() - _last_flush >= settings.PAGE_VIEW_FLUSH_INTERVAL
+        )
+    if due:
+        try:
+            flush()
+        except OSError:
+            # The events stay buffered and go out with the next flush
+            pass
+
+
+def flush():
+    """Append buffered events to their hourly log files, returns the count"""
+    global _buffer, _last_flush
+    with _lock:
+        events, _buffer = _buffer, []
+        _last_flush = time.monotonic()
+    if not events:
+        return 0
+
+    by_file = {}
+    for event in events:
+        hour = time.strftime("%Y%m%d%H", time.gmtime(event["ts"]))
+        name = f"{LOG_FILE_PREFIX}{hour}-{os.getpid()}{LOG_FILE_SUFFIX}"
+        by_file.setdefault(name, []).append(event)
+
+    directory = log_dir()
+    while by_file:
+        name, file_events = next(iter(by_file.items()))
+        lines = "".join(
+            json.dumps(event, separators=(",", ":")) + "\n" for event in file_events
+        )
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            _append(directory / name, lines)
+        except OSError:
+            unwritten = [event for pending in by_file.values() for event in pending]
+            with _lock:
+                _buffer = unwritten + _buffer
+            raise
+        del by_file[name]
+    return len(events)
+
+
+def _append(path, lines):
+    while True:
+        with open(path, "a", encoding="utf-8") as log_file:
+            if fcntl:
+                fcntl.flock(log_file, fcntl.LOCK_EX)
+                # Claimed by a rollup since it was opened: start a new file
+                try:
+                    if os.stat(path).st_ino != os.fstat(log_file.fileno()).st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue
+            log_file.write(lines)
+            return
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        pass
+
+
+atexit.register(_flush_at_exit)
@@ -0,0 +1,188 @@
+"""
+Keyset (cursor) pagination.
+
+Paginator pages with LIMIT/OFFSET and a COUNT(*), both of which get slower
+the deeper the page. A keyset page instead remembers the sort key of its
+last (or first) row in an opaque cursor and asks for the rows after (or
+before) that key, which an index on the sort key answers at any depth and
+which does not skip or repeat rows when others are inserted meanwhile.
+Keyset pages have no numbers or total, only next/previous cursors.
+
+Sort keys are ``order_by()`` expressions such as ``("-review_date", "-id")``.
+They must not be nullable and the last one must be unique, usually the id.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+CURSOR_PARAM = "cursor"
+NEXT = "n"
+PREVIOUS = "p"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _split(key):
+    return (key[1:], True) if key.startswith("-") else (key, False)
+
+
+def _key_value(obj, name):
+    for attr in name.split("__"):
+        obj = getattr(obj, attr)
+    return obj
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(obj, keys, direction=NEXT):
+    """Cursor pointing after (or before, for PREVIOUS) ``obj``"""
+    values = [_json_value(_key_value(obj, _split(key)[0])) for key in keys]
+    payload = json.dumps([direction, values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor, queryset, keys):
+    """
+    (direction, key values) of a cursor made by encode_cursor() for the
+    same keys. Raises InvalidCursor when it is malformed.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, values = json.loads(payload)
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor.")
+    if direction not in (NEXT, PREVIOUS) or not isinstance(values, list):
+        raise InvalidCursor("Invalid cursor.")
+    if len(values) != len(keys):
+        raise InvalidCursor("Invalid cursor.")
+
+    query = queryset.query.chain()
+    parsed = []
+    for key, value in zip(keys, values):
+        field = query.resolve_ref(_split(key)[0]).output_field
+        try:
+            value = field.to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor("Invalid cursor.")
+        if value is None:
+            raise InvalidCursor("Invalid cursor.")
+        parsed.append(value)
+    return direction, parsed
+
+
+def _after(keys, values, backwards=False):
+    """Rows strictly after the key values in ``keys`` order (or before)"""
+    condition = Q()
+    equal = Q()
+    for key, value in zip(keys, values):
+        name, descending = _split(key)
+        lookup = "lt" if descending != backwards else "gt"
+        condition |= equal & Q(**{f"{name}__{lookup}": value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _reverse(key):
+    return key[1:] if key.startswith("-") else f"-{key}"
+
+
+class KeysetPage:
+    """A page of a keyset-paginated queryset, shaped like Paginator's Page"""
+
+    is_keyset = True
+
+    def __init__(self, object_list, keys, has_next, has_previous):
+        self.object_list = object_list
+        self.next_cursor = (
+            encode_cursor(object_list[-1], keys, NEXT) if has_next and object_list else None
+        )
+        self.previous_cursor = (
+            encode_cursor(object_list[0], keys, PREVIOUS)
+            if has_previous and object_list
+            else None
+        )
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __repr__(self):
+        return f"<KeysetPage of {len(self.object_list)} objects>"
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def page_info(self):
+        """Cursors for JSON responses"""
+        return {
+            "has_next": self.has_next(),
+            "has_previous": self.has_previous(),
+            "next_cursor": self.next_cursor,
+            "previous_cursor": self.previous_cursor,
+        }
+
+
+def keyset_page(queryset, keys, per_page, cursor=None):
+    """
+    The page of ``queryset`` ordered by ``keys`` that ``cursor`` points to,
+    or the first page without one. Raises InvalidCursor for a bad cursor.
+    """
+    if not cursor:
+        rows = list(queryset.order_by(*keys)[: per_page + 1])
+        return KeysetPage(rows[:per_page], keys, len(rows) > per_page, False)
+
+    direction, values = decode_cursor(cursor, queryset, keys)
+    if direction == NEXT:
+        rows = list(queryset.filter(_after(keys, values)).order_by(*keys)[: per_page + 1])
+        return KeysetPage(rows[:per_page], keys, len(rows) > per_page, True)
+
+    reverse_keys = [_reverse(key) for key in keys]
+    rows = list(
+        queryset.filter(_after(keys, values, backwards=True)).order_by(*reverse_keys)[
+            : per_page + 1
+        ]
+    )
+    return KeysetPage(rows[:per_page][::-1], keys, True, len(rows) > per_page)
+
+
+def paginate(request, queryset, keys, per_page):
+    """
+    Page ``queryset`` ordered by ``keys``.
+
+    Requests carrying a ``cursor`` parameter (empty for the first page) get a
+    KeysetPage, others a regular numbered Paginator page. Like
+    Paginator.get_page(), an invalid cursor or page number yields the first
+    page rather than an error.
+    """
+    queryset = queryset.order_by(*keys)
+    if CURSOR_PARAM in request.GET:
+        try:
+            return keyset_page(queryset, keys, per_page, request.GET[CURSOR_PARAM])
+        except InvalidCursor:
+            return keyset_page(queryset, keys, per_page)
+    return Paginator(queryset, per_page).get_page(request.GET.get("page"))
@@ -0,0 +1,104 @@
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+
+from . import images
+from .cache import invalidate_home_page
+from .models import HeroSlide
+from coffee.models import CoffeeProduct
+from restaurant.models import MenuItem, MenuCategory
+from hotel.models import Room, RoomType, RoomImage, RoomAmenity
+from product.models import Product, ProductImage
+
+logger = logging.getLogger(__name__)
+
+# Every model rendered on the home page
+HOME_PAGE_MODELS = (
+    HeroSlide,
+    Room,
+    RoomType,
+    RoomImage,
+    RoomAmenity,
+    MenuCategory,
+    MenuItem,
+    CoffeeProduct,
+    Product,
+    ProductImage,
+)
+
+
+def clear_home_page_cache(sender, **kwargs):
+    """
+    Invalidate the cached home page whenever content shown on it changes
+    """
+    invalidate_home_page()
+
+
+for model in HOME_PAGE_MODELS:
+    post_save.connect(clear_home_page_cache, sender=model)
+    post_delete.connect(clear_home_page_cache, sender=model)
+
+
+def image_field_names(sender):
+    return [field_name for model, field_name in images.image_fields() if model is sender]
+
+
+def _delete_derivatives_on_commit(fieldfile, name):
+    storage = fieldfile.storage
+
+    def delete():
+        try:
+            images.delete_derivatives(storage, name)
+        except Exception:
+            logger.exception("Could not delete the derivatives of %s", name)
+
+    transaction.on_commit(delete)
+
+
+def remember_image_names(sender, instance, **kwargs):
+    """Note the stored image names, so that derivatives of replaced images go"""
+    field_names = image_field_names(sender)
+    instance._stored_image_names = {}
+    if instance.pk and field_names:
+        instance._stored_image_names = (
+            sender._default_manager.filter(pk=instance.pk).values(*field_names).first() or {}
+        )
+
+
+def create_image_derivatives(sender, instance, **kwargs):
+    """
+    Generate responsive copies, size and placeholder of newly uploaded
+    images. Files that already have derivatives are skipped, so only new
+    uploads are processed.
+    """
+    for model, field_name in images.image_fields():
+        if model is not sender:
+            continue
+        fieldfile = getattr(instance, field_name)
+        stored_name = getattr(instance, "_stored_image_names", {}).get(field_name)
+        if stored_name and stored_name != fieldfile.name:
+            _delete_derivatives_on_commit(fieldfile, stored_name)
+        try:
+            written = images.generate_derivatives(fieldfile)
+            if images.has_metadata_fields(model, field_name):
+                width, _height, _placeholder = images.image_metadata(fieldfile)
+                if written or (fieldfile and width is None) or (not fieldfile and width):
+                    images.store_metadata(instance, field_name)
+        except Exception:
+            # A broken upload must not prevent saving the object
+            logger.exception("Could not process image %s", fieldfile.name)
+
+
+def delete_image_derivatives(sender, instance, **kwargs):
+    """Delete the derivatives of a deleted object's images"""
+    for field_name in image_field_names(sender):
+        fieldfile = getattr(instance, field_name)
+        if fieldfile:
+            _delete_derivatives_on_commit(fieldfile, fieldfile.name)
+
+
+for model in {model for model, _field_name in images.image_fields()}:
+    pre_save.connect(remember_image_names, sender=model)
+    post_save.connect(create_image_derivatives, sender=model)
+    post_delete.connect(delete_image_derivatives, sender=model)
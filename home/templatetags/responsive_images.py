@@ -0,0 +1,134 @@
+from django import template
+from django.conf import settings
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+from home.images import (
+    WEBP,
+    derivative_name,
+    fallback_extension,
+    has_derivatives,
+    image_metadata,
+)
+
+register = template.Library()
+
+MIME_TYPES = {"webp": "image/webp", "jpg": "image/jpeg", "png": "image/png"}
+
+
+def _widths(width):
+    """
+    (derivative width, real width) pairs for srcset. Derivatives are never
+    upscaled, so with a known image width the list stops at the first
+    derivative that is at least as wide as the image.
+    """
+    pairs = []
+    for derivative_width in settings.RESPONSIVE_IMAGE_WIDTHS:
+        if width and derivative_width >= width:
+            pairs.append((derivative_width, width))
+            break
+        pairs.append((derivative_width, derivative_width))
+    return pairs
+
+
+def _srcset(image, extension, widths):
+    return ", ".join(
+        f"{image.storage.url(derivative_name(image.name, derivative_width, extension))} {real_width}w"
+        for derivative_width, real_width in widths
+    )
+
+
+def _image_attrs(image, attrs):
+    """Size, lazy loading and placeholder attributes for an <img>"""
+    width, height, placeholder = image_metadata(image)
+    attrs = dict(attrs)
+    if width and height:
+        attrs.setdefault("width", width)
+        attrs.setdefault("height", height)
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    if placeholder and attrs["loading"] == "lazy":
+        attrs["style"] = (
+            f"background: url({placeholder}) center / cover no-repeat; "
+            + attrs.get("style", "")
+        ).strip()
+    return width, attrs
+
+
+@register.simple_tag
+def responsive_image(image, sizes="100vw", **attrs):
+    """
+    Render an ImageField file as a <picture> with WebP and fallback srcsets.
+    Extra keyword arguments become <img> attributes, e.g.
+    {% responsive_image item.image sizes="(min-width: 768px) 50vw, 100vw" alt=item.name class="w-full" %}
+    Images are lazy loaded with their stored width/height and a blurred
+    placeholder; pass loading="eager" for images above the fold.
+    Images without derivatives are rendered as a plain <img>.
+    """
+    if not image:
+        return ""
+    width, attrs = _image_attrs(image, attrs)
+    if not has_derivatives(image):
+        return format_html('<img src="{}"{}>', image.url, flatatt(attrs))
+
+    widths = _widths(width)
+    fallback = fallback_extension(image.name)
+    src_width = widths[min(len(widths) - 1, len(settings.RESPONSIVE_IMAGE_WIDTHS) // 2)][0]
+    src = image.storage.url(derivative_name(image.name, src_width, fallback))
+    return format_html(
+        '<picture style="display: contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}>'
+        "</picture>",
+        _srcset(image, WEBP, widths),
+        sizes,
+        src,
+        _srcset(image, fallback, widths),
+        sizes,
+        flatatt(attrs),
+    )
+
+
+def _background_width(image, width):
+    return width or _widths(image_metadata(image)[0])[-1][0]
+
+
+@register.simple_tag
+def responsive_background(image, width=None):
+    """
+    CSS image-set() value for a background image, WebP first.
+    Falls back to a plain url() for images without derivatives.
+    """
+    if not image:
+        return ""
+    if not has_derivatives(image):
+        return format_html("url('{}')", image.url)
+
+    width = _background_width(image, width)
+    fallback = fallback_extension(image.name)
+    return format_html(
+        "image-set(url('{}') type('{}'), url('{}') type('{}'))",
+        image.storage.url(derivative_name(image.name, width, WEBP)),
+        MIME_TYPES[WEBP],
+        image.storage.url(derivative_name(image.name, width, fallback)),
+        MIME_TYPES[fallback],
+    )
+
+
+@register.simple_tag
+def responsive_preload(image, width=None):
+    """
+    <link rel="preload"> for the image responsive_background() picks, so the
+    browser fetches an above-the-fold background before parsing the CSS.
+    """
+    if not image:
+        return ""
+    if not has_derivatives(image):
+        return format_html('<link rel="preload" as="image" href="{}" fetchpriority="high">', image.url)
+
+    width = _background_width(image, width)
+    return format_html(
+        '<link rel="preload" as="image" href="{}" type="{}" fetchpriority="high">',
+        image.storage.url(derivative_name(image.name, width, WEBP)),
+        MIME_TYPES[WEBP],
+    )
@@ -1,3 +1,290 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from hotel.models import Room, RoomType
+
+from . import pageviews
+from .models import HeroSlide, PageViewDaily, PageViewHourly
+from .pagination import (
+    NEXT,
+    PREVIOUS,
+    InvalidCursor,
+    encode_cursor,
+    keyset_page,
+    paginate,
+)
+
+KEYS = ("-date", "views", "id")
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Few distinct dates and view counts, so pages break inside ties
+        first = date(2025, 1, 1)
+        PageViewDaily.objects.bulk_create(
+            PageViewDaily(date=first + timedelta(days=i % 3), path=f"/page/{i}/", views=i % 2)
+            for i in range(23)
+        )
+        cls.ordered = list(PageViewDaily.objects.order_by(*KEYS).values_list("id", flat=True))
+
+    def pages_forward(self, per_page):
+        pages = [keyset_page(PageViewDaily.objects.all(), KEYS, per_page)]
+        while pages[-1].has_next():
+            pages.append(
+                keyset_page(PageViewDaily.objects.all(), KEYS, per_page, pages[-1].next_cursor)
+            )
+        return pages
+
+    def test_forward_pages_cover_every_row_once_in_order(self):
+        for per_page in (1, 5, 23, 30):
+            with self.subTest(per_page=per_page):
+                pages = self.pages_forward(per_page)
+                ids = [row.id for page in pages for row in page]
+                self.assertEqual(ids, self.ordered)
+                self.assertFalse(pages[0].has_previous())
+                self.assertTrue(all(page.has_previous() for page in pages[1:]))
+
+    def test_backward_pages_mirror_forward_pages(self):
+        pages = self.pages_forward(5)
+        page = pages[-1]
+        backwards = [page]
+        while page.has_previous():
+            page = keyset_page(PageViewDaily.objects.all(), KEYS, 5, page.previous_cursor)
+            backwards.append(page)
+        self.assertEqual(
+            [[row.id for row in page] for page in backwards[::-1]],
+            [[row.id for row in page] for page in pages],
+        )
+        self.assertFalse(backwards[-1].has_previous())
+        self.assertTrue(backwards[-1].has_next())
+
+    def test_rows_inserted_before_the_cursor_do_not_shift_the_next_page(self):
+        first = keyset_page(PageViewDaily.objects.all(), KEYS, 5)
+        PageViewDaily.objects.create(date=date(2026, 1, 1), path="/new/", views=0)
+        second = keyset_page(PageViewDaily.objects.all(), KEYS, 5, first.next_cursor)
+        self.assertEqual([row.id for row in second], self.ordered[5:10])
+
+    def test_empty_queryset(self):
+        page = keyset_page(PageViewDaily.objects.none(), KEYS, 5)
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_other_pages())
+        self.assertIsNone(page.page_info()["next_cursor"])
+
+    def test_invalid_cursors_raise(self):
+        row = PageViewDaily.objects.first()
+        cursors = [
+            "not base64!",
+            "bm90IGpzb24",  # "not json"
+            encode_cursor(row, KEYS[:2]),  # too few values
+            encode_cursor(row, KEYS, "x"),  # unknown direction
+            encode_cursor(row, ("path", "views", "id")),  # a path is no date
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    keyset_page(PageViewDaily.objects.all(), KEYS, 5, cursor)
+
+    def test_cursor_directions(self):
+        row = PageViewDaily.objects.get(id=self.ordered[10])
+        after = keyset_page(PageViewDaily.objects.all(), KEYS, 3, encode_cursor(row, KEYS, NEXT))
+        before = keyset_page(
+            PageViewDaily.objects.all(), KEYS, 3, encode_cursor(row, KEYS, PREVIOUS)
+        )
+        self.assertEqual([row.id for row in after], self.ordered[11:14])
+        self.assertEqual([row.id for row in before], self.ordered[7:10])
+
+    def test_paginate_serves_numbered_pages_without_a_cursor(self):
+        request = RequestFactory().get("/", {"page": "2"})
+        page = paginate(request, PageViewDaily.objects.all(), KEYS, 5)
+        self.assertEqual(page.number, 2)
+        self.assertEqual([row.id for row in page], self.ordered[5:10])
+
+    def test_paginate_falls_back_to_the_first_page_for_a_bad_cursor(self):
+        request = RequestFactory().get("/", {"cursor": "garbage"})
+        page = paginate(request, PageViewDaily.objects.all(), KEYS, 5)
+        self.assertTrue(page.is_keyset)
+        self.assertEqual([row.id for row in page], self.ordered[:5])
+
+
+def image_file(name, color="red"):
+    data = io.BytesIO()
+    Image.new("RGB", (40, 30), color).save(data, "JPEG")
+    return SimpleUploadedFile(name, data.getvalue(), content_type="image/jpeg")
+
+
+class HomePageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.room_type = RoomType.objects.create(
+            name="Garden Suite", description="", price_per_night=100, capacity=2
+        )
+        Room(room_type=self.room_type).save()
+
+    def get(self, path):
+        return self.client.get(path, HTTP_USER_AGENT="Mozilla").content.decode()
+
+    def test_body_is_cached_per_language_until_content_saves(self):
+        for path in ("/", "/en/"):
+            self.assertIn("Garden Suite", self.get(path))
+
+        # Writes that skip the signals leave the cached pages in place
+        RoomType.objects.filter(pk=self.room_type.pk).update(name="Lotus Suite")
+        for path in ("/", "/en/"):
+            self.assertIn("Garden Suite", self.get(path))
+
+        self.room_type.name = "River Suite"
+        self.room_type.save()
+        for path in ("/", "/en/"):
+            page = self.get(path)
+            self.assertIn("River Suite", page)
+            self.assertNotIn("Garden Suite", page)
+
+    def preload(self, path):
+        page = self.get(path)
+        return page[page.index('<link rel="preload" as="image"') :].split(">", 1)[0]
+
+    def test_preload_follows_the_first_hero_slide(self):
+        first = HeroSlide.objects.create(image=image_file("first.jpg"), order=2)
+        self.assertIn(Path(first.image.name).name, self.preload("/en/"))
+
+        second = HeroSlide.objects.create(image=image_file("second.jpg", "blue"), order=1)
+        for path in ("/", "/en/"):
+            self.assertIn(Path(second.image.name).name, self.preload(path))
+
+        second.delete()
+        self.assertIn(Path(first.image.name).name, self.preload("/en/"))
+
+
+class PageViewRollupTests(TestCase):
+    # 23:00 in Bangkok, the next hour is the next local day
+    hour = datetime(2025, 3, 1, 16, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        override = override_settings(PAGE_VIEW_LOG_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write_log(self, hour, pid, *views, extra=""):
+        path = self.directory / f"pageviews-{hour:%Y%m%d%H}-{pid}.jsonl"
+        with open(path, "a", encoding="utf-8") as log_file:
+            for minute, path_viewed, lang, ref in views:
+                event = {
+                    "ts": int((hour + timedelta(minutes=minute)).timestamp()),
+                    "path": path_viewed,
+                    "lang": lang,
+                    "ref": ref,
+                }
+                log_file.write(json.dumps(event) + "\n")
+            log_file.write(extra)
+        return path
+
+    def rollup(self, *args):
+        call_command("rollup_page_views", *args, stdout=io.StringIO())
+
+    def hourly(self):
+        return {
+            (row.period_start, row.path, row.language, row.referrer): row.views
+            for row in PageViewHourly.objects.all()
+        }
+
+    def daily(self):
+        return {
+            (row.date, row.path, row.language, row.referrer): row.views
+            for row in PageViewDaily.objects.all()
+        }
+
+    def test_counts_and_archives_finished_hours(self):
+        next_hour = self.hour + timedelta(hours=1)
+        self.write_log(self.hour, 1, (5, "/a/", "en", ""), (50, "/a/", "en", ""), extra="{bad\n")
+        self.write_log(self.hour, 2, (10, "/a/", "en", ""))
+        self.write_log(next_hour, 1, (0, "/b/", "lo", "example.com"))
+        current = self.write_log(timezone.now(), 1, (0, "/c/", "en", ""))
+
+        self.rollup()
+        self.assertEqual(
+            self.hourly(),
+            {
+                (self.hour, "/a/", "en", ""): 3,
+                (next_hour, "/b/", "lo", "example.com"): 1,
+            },
+        )
+        self.assertEqual(
+            self.daily(),
+            {
+                (date(2025, 3, 1), "/a/", "en", ""): 3,
+                (date(2025, 3, 2), "/b/", "lo", "example.com"): 1,
+            },
+        )
+        self.assertEqual(
+            sorted(path.name for path in (self.directory / "archive").iterdir()),
+            [
+                "pageviews-2025030116-1.jsonl",
+                "pageviews-2025030116-2.jsonl",
+                "pageviews-2025030117-1.jsonl",
+            ],
+        )
+        self.assertEqual(
+            sorted(path.name for path in self.directory.glob("pageviews-*")), [current.name]
+        )
+
+    def test_late_appends_are_counted_by_the_next_run(self):
+        self.write_log(self.hour, 1, (5, "/a/", "en", ""))
+        self.rollup()
+        # A worker flushes a late buffer for the rolled up hour
+        self.write_log(self.hour, 1, (30, "/a/", "en", ""), (40, "/a/", "en", ""))
+        self.rollup()
+
+        self.assertEqual(self.hourly(), {(self.hour, "/a/", "en", ""): 3})
+        archived = self.directory / "archive" / "pageviews-2025030116-1.jsonl"
+        self.assertEqual(len(archived.read_text().splitlines()), 3)
+
+    def test_appends_after_a_claim_start_a_new_file(self):
+        path = self.write_log(self.hour, 1, (5, "/a/", "en", ""))
+        claimed = pageviews.claim_log_file(path)
+        pageviews._append(path, '{"ts": 0}\n')
+
+        self.assertEqual(len(claimed.read_text().splitlines()), 1)
+        self.assertEqual(path.read_text(), '{"ts": 0}\n')
+        self.assertEqual(pageviews.claimed_log_name(claimed), path.name)
+
+    def test_claimed_files_of_an_unfinished_run_are_rolled_up(self):
+        pageviews.claim_log_file(self.write_log(self.hour, 1, (5, "/a/", "en", "")))
+        self.rollup()
+        self.assertEqual(self.hourly(), {(self.hour, "/a/", "en", ""): 1})
+        self.assertFalse(list(self.directory.glob("pageviews-*")))
+
+    def test_delete(self):
+        self.write_log(self.hour, 1, (5, "/a/", "en", ""))
+        self.rollup("--delete")
+        self.assertEqual(self.hourly(), {(self.hour, "/a/", "en", ""): 1})
+        self.assertFalse(list(self.directory.iterdir()))
+
+    @override_settings(PAGE_VIEW_FLUSH_INTERVAL=0.05, PAGE_VIEW_BUFFER_SIZE=1000)
+    def test_quiet_workers_flush_on_time(self):
+        pageviews.flush()
+        # A fresh flusher thread, so that it sleeps for the short interval
+        pageviews._flusher_pid = None
+        pageviews.record_page_view(RequestFactory().get("/en/quiet/"))
+
+        deadline = time.monotonic() + 5
+        logged = ""
+        while "/en/quiet/" not in logged and time.monotonic() < deadline:
+            time.sleep(0.02)
+            logged = "".join(path.read_text() for path in self.directory.glob("pageviews-*"))
+        self.assertIn("/en/quiet/", logged)
 
-# Create your tests here.
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.shortcuts import render
+from django.utils.functional import SimpleLazyObject
 from .models import HeroSlide
 from coffee.models import CoffeeProduct, CoffeeCategory, CoffeeBean
 from restaurant.models import MenuItem, MenuCategory
@@ -6,10 +8,7 @@ from hotel.models import Room
 from product.models import Product
 
 
-def home(request):
-    rooms = Room.objects.all().order_by("-created_at")
-    featured_rooms = Room.objects.all().order_by("-created_at")
-
+def _menu_data():
     # Fetch all menu categories and their associated items
     menu_categories = MenuCategory.objects.all().order_by('order', 'name')
     menu_data = []
@@ -19,6 +18,24 @@ def home(request):
             'category': category,
             'items': items
         })
+    return menu_data
+
+
+def _coffee_stats():
+    return {
+        "total_products": CoffeeProduct.objects.filter(is_available=True).count(),
+        "total_beans": CoffeeBean.objects.count(),
+        "total_categories": CoffeeCategory.objects.count(),
+    }
+
+
+def home(request):
+    """
+    Home page. The page body is cached per language by {% cache %} in
+    index.html, so everything here stays lazy and is only queried on a miss.
+    """
+    rooms = Room.objects.all().order_by("-created_at")
+    featured_rooms = Room.objects.all().order_by("-created_at")
 
     hero_slides = HeroSlide.objects.filter(is_active=True).order_by("order")
 
@@ -30,10 +47,6 @@ def home(request):
 
     categories = CoffeeCategory.objects.all()[:8]
 
-    total_products = CoffeeProduct.objects.filter(is_available=True).count()
-    total_beans = CoffeeBean.objects.count()
-    total_categories = CoffeeCategory.objects.count()
-
     # Fetch featured products
     featured_products = (
         Product.objects.filter(is_available=True)
@@ -45,16 +58,13 @@ def home(request):
     context = {
         "rooms": rooms,
         "featured_rooms": featured_rooms,
-        "menu_data": menu_data,  # Pass the structured menu data
+        "menu_data": SimpleLazyObject(_menu_data),  # Pass the structured menu data
         "featured_coffees": featured_coffees,
         "featured_products": featured_products,
         "categories": categories,
-        "stats": {
-            "total_products": total_products,
-            "total_beans": total_beans,
-            "total_categories": total_categories,
-        },
+        "stats": SimpleLazyObject(_coffee_stats),
         "hero_slides": hero_slides,
+        "home_cache_timeout": settings.HOME_PAGE_CACHE_TIMEOUT,
     }
     return render(request, "index.html", context)
 
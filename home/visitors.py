@@ -0,0 +1,116 @@
+"""
+Write-behind buffer for the visitor counter.
+
+Visits are counted in process memory and written to ``VisitorCount`` with one
+atomic UPDATE at most every ``VISITOR_COUNT_FLUSH_INTERVAL`` seconds, so new
+visitors no longer contend on the single counter row.
+
+Each process also runs a flusher thread that writes the buffer every
+interval, so visits do not wait for later traffic, and flushes once more at
+exit. A killed process loses at most one interval of visits.
+"""
+import atexit
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+
+from .models import VisitorCount
+
+VISITOR_COUNT_CACHE_KEY = "home:visitor_count"
+
+_lock = threading.Lock()
+_pending = 0
+_last_flush = time.monotonic()
+# Process the flusher thread was started in; a forked worker starts its own
+_flusher_pid = None
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(settings.VISITOR_COUNT_FLUSH_INTERVAL)
+        try:
+            flush()
+        except DatabaseError:
+            # The visits stay buffered and go out with the next flush
+            pass
+        finally:
+            # Connections of this thread only
+            connections.close_all()
+
+
+def _start_flusher():
+    global _flusher_pid
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    threading.Thread(
+        target=_flush_periodically, name="visitor-count-flusher", daemon=True
+    ).start()
+
+
+def record_visit():
+    """Buffer one visit and flush the buffer if the interval has passed"""
+    global _pending
+    if _flusher_pid != os.getpid():
+        _start_flusher()
+    with _lock:
+        _pending += 1
+        due = time.monotonic() - _last_flush >= settings.VISITOR_COUNT_FLUSH_INTERVAL
+    if due:
+        try:
+            flush()
+        except DatabaseError:
+            # The visits stay buffered and go out with the next flush
+            pass
+
+
+def pending_visits():
+    """Visits counted by this process but not written yet"""
+    return _pending
+
+
+def flush():
+    """Write buffered visits to the database, returns the number written"""
+    global _pending, _last_flush
+    with _lock:
+        amount, _pending = _pending, 0
+        _last_flush = time.monotonic()
+    if not amount:
+        return 0
+    try:
+        count = VisitorCount.add(amount)
+    except DatabaseError:
+        # Keep the visits for the next flush instead of losing them
+        with _lock:
+            _pending += amount
+        raise
+    cache.set(VISITOR_COUNT_CACHE_KEY, count, settings.VISITOR_COUNT_CACHE_TIMEOUT)
+    return amount
+
+
+def get_visitor_count():
+    """Total visitor count, read from the cache and from the database on a miss"""
+    count = cache.get(VISITOR_COUNT_CACHE_KEY)
+    if count is None:
+        count = VisitorCount.get_count()
+        cache.set(VISITOR_COUNT_CACHE_KEY, count, settings.VISITOR_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def clear_cached_count():
+    cache.delete(VISITOR_COUNT_CACHE_KEY)
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception:
+        pass
+
+
+atexit.register(_flush_at_exit)
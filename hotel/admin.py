@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Q
 from .models import *
 from django.utils.html import format_html
 from django.urls import path, reverse
@@ -12,6 +13,10 @@ from .models import (
     GuestReview,
     ReviewSummary,
 )
+from .availability import rebuild_room
+from .review_aggregates import rebuild_all as rebuild_review_aggregates, update_reviews
+from .review_search import search as search_reviews
+from .catalog import bump_version as bump_catalog_version
 
 
 # @admin.register(Hotel)
@@ -115,12 +120,14 @@ class RoomTypeAdmin(admin.ModelAdmin):
 
     def mark_featured(self, request, queryset):
         count = queryset.update(is_featured=True)
+        bump_catalog_version()
         self.message_user(request, f"{count} room types marked as featured.")
 
     mark_featured.short_description = "Mark as featured"
 
     def unmark_featured(self, request, queryset):
         count = queryset.update(is_featured=False)
+        bump_catalog_version()
         self.message_user(request, f"{count} room types removed from featured.")
 
     unmark_featured.short_description = "Remove from featured"
@@ -245,12 +252,14 @@ class RoomAdmin(admin.ModelAdmin):
 
     def mark_out_of_order(self, request, queryset):
         count = queryset.update(is_out_of_order=True)
+        bump_catalog_version()
         self.message_user(request, f"{count} rooms marked as out of order.")
 
     mark_out_of_order.short_description = "Mark as out of order"
 
     def mark_operational(self, request, queryset):
         count = queryset.update(is_out_of_order=False)
+        bump_catalog_version()
         self.message_user(request, f"{count} rooms marked as operational.")
 
     mark_operational.short_description = "Mark as operational"
@@ -417,6 +426,38 @@ class HotelAdmin(admin.ModelAdmin):
     deactivate_hotels.short_description = "Deactivate selected hotels"
 
 
+@admin.register(RateRule)
+class RateRuleAdmin(admin.ModelAdmin):
+    list_display = [
+        "name",
+        "room_type",
+        "start_date",
+        "end_date",
+        "adjustment_type",
+        "value",
+        "priority",
+        "is_active",
+    ]
+    list_filter = ["is_active", "adjustment_type", "room_type"]
+    list_editable = ["priority", "is_active"]
+    search_fields = ["name"]
+
+    fieldsets = (
+        (None, {"fields": ("name", "room_type", "is_active", "priority")}),
+        ("Season", {"fields": ("start_date", "end_date")}),
+        (
+            "Weekdays",
+            {
+                "fields": (
+                    ("on_monday", "on_tuesday", "on_wednesday", "on_thursday"),
+                    ("on_friday", "on_saturday", "on_sunday"),
+                )
+            },
+        ),
+        ("Price", {"fields": ("adjustment_type", "value")}),
+    )
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = [
@@ -464,11 +505,14 @@ class BookingAdmin(admin.ModelAdmin):
         ("Status", {"fields": ("status",)}),
         (
             "Metadata",
-            {"fields": ("created_at", "updated_at"), "classes": ("collapse",)},
+            {
+                "fields": ("idempotency_key", "created_at", "updated_at"),
+                "classes": ("collapse",),
+            },
         ),
     )
 
-    readonly_fields = ["created_at", "updated_at"]
+    readonly_fields = ["idempotency_key", "created_at", "updated_at"]
 
     actions = [
         "confirm_bookings",
@@ -496,9 +540,12 @@ class BookingAdmin(admin.ModelAdmin):
     check_out_guests.short_description = "Check out selected guests"
 
     def cancel_bookings(self, request, queryset):
-        count = queryset.exclude(status__in=["checked_out", "cancelled"]).update(
-            status="cancelled"
-        )
+        bookings = queryset.exclude(status__in=["checked_out", "cancelled"])
+        room_ids = set(bookings.values_list("room_id", flat=True))
+        count = bookings.update(status="cancelled")
+        # update() skips the signals that keep the availability index current
+        for room_id in room_ids:
+            rebuild_room(room_id)
         self.message_user(request, f"{count} bookings cancelled.")
 
     cancel_bookings.short_description = "Cancel selected bookings"
@@ -596,7 +643,13 @@ class CategoryRatingInline(admin.TabularInline):
         return super().get_queryset(request).select_related("category")
 
 
-admin.site.register(PlatformRating)
+@admin.register(PlatformRating)
+class PlatformRatingAdmin(admin.ModelAdmin):
+    list_display = ["platform", "overall_rating", "total_reviews", "last_updated"]
+    # Kept up to date from the platform's reviews
+    readonly_fields = ["overall_rating", "total_reviews", "last_updated"]
+
+
 # @admin.register(PlatformRating)
 # class PlatformRatingAdmin(admin.ModelAdmin):
 #     list_display = ["platform", "overall_rating", "total_reviews", "last_updated"]
@@ -616,6 +669,16 @@ admin.site.register(PlatformRating)
 #         return super().get_queryset(request).select_related("platform")
 
 
+@admin.register(ReviewSyncState)
+class ReviewSyncStateAdmin(admin.ModelAdmin):
+    list_display = ["platform", "last_changed_at", "last_external_id", "last_synced_at"]
+    # Moved by the sync_reviews command; clear last_changed_at to sync everything again
+    readonly_fields = ["platform", "last_external_id", "last_synced_at"]
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(CategoryRating)
 class CategoryRatingAdmin(admin.ModelAdmin):
     list_display = ["platform", "category", "rating"]
@@ -659,6 +722,7 @@ class GuestReviewAdmin(admin.ModelAdmin):
         "is_active",
         "review_date",
     ]
+    # Names and texts are searched with the full-text index, see get_search_results()
     search_fields = ["reviewer_name", "review_text", "platform__display_name"]
     date_hierarchy = "review_date"
     ordering = ["-review_date"]
@@ -699,6 +763,19 @@ class GuestReviewAdmin(admin.ModelAdmin):
         "deactivate_reviews",
     ]
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Like the default search, every word must match the reviewer name,
+        the text or the platform name, but names and texts are matched with
+        the full-text index
+        """
+        for word in search_term.split():
+            matches = search_reviews(GuestReview.objects.all(), word).values("pk")
+            queryset = queryset.filter(
+                Q(pk__in=matches) | Q(platform__display_name__icontains=word)
+            )
+        return queryset, False
+
     def mark_featured(self, request, queryset):
         count = queryset.update(is_featured=True)
         self.message_user(request, f"{count} reviews marked as featured.")
@@ -724,13 +801,13 @@ class GuestReviewAdmin(admin.ModelAdmin):
     mark_unverified.short_description = "Mark as unverified"
 
     def activate_reviews(self, request, queryset):
-        count = queryset.update(is_active=True)
+        count = update_reviews(queryset, is_active=True)
         self.message_user(request, f"{count} reviews activated.")
 
     activate_reviews.short_description = "Activate selected reviews"
 
     def deactivate_reviews(self, request, queryset):
-        count = queryset.update(is_active=False)
+        count = update_reviews(queryset, is_active=False)
         self.message_user(request, f"{count} reviews deactivated.")
 
     deactivate_reviews.short_description = "Deactivate selected reviews"
@@ -742,7 +819,8 @@ class GuestReviewAdmin(admin.ModelAdmin):
 @admin.register(ReviewSummary)
 class ReviewSummaryAdmin(admin.ModelAdmin):
     list_display = ["average_rating", "total_reviews", "last_updated"]
-    readonly_fields = ["last_updated"]
+    # The statistics are kept up to date from the reviews
+    readonly_fields = ["total_reviews", "average_rating", "last_updated"]
 
     fieldsets = (
         ("Overall Statistics", {"fields": ("total_reviews", "average_rating")}),
@@ -769,9 +847,7 @@ class ReviewSummaryAdmin(admin.ModelAdmin):
     actions = ["recalculate_summary"]
 
     def recalculate_summary(self, request, queryset):
-        for summary in queryset:
-            summary.calculate_summary()
-            summary.save()
+        rebuild_review_aggregates()
         self.message_user(request, "Review summary recalculated.")
 
     recalculate_summary.short_description = "Recalculate summary statistics"
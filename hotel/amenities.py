@@ -0,0 +1,85 @@
+"""
+Amenity bitmasks.
+
+Every amenity owns one bit (Amenity.bit) and every room stores the bits of
+its available amenities in Room.amenity_mask, so "has WiFi and balcony" or
+"has WiFi or AC" is a single integer test instead of one join per amenity.
+Amenities beyond the 63 bits of the mask have no bit and are matched
+through RoomAmenity instead.
+"""
+from django.db.models import F
+
+from .models import Amenity, Room, RoomAmenity
+
+
+def room_mask(room_id):
+    """Mask of the amenities currently available in a room"""
+    mask = 0
+    links = RoomAmenity.objects.filter(room_id=room_id, is_available=True)
+    for bit in links.exclude(amenity__bit=None).values_list("amenity__bit", flat=True):
+        mask |= 1 << bit
+    return mask
+
+
+def rebuild_room(room_id):
+    Room.objects.filter(pk=room_id).update(amenity_mask=room_mask(room_id))
+
+
+def rebuild_all():
+    """Recompute the mask of every room, returns the number of rooms"""
+    masks = {room_id: 0 for room_id in Room.objects.values_list("id", flat=True)}
+    links = RoomAmenity.objects.filter(is_available=True).exclude(amenity__bit=None)
+    for room_id, bit in links.values_list("room_id", "amenity__bit"):
+        masks[room_id] |= 1 << bit
+    rooms = [Room(id=room_id, amenity_mask=mask) for room_id, mask in masks.items()]
+    Room.objects.bulk_update(rooms, ["amenity_mask"], batch_size=500)
+    return len(rooms)
+
+
+def split(amenity_ids):
+    """(mask of the ids that have a bit, ids without a bit)"""
+    mask = 0
+    unmasked = []
+    for amenity_id, bit in Amenity.objects.filter(id__in=amenity_ids).values_list("id", "bit"):
+        if bit is None:
+            unmasked.append(amenity_id)
+        else:
+            mask |= 1 << bit
+    return mask, unmasked
+
+
+def filter_rooms(rooms, amenity_ids, match_all=True):
+    """
+    Narrow a Room queryset to rooms with all (or, with match_all=False, any)
+    of the given amenities available.
+    """
+    if not amenity_ids:
+        return rooms
+    mask, unmasked = split(amenity_ids)
+    rooms = rooms.annotate(matching_amenities=F("amenity_mask").bitand(mask))
+    links = RoomAmenity.objects.filter(is_available=True)
+    if match_all:
+        rooms = rooms.filter(matching_amenities=mask)
+        for amenity_id in unmasked:
+            rooms = rooms.filter(id__in=links.filter(amenity_id=amenity_id).values("room_id"))
+        return rooms
+    any_match = rooms.exclude(matching_amenities=0)
+    if unmasked:
+        any_match = any_match | rooms.filter(
+            id__in=links.filter(amenity_id__in=unmasked).values("room_id")
+        )
+    return any_match
+
+
+def matches(room, mask, unmasked=(), match_all=True):
+    """
+    In-memory version of filter_rooms() for a catalog room (see
+    hotel.catalog), given the mask and the bitless ids of the amenities.
+    """
+    if match_all:
+        return room.amenity_mask & mask == mask and all(
+            amenity_id in room.amenity_ids for amenity_id in unmasked
+        )
+    return bool(room.amenity_mask & mask) or any(
+        amenity_id in room.amenity_ids for amenity_id in unmasked
+    )
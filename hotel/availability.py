@@ -0,0 +1,144 @@
+"""
+Room availability index.
+
+Booked nights are kept per room and per year as a bitmap (RoomOccupancy),
+rebuilt from the room's Booking rows whenever one of them changes. Asking
+which rooms are free between two dates is then a single query for the
+bitmaps of the years involved and a bitwise AND against the requested
+nights, for all rooms at once.
+"""
+from datetime import date, datetime
+
+from django.db import transaction
+
+from .models import Booking, RoomOccupancy
+from .rates import check_stay
+
+# Bookings in these states do not hold their nights
+RELEASED_STATUSES = ("cancelled",)
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def parse_stay(check_in, check_out):
+    """
+    Parse YYYY-MM-DD check-in and check-out strings into dates.
+    Raises ValueError when either is invalid, check-out is not after
+    check-in, or the stay is too long or too far from today (see
+    rates.check_stay).
+    """
+    try:
+        check_in = datetime.strptime(check_in or "", DATE_FORMAT).date()
+        check_out = datetime.strptime(check_out or "", DATE_FORMAT).date()
+    except ValueError:
+        raise ValueError("Dates must be YYYY-MM-DD.")
+    if check_out <= check_in:
+        raise ValueError("Check-out date must be after check-in date.")
+    check_stay(check_in, check_out)
+    return check_in, check_out
+
+
+def night_masks(check_in, check_out):
+    """
+    {year: bitmask} of the nights from check_in up to, not including,
+    check_out.
+    """
+    masks = {}
+    for year in range(check_in.year, check_out.year + 1):
+        year_start = date(year, 1, 1)
+        first = max(check_in, year_start)
+        # date(year + 1, 1, 1) does not exist for the last year of date.max
+        last = check_out if year == check_out.year else date(year + 1, 1, 1)
+        if first >= last:
+            continue
+        start_bit = (first - year_start).days
+        masks[year] = ((1 << (last - first).days) - 1) << start_bit
+    return masks
+
+
+def to_bitmap(value):
+    return int.from_bytes(bytes(value), "little")
+
+
+def from_bitmap(value):
+    return value.to_bytes(max(1, (value.bit_length() + 7) // 8), "little")
+
+
+def occupancy_masks(bookings):
+    """{year: bitmask} of the nights held by ``bookings``"""
+    years = {}
+    for check_in, check_out in bookings:
+        for year, mask in night_masks(check_in, check_out).items():
+            years[year] = years.get(year, 0) | mask
+    return years
+
+
+def rebuild_room(room_id):
+    """Recompute every occupancy bitmap of a room from its bookings"""
+    bookings = (
+        Booking.objects.filter(room_id=room_id)
+        .exclude(status__in=RELEASED_STATUSES)
+        .values_list("check_in_date", "check_out_date")
+    )
+    years = occupancy_masks(bookings)
+    with transaction.atomic():
+        RoomOccupancy.objects.filter(room_id=room_id).exclude(year__in=years).delete()
+        for year, mask in years.items():
+            RoomOccupancy.objects.update_or_create(
+                room_id=room_id, year=year, defaults={"nights": from_bitmap(mask)}
+            )
+
+
+def rebuild_all():
+    """Recompute the whole index, returns the number of bitmaps written"""
+    rooms = {}
+    bookings = Booking.objects.exclude(status__in=RELEASED_STATUSES).values_list(
+        "room_id", "check_in_date", "check_out_date"
+    )
+    for room_id, check_in, check_out in bookings.iterator():
+        rooms.setdefault(room_id, []).append((check_in, check_out))
+
+    rows = [
+        RoomOccupancy(room_id=room_id, year=year, nights=from_bitmap(mask))
+        for room_id, stays in rooms.items()
+        for year, mask in occupancy_masks(stays).items()
+    ]
+    with transaction.atomic():
+        RoomOccupancy.objects.all().delete()
+        RoomOccupancy.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def booked_room_ids(check_in, check_out, room_ids=None):
+    """Ids of the rooms with at least one booked night in the stay"""
+    return booked_room_ids_by_stay([(check_in, check_out)], room_ids)[0]
+
+
+def booked_room_ids_by_stay(stays, room_ids=None):
+    """
+    booked_room_ids() for several (check_in, check_out) stays with a single
+    query; returns one set per stay.
+    """
+    masks = [night_masks(check_in, check_out) for check_in, check_out in stays]
+    occupancy = RoomOccupancy.objects.filter(year__in={year for mask in masks for year in mask})
+    if room_ids is not None:
+        occupancy = occupancy.filter(room_id__in=room_ids)
+
+    booked = [set() for _stay in stays]
+    for room_id, year, nights in occupancy.values_list("room_id", "year", "nights"):
+        nights = to_bitmap(nights)
+        for stay_masks, stay_booked in zip(masks, booked):
+            if nights & stay_masks.get(year, 0):
+                stay_booked.add(room_id)
+    return booked
+
+
+def available_rooms(rooms, check_in, check_out):
+    """Narrow a Room queryset to the rooms free for the whole stay"""
+    return rooms.exclude(id__in=booked_room_ids(check_in, check_out))
+
+
+def is_room_available(room, check_in, check_out):
+    return not room.is_out_of_order and room.id not in booked_room_ids(
+        check_in, check_out, room_ids=[room.id]
+    )
@@ -0,0 +1,91 @@
+"""
+Booking creation.
+
+Bookings for a room are serialised by locking the room row, so two
+simultaneous requests for overlapping nights cannot both succeed. A request
+may carry an idempotency key; retrying it returns the booking the first
+attempt created instead of creating another one. Keys are stored hashed
+together with the guest's email, so a key sent by someone else never
+finds another guest's booking, and a key the same guest reuses for
+another room, stay or party size is rejected.
+"""
+import hashlib
+
+from django.db import IntegrityError, transaction
+
+from .availability import RELEASED_STATUSES
+from .models import Booking, Room
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+
+def scoped_idempotency_key(key, guest_email):
+    """Stored form of a client's idempotency key, scoped to the guest's email"""
+    content = f"{guest_email.strip().lower()}\x1f{key}"
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def overlapping_bookings(room_id, check_in, check_out):
+    """Bookings of a room holding at least one night of the stay"""
+    return Booking.objects.filter(
+        room_id=room_id,
+        check_in_date__lt=check_out,
+        check_out_date__gt=check_in,
+    ).exclude(status__in=RELEASED_STATUSES)
+
+
+def _replayed(booking, room, check_in, check_out, fields):
+    """The booking a retry asked for, ValueError when it asked for another"""
+    if (
+        booking.room_id != room.pk
+        or booking.check_in_date != check_in
+        or booking.check_out_date != check_out
+        or booking.guests_count != fields.get("guests_count", booking.guests_count)
+    ):
+        raise ValueError("This booking request was already submitted with different details.")
+    return booking, False
+
+
+def create_booking(room, check_in, check_out, idempotency_key=None, **fields):
+    """
+    Create a pending booking of ``room`` from check_in to check_out.
+    ``fields`` are the remaining Booking fields (guest details, total...).
+    Returns (booking, created); created is False when ``idempotency_key``
+    was already used by the same guest email. Raises ValueError when the room is not bookable
+    or the key was used for a different booking.
+    """
+    idempotency_key = (idempotency_key or "").strip()[:IDEMPOTENCY_KEY_MAX_LENGTH] or None
+    if idempotency_key:
+        idempotency_key = scoped_idempotency_key(idempotency_key, fields.get("guest_email", ""))
+        existing = Booking.objects.filter(idempotency_key=idempotency_key).first()
+        if existing:
+            return _replayed(existing, room, check_in, check_out, fields)
+
+    try:
+        with transaction.atomic():
+            # Lock the room: concurrent bookings of it wait here until we commit
+            room = Room.objects.select_for_update().get(pk=room.pk)
+            if idempotency_key:
+                existing = Booking.objects.filter(idempotency_key=idempotency_key).first()
+                if existing:
+                    return _replayed(existing, room, check_in, check_out, fields)
+            if room.is_out_of_order:
+                raise ValueError("Sorry, this room is not available for booking.")
+            if overlapping_bookings(room.pk, check_in, check_out).exists():
+                raise ValueError("Sorry, this room is already booked for some of those dates.")
+
+            booking = Booking.objects.create(
+                room=room,
+                check_in_date=check_in,
+                check_out_date=check_out,
+                idempotency_key=idempotency_key,
+                **fields,
+            )
+    except IntegrityError:
+        # Another request with the same key committed first
+        if idempotency_key:
+            existing = Booking.objects.filter(idempotency_key=idempotency_key).first()
+            if existing:
+                return _replayed(existing, room, check_in, check_out, fields)
+        raise
+    return booking, True
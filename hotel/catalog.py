@@ -0,0 +1,102 @@
+"""
+In-process room catalog.
+
+Rooms, room types and amenities change a few times a day but the hotel
+listing reads all of them on every request. Each worker process keeps one
+immutable snapshot of them, tagged with a catalog version stamp stored in
+the shared cache. Signals bump the stamp after any change is committed, and
+the next request in every process then loads a fresh snapshot.
+"""
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from .models import Amenity, Room, RoomAmenity, RoomImage, RoomType
+
+CATALOG_VERSION_CACHE_KEY = "hotel:catalog_version"
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    # Room instances with room_type loaded and, as plain attributes,
+    # cover_image, available_amenities and amenity_ids
+    rooms: tuple
+    room_types: tuple
+    amenities: tuple
+
+    @property
+    def price_range(self):
+        prices = [room_type.price_per_night for room_type in self.room_types]
+        return {
+            "min_price": min(prices, default=None),
+            "max_price": max(prices, default=None),
+        }
+
+    @property
+    def average_price(self):
+        if not self.room_types:
+            return None
+        total = sum((room_type.price_per_night for room_type in self.room_types), Decimal(0))
+        return total / len(self.room_types)
+
+
+def load_snapshot(version):
+    rooms = list(
+        Room.objects.select_related("room_type").prefetch_related(
+            Prefetch("room_images", queryset=RoomImage.objects.order_by("id")),
+            Prefetch("roomamenity_set", queryset=RoomAmenity.objects.select_related("amenity")),
+        )
+    )
+    for room in rooms:
+        images = list(room.room_images.all())
+        links = list(room.roomamenity_set.all())
+        room.cover_image = images[0] if images else None
+        room.amenity_ids = frozenset(link.amenity_id for link in links if link.is_available)
+        room.available_amenities = tuple(
+            sorted(
+                (link.amenity for link in links if link.is_available and link.amenity.is_active),
+                key=lambda amenity: amenity.name,
+            )
+        )
+
+    return CatalogSnapshot(
+        version=version,
+        rooms=tuple(rooms),
+        room_types=tuple(RoomType.objects.order_by("name")),
+        amenities=tuple(Amenity.objects.filter(is_active=True).order_by("name")),
+    )
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def get_catalog():
+    """The snapshot for the current catalog version, loaded if needed"""
+    global _snapshot
+
+    version = cache.get(CATALOG_VERSION_CACHE_KEY, 0)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    with _lock:
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = load_snapshot(version)
+        return _snapshot
+
+
+def _bump():
+    try:
+        cache.incr(CATALOG_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_CACHE_KEY, 1, None)
+
+
+def bump_version():
+    """Make every process reload the catalog once the change is committed"""
+    transaction.on_commit(_bump)
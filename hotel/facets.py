@@ -0,0 +1,79 @@
+"""
+Facet counts for the room search.
+
+Every facet (room type, amenity, capacity, price bucket) counts the rooms
+that match all the *other* active filters, so each count says how many
+rooms the user would see after picking that value. Counts and the filtered
+room list come out of one pass over the candidate rooms.
+"""
+from bisect import bisect_right
+from collections import Counter
+from decimal import ROUND_DOWN, ROUND_UP, Decimal
+
+FACETS = ("room_type", "amenity", "capacity", "price")
+
+
+def price_buckets(min_price, max_price, count=4):
+    """
+    Up to ``count`` equally wide (low, high) price ranges covering
+    min..max, with round bounds.
+    """
+    if min_price is None or max_price is None:
+        return []
+    if min_price == max_price:
+        return [(min_price, max_price)]
+    step = (max_price - min_price) / count
+    # Round the step up to two significant digits, e.g. 37512 -> 38000
+    exponent = max(step.adjusted() - 1, 0)
+    unit = Decimal(10) ** exponent
+    step = (step / unit).quantize(Decimal(1), rounding=ROUND_UP) * unit
+    low = (min_price / unit).quantize(Decimal(1), rounding=ROUND_DOWN) * unit
+    buckets = []
+    while low <= max_price and len(buckets) < count:
+        buckets.append((low, low + step))
+        low += step
+    # Rounding may leave the top price just outside the last bucket
+    last_low, last_high = buckets[-1]
+    buckets[-1] = (last_low, max(last_high, max_price))
+    return buckets
+
+
+def search(rooms, filters, buckets=(), conjunctive=()):
+    """
+    Filter ``rooms`` and count facets in one pass.
+
+    ``filters`` maps facet names to predicates taking a room; missing facets
+    are not filtered on. Facets listed in ``conjunctive`` combine their
+    values with AND, so they only count rooms matching every filter.
+    Returns (matching rooms, {facet: Counter}) where the Counters are keyed
+    by room type id, amenity id, capacity and price bucket index.
+    """
+    counts = {facet: Counter() for facet in FACETS}
+    bucket_lows = [low for low, _high in buckets]
+    matched = []
+
+    for room in rooms:
+        failed = [facet for facet, predicate in filters.items() if not predicate(room)]
+        if len(failed) > 1:
+            continue
+        if not failed:
+            matched.append(room)
+        # A room failing a single filter still counts for that facet's values
+        if failed and failed[0] in conjunctive:
+            continue
+        for facet in failed or FACETS:
+            if facet == "room_type":
+                counts[facet][room.room_type_id] += 1
+            elif facet == "amenity":
+                counts[facet].update(room.amenity_ids)
+            elif facet == "capacity":
+                counts[facet][room.room_type.capacity] += 1
+            elif bucket_lows:
+                index = bisect_right(bucket_lows, room.room_type.price_per_night) - 1
+                counts[facet][max(index, 0)] += 1
+    return matched, counts
+
+
+def at_least(counter, value):
+    """Rooms counted under a key of ``counter`` that is >= ``value``"""
+    return sum(count for key, count in counter.items() if key >= value)
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from hotel.models import ReviewPlatform, GuestReview
+from hotel.review_aggregates import upsert_reviews
 from datetime import datetime, timedelta
 from decimal import Decimal
 import random
@@ -126,13 +127,13 @@ class Command(BaseCommand):
                 self.stdout.write(f"Created platform: {platform.display_name}")
 
         # Create reviews for different platforms
-        review_count = 0
+        reviews = []
 
         # Add Lao reviews to Agoda (popular in Southeast Asia)
         for review_data in lao_reviews:
             review_date = datetime.now() - timedelta(days=random.randint(1, 90))
 
-            review = GuestReview.objects.create(
+            reviews.append(GuestReview(
                 platform=platforms['agoda'],
                 reviewer_name=review_data['reviewer_name'],
                 review_text=review_data['review_text'],
@@ -142,9 +143,7 @@ class Command(BaseCommand):
                 is_active=True,
                 is_verified=True,
                 helpful_count=random.randint(0, 15)
-            )
-            review_count += 1
-            self.stdout.write(f"Created Lao review: {review.reviewer_name} - {review.rating}/10")
+            ))
 
         # Add English reviews to various platforms
         platform_keys = list(platforms.keys())
@@ -152,7 +151,7 @@ class Command(BaseCommand):
             platform_key = platform_keys[i % len(platform_keys)]
             review_date = datetime.now() - timedelta(days=random.randint(1, 120))
 
-            review = GuestReview.objects.create(
+            reviews.append(GuestReview(
                 platform=platforms[platform_key],
                 reviewer_name=review_data['reviewer_name'],
                 review_text=review_data['review_text'],
@@ -162,10 +161,15 @@ class Command(BaseCommand):
                 is_active=True,
                 is_verified=True,
                 helpful_count=random.randint(0, 25)
-            )
-            review_count += 1
-            self.stdout.write(f"Created English review: {review.reviewer_name} - {review.rating}/10 on {platform_key}")
+            ))
+
+        # Reviews created by an earlier run keep their random date
+        created_count, updated_count = upsert_reviews(
+            reviews, update_fields=('reviewer_name', 'review_text', 'rating', 'trip_type')
+        )
 
         self.stdout.write(
-            self.style.SUCCESS(f'\nSuccessfully created {review_count} realistic customer reviews!')
+            self.style.SUCCESS(
+                f'\nSuccessfully created {created_count} and updated {updated_count} realistic customer reviews!'
+            )
         )
\ No newline at end of file
@@ -3,6 +3,7 @@ from django.utils import timezone
 from datetime import timedelta
 import random
 from hotel.models import ReviewPlatform, GuestReview
+from hotel.review_aggregates import upsert_reviews
 
 
 class Command(BaseCommand):
@@ -81,7 +82,7 @@ class Command(BaseCommand):
             )
             return
 
-        created_count = 0
+        reviews = []
 
         for i in range(count):
             # Select random review template and platform
@@ -99,24 +100,29 @@ class Command(BaseCommand):
             # Special handling for Airbnb
             is_superhost = platform.name == "airbnb" and random.choice([True, False])
 
-            review = GuestReview.objects.create(
-                platform=platform,
-                reviewer_name=review_template["reviewer_name"],
-                review_text=review_template["review_text"],
-                rating=round(rating, 1),
-                trip_type=review_template["trip_type"],
-                review_date=review_date,
-                is_featured=random.choice([True, False]) if i < 5 else False,
-                is_verified=True,
-                is_superhost_review=is_superhost,
-                helpful_count=random.randint(0, 15),
+            reviews.append(
+                GuestReview(
+                    platform=platform,
+                    reviewer_name=review_template["reviewer_name"],
+                    review_text=review_template["review_text"],
+                    rating=round(rating, 1),
+                    trip_type=review_template["trip_type"],
+                    review_date=review_date,
+                    is_featured=random.choice([True, False]) if i < 5 else False,
+                    is_verified=True,
+                    is_superhost_review=is_superhost,
+                    helpful_count=random.randint(0, 15),
+                )
             )
 
-            created_count += 1
-
-            if created_count % 5 == 0:
-                self.stdout.write(f"Created {created_count} reviews...")
+        # Samples already imported are kept as they are, apart from template
+        # edits; their random rating and date are not rerolled
+        created_count, updated_count = upsert_reviews(
+            reviews, update_fields=("reviewer_name", "review_text", "trip_type")
+        )
 
         self.stdout.write(
-            self.style.SUCCESS(f"Successfully created {created_count} sample reviews!")
+            self.style.SUCCESS(
+                f"Successfully created {created_count} and updated {updated_count} sample reviews!"
+            )
         )
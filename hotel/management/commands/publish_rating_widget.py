@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from hotel.widget import publish
+
+
+class Command(BaseCommand):
+    help = "Render the embeddable rating widget to static files in the media directory"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Publishing rating widget...")
+        version = publish()
+        self.stdout.write(self.style.SUCCESS(f"Published rating widget version {version}"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from hotel.amenities import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Recompute the amenity bitmask of every room from RoomAmenity"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding room amenity masks...")
+        updated = rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"Updated {updated} rooms"))
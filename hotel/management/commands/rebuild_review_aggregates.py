@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from hotel.review_aggregates import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Recompute platform ratings, rating histograms and the review summary from GuestReview"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding review aggregates...")
+        platforms = rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"Updated {platforms} platforms"))
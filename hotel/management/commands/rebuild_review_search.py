@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from hotel.review_search import install
+
+
+class Command(BaseCommand):
+    help = "Create the full-text search index of GuestReview if it is missing (SQLite: and reindex every review)"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding the review search index...")
+        install(connection)
+        self.stdout.write(self.style.SUCCESS(f"Review search index ready ({connection.vendor})"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from hotel.availability import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Rebuild the room availability index from the Booking table"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding room occupancy...")
+        written = rebuild_all()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} room occupancy bitmaps"))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from hotel.models import ReviewPlatform, ReviewCategory, PlatformRating, CategoryRating
+from hotel.models import ReviewPlatform, ReviewCategory, CategoryRating
+from hotel.review_aggregates import rebuild_all
 
 class Command(BaseCommand):
     help = 'Setup initial review platforms and categories'
@@ -24,8 +25,6 @@ class Command(BaseCommand):
                 'logo_url': 'https://cdn.worldota.net/t/1024x768/content/6f/22/6f22e0f5ad717b5e90bcea3ca8f34e4c8c8e2b5e.jpeg',
                 'brand_color': '#FF6B35',
                 'display_order': 1,
-                'overall_rating': 4.7,
-                'total_reviews': 1234,
                 'categories': [
                     {'name': 'Service', 'rating': 9.4},
                     {'name': 'Cleanliness', 'rating': 9.6},
@@ -38,8 +37,6 @@ class Command(BaseCommand):
                 'logo_url': 'https://cf.bstatic.com/static/img/b26logo/rebrand/logo_blue_150px.png',
                 'brand_color': '#003580',
                 'display_order': 2,
-                'overall_rating': 4.9,
-                'total_reviews': 896,
                 'categories': [
                     {'name': 'Staff', 'rating': 9.8},
                     {'name': 'Facilities', 'rating': 9.5},
@@ -52,8 +49,6 @@ class Command(BaseCommand):
                 'logo_url': 'https://a0.muscache.com/airbnb/static/logos/belo-200x200-4d851c5b28f61931bf1df28dd15e60ef.png',
                 'brand_color': '#FF5A5F',
                 'display_order': 3,
-                'overall_rating': 4.9,
-                'total_reviews': 342,
                 'categories': [
                     {'name': 'Check-in', 'rating': 4.9},
                     {'name': 'Communication', 'rating': 4.8},
@@ -82,15 +77,6 @@ class Command(BaseCommand):
                     self.style.SUCCESS(f'Created platform: {platform.display_name}')
                 )
             
-            # Create or update platform rating
-            platform_rating, created = PlatformRating.objects.get_or_create(
-                platform=platform,
-                defaults={
-                    'overall_rating': platform_data['overall_rating'],
-                    'total_reviews': platform_data['total_reviews'],
-                }
-            )
-            
             # Create categories and ratings
             for cat_data in platform_data['categories']:
                 category, created = ReviewCategory.objects.get_or_create(
@@ -105,6 +91,9 @@ class Command(BaseCommand):
                     defaults={'rating': cat_data['rating']}
                 )
         
+        # Platform ratings come from the platforms' reviews
+        rebuild_all()
+        
         self.stdout.write(
             self.style.SUCCESS('Successfully setup review platforms!')
         )
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from hotel.models import ReviewPlatform
+from hotel.review_sync import sync_platform
+
+# Unreadable rows listed per platform, the rest are only counted
+ERRORS_SHOWN = 20
+
+
+class Command(BaseCommand):
+    help = "Ingest new and changed reviews from the platform export files in REVIEW_SYNC_DIR"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "platforms",
+            nargs="*",
+            help="Names of the platforms to sync (default: all active platforms)",
+        )
+        parser.add_argument(
+            "--dir",
+            default=None,
+            help=f"Directory of the export files (default: {settings.REVIEW_SYNC_DIR})",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Read every export row, not only those changed since the last sync",
+        )
+
+    def handle(self, *args, **options):
+        platforms = ReviewPlatform.objects.filter(is_active=True)
+        if options["platforms"]:
+            platforms = ReviewPlatform.objects.filter(name__in=options["platforms"])
+            unknown = set(options["platforms"]) - set(platforms.values_list("name", flat=True))
+            if unknown:
+                raise CommandError(f"Unknown platforms: {', '.join(sorted(unknown))}")
+
+        for platform in platforms:
+            self.stdout.write(f"Syncing {platform.display_name}...")
+            result = sync_platform(platform, options["dir"], full=options["full"])
+            for location, error in result.errors[:ERRORS_SHOWN]:
+                self.stderr.write(self.style.WARNING(f"  {location}: {error}"))
+            if len(result.errors) > ERRORS_SHOWN:
+                self.stderr.write(
+                    self.style.WARNING(f"  ...and {len(result.errors) - ERRORS_SHOWN} more errors")
+                )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"  {result.created} new, {result.updated} updated, "
+                    f"{result.unchanged} unchanged, {result.skipped} synced before, "
+                    f"{result.superseded} superseded, "
+                    f"{result.adopted} matched to imported reviews, "
+                    f"{len(result.errors)} errors"
+                )
+            )
@@ -0,0 +1,30 @@
+# Generated by Django 5.2 on 2026-10-18 16:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0015_image_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('nights', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='hotel.room')),
+            ],
+            options={
+                'verbose_name': 'Room Occupancy',
+                'verbose_name_plural': 'Room Occupancy',
+                'indexes': [models.Index(fields=['year'], name='hotel_roomo_year_ef49c0_idx')],
+                'unique_together': {('room', 'year')},
+            },
+        ),
+    ]
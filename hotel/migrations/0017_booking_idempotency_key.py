@@ -0,0 +1,22 @@
+# Generated by Django 5.2 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0016_roomoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, help_text='Client supplied key that makes retried booking requests safe', max_length=64, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['room', 'check_in_date', 'check_out_date'], name='hotel_booki_room_id_1aacad_idx'),
+        ),
+    ]
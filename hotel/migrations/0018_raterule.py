@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 16:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0017_booking_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('start_date', models.DateField(blank=True, help_text='First night, leave empty for no start', null=True)),
+                ('end_date', models.DateField(blank=True, help_text='Last night, leave empty for no end', null=True)),
+                ('on_monday', models.BooleanField(default=True)),
+                ('on_tuesday', models.BooleanField(default=True)),
+                ('on_wednesday', models.BooleanField(default=True)),
+                ('on_thursday', models.BooleanField(default=True)),
+                ('on_friday', models.BooleanField(default=True)),
+                ('on_saturday', models.BooleanField(default=True)),
+                ('on_sunday', models.BooleanField(default=True)),
+                ('adjustment_type', models.CharField(choices=[('fixed', 'Fixed nightly price'), ('percent', 'Percent change'), ('amount', 'Amount change')], default='percent', max_length=10)),
+                ('value', models.DecimalField(decimal_places=2, help_text='Nightly price, percent (e.g. 20 or -10) or amount (e.g. 5 or -5)', max_digits=10)),
+                ('priority', models.PositiveIntegerField(default=0, help_text='Higher priorities are applied last')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('room_type', models.ForeignKey(blank=True, help_text='Leave empty to apply to every room type', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rate_rules', to='hotel.roomtype')),
+            ],
+            options={
+                'verbose_name': 'Rate Rule',
+                'verbose_name_plural': 'Rate Rules',
+                'ordering': ['priority', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+def assign_bits_and_masks(apps, schema_editor):
+    Amenity = apps.get_model('hotel', 'Amenity')
+    Room = apps.get_model('hotel', 'Room')
+    RoomAmenity = apps.get_model('hotel', 'RoomAmenity')
+
+    # The first 63 amenities get a bit of the signed 64 bit mask
+    bits = {}
+    for bit, amenity in enumerate(Amenity.objects.order_by('id')[:63]):
+        amenity.bit = bit
+        amenity.save(update_fields=['bit'])
+        bits[amenity.id] = bit
+
+    masks = {}
+    for room_id, amenity_id in RoomAmenity.objects.filter(is_available=True).values_list('room_id', 'amenity_id'):
+        if amenity_id in bits:
+            masks[room_id] = masks.get(room_id, 0) | (1 << bits[amenity_id])
+    for room_id, mask in masks.items():
+        Room.objects.filter(pk=room_id).update(amenity_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0018_raterule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amenity',
+            name='bit',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, help_text='Position of this amenity in Room.amenity_mask', null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='amenity_mask',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(assign_bits_and_masks, migrations.RunPython.noop),
+    ]
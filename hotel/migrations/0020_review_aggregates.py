@@ -0,0 +1,79 @@
+# Generated by Django 5.2 on 2026-10-18 16:48
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def compute_aggregates(apps, schema_editor):
+    GuestReview = apps.get_model('hotel', 'GuestReview')
+    PlatformRating = apps.get_model('hotel', 'PlatformRating')
+    RatingBucket = apps.get_model('hotel', 'RatingBucket')
+    ReviewPlatform = apps.get_model('hotel', 'ReviewPlatform')
+    ReviewSummary = apps.get_model('hotel', 'ReviewSummary')
+
+    totals = {}
+    buckets = {}
+    for platform_id, rating in GuestReview.objects.filter(is_active=True).values_list('platform_id', 'rating').iterator():
+        count, rating_sum = totals.get(platform_id, (0, Decimal(0)))
+        totals[platform_id] = (count + 1, rating_sum + rating)
+        key = (platform_id, min(int(rating), 10))
+        buckets[key] = buckets.get(key, 0) + 1
+
+    def average(count, rating_sum):
+        return (rating_sum / count).quantize(Decimal('0.1')) if count else Decimal('0.0')
+
+    for platform_id in ReviewPlatform.objects.values_list('id', flat=True):
+        count, rating_sum = totals.get(platform_id, (0, Decimal(0)))
+        PlatformRating.objects.update_or_create(
+            platform_id=platform_id,
+            defaults={'total_reviews': count, 'rating_sum': rating_sum, 'overall_rating': average(count, rating_sum)},
+        )
+    RatingBucket.objects.bulk_create(
+        RatingBucket(platform_id=platform_id, rating=rating, review_count=count)
+        for (platform_id, rating), count in buckets.items()
+    )
+
+    count = sum(count for count, _sum in totals.values())
+    rating_sum = sum((rating_sum for _count, rating_sum in totals.values()), Decimal(0))
+    ReviewSummary.objects.update(total_reviews=count, rating_sum=rating_sum, average_rating=average(count, rating_sum))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0019_amenity_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='platformrating',
+            name='rating_sum',
+            field=models.DecimalField(decimal_places=1, default=Decimal('0.0'), editable=False, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='reviewsummary',
+            name='rating_sum',
+            field=models.DecimalField(decimal_places=1, default=Decimal('0.0'), editable=False, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='platformrating',
+            name='overall_rating',
+            field=models.DecimalField(decimal_places=1, default=Decimal('0.0'), max_digits=4, validators=[django.core.validators.MinValueValidator(Decimal('0.0')), django.core.validators.MaxValueValidator(Decimal('10.0'))]),
+        ),
+        migrations.CreateModel(
+            name='RatingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.PositiveSmallIntegerField()),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('platform', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_buckets', to='hotel.reviewplatform')),
+            ],
+            options={
+                'ordering': ['platform', 'rating'],
+                'unique_together': {('platform', 'rating')},
+            },
+        ),
+        migrations.RunPython(compute_aggregates, migrations.RunPython.noop),
+    ]
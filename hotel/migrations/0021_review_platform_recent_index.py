@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0020_review_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='guestreview',
+            index=models.Index(fields=['platform', 'is_active', 'review_date'], name='hotel_guest_platfor_380bbd_idx'),
+        ),
+    ]
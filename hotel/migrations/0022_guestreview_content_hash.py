@@ -0,0 +1,100 @@
+# Generated by Django 5.2 on 2026-10-19 00:20
+
+import hashlib
+import unicodedata
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def _normalize(text):
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+
+def content_hash(platform_id, reviewer_name, review_text):
+    content = '\x1f'.join([str(platform_id), _normalize(reviewer_name), _normalize(review_text)])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def recompute_aggregates(apps):
+    GuestReview = apps.get_model('hotel', 'GuestReview')
+    PlatformRating = apps.get_model('hotel', 'PlatformRating')
+    RatingBucket = apps.get_model('hotel', 'RatingBucket')
+    ReviewSummary = apps.get_model('hotel', 'ReviewSummary')
+
+    totals = {}
+    buckets = {}
+    for platform_id, rating in GuestReview.objects.filter(is_active=True).values_list('platform_id', 'rating').iterator():
+        count, rating_sum = totals.get(platform_id, (0, Decimal(0)))
+        totals[platform_id] = (count + 1, rating_sum + rating)
+        key = (platform_id, min(int(rating), 10))
+        buckets[key] = buckets.get(key, 0) + 1
+
+    def average(count, rating_sum):
+        return (rating_sum / count).quantize(Decimal('0.1')) if count else Decimal('0.0')
+
+    for rating in PlatformRating.objects.all():
+        count, rating_sum = totals.get(rating.platform_id, (0, Decimal(0)))
+        PlatformRating.objects.filter(pk=rating.pk).update(
+            total_reviews=count, rating_sum=rating_sum, overall_rating=average(count, rating_sum)
+        )
+    RatingBucket.objects.all().delete()
+    RatingBucket.objects.bulk_create(
+        RatingBucket(platform_id=platform_id, rating=rating, review_count=count)
+        for (platform_id, rating), count in buckets.items()
+    )
+
+    count = sum(count for count, _sum in totals.values())
+    rating_sum = sum((rating_sum for _count, rating_sum in totals.values()), Decimal(0))
+    ReviewSummary.objects.update(total_reviews=count, rating_sum=rating_sum, average_rating=average(count, rating_sum))
+
+
+def hash_reviews(apps, schema_editor):
+    """
+    Hash the reviews and delete all but one review of each set of
+    duplicates: an active one before an inactive one, then the most recent.
+
+    The deleted duplicates are gone for good, together with their own staff
+    curation (is_featured), helpful votes and dates, and reversing the
+    migration does not bring them back. Back up the hotel_guestreview table
+    before migrating if they matter.
+    """
+    GuestReview = apps.get_model('hotel', 'GuestReview')
+
+    seen = set()
+    duplicates = []
+    batch = []
+    reviews = GuestReview.objects.only('platform_id', 'reviewer_name', 'review_text', 'is_active', 'review_date')
+    for review in reviews.order_by('-is_active', '-review_date', '-id').iterator():
+        review.content_hash = content_hash(review.platform_id, review.reviewer_name, review.review_text)
+        if review.content_hash in seen:
+            duplicates.append(review.pk)
+            continue
+        seen.add(review.content_hash)
+        batch.append(review)
+        if len(batch) >= 1000:
+            GuestReview.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    if batch:
+        GuestReview.objects.bulk_update(batch, ['content_hash'])
+
+    if duplicates:
+        for start in range(0, len(duplicates), 1000):
+            GuestReview.objects.filter(pk__in=duplicates[start:start + 1000]).delete()
+        recompute_aggregates(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0021_review_platform_recent_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guestreview',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(hash_reviews, migrations.RunPython.noop),
+    ]
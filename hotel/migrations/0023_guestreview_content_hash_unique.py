@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0022_guestreview_content_hash'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='guestreview',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-19 00:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def install_search(apps, schema_editor):
+    from hotel import review_search
+
+    review_search.install(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    from hotel import review_search
+
+    review_search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0023_guestreview_content_hash_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSearchEntry',
+            fields=[
+                ('review', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='hotel.guestreview')),
+                ('match', models.TextField(db_column='hotel_guestreview_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'hotel_guestreview_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 17:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def restore_search(apps, schema_editor):
+    # Adding external_id rebuilds the review table on SQLite, which drops the
+    # triggers of its search index
+    from hotel import review_search
+
+    review_search.install(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0024_review_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='guestreview',
+            name='external_id',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.RunPython(restore_search, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='ReviewSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_changed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_external_id', models.CharField(blank=True, max_length=100)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('platform', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sync_state', to='hotel.reviewplatform')),
+            ],
+            options={
+                'verbose_name': 'Review Sync State',
+                'verbose_name_plural': 'Review Sync States',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-18 17:17
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def fill_rating_days(apps, schema_editor):
+    GuestReview = apps.get_model('hotel', 'GuestReview')
+    RatingDay = apps.get_model('hotel', 'RatingDay')
+
+    rows = (
+        GuestReview.objects.filter(is_active=True).order_by()
+        .annotate(day=TruncDate('review_date')).values('platform_id', 'day')
+        .annotate(count=Count('id'), rating_sum=Sum('rating'))
+        .values_list('platform_id', 'day', 'count', 'rating_sum')
+    )
+    RatingDay.objects.bulk_create(
+        RatingDay(platform_id=platform_id, day=day, review_count=count, rating_sum=rating_sum)
+        for platform_id, day, count, rating_sum in rows
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotel', '0025_review_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('review_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.DecimalField(decimal_places=1, default=Decimal('0.0'), max_digits=12)),
+                ('platform', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_days', to='hotel.reviewplatform')),
+            ],
+            options={
+                'ordering': ['platform', 'day'],
+                'unique_together': {('platform', 'day')},
+            },
+        ),
+        migrations.RunPython(fill_rating_days, migrations.RunPython.noop),
+    ]
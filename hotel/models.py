@@ -1,4 +1,8 @@
-from django.db import models
+import hashlib
+import unicodedata
+
+from django.db import IntegrityError, models, transaction
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.utils.text import slugify
@@ -64,8 +68,18 @@ class Amenity(models.Model):
     )
     is_premium = models.BooleanField(default=False, help_text="Mark as premium amenity")
     is_active = models.BooleanField(default=True)
+    bit = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        help_text="Position of this amenity in Room.amenity_mask",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Room.amenity_mask is a signed 64 bit integer
+    MAX_BITS = 63
+
     class Meta:
         ordering = ["name"]
         verbose_name = "Amenity"
@@ -74,6 +88,37 @@ class Amenity(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def free_bit(cls):
+        """Lowest bit of the room amenity mask no amenity owns, None when all are taken"""
+        used = set(cls.objects.exclude(bit=None).values_list("bit", flat=True))
+        return next((bit for bit in range(cls.MAX_BITS) if bit not in used), None)
+
+    def save(self, *args, **kwargs):
+        """
+        Give new amenities the lowest free bit of the room amenity mask.
+        Amenities saved at the same time may pick the same bit; the unique
+        constraint rejects all but one, and the others try the next free bit.
+        """
+        if self.bit is not None:
+            return super().save(*args, **kwargs)
+        while True:
+            self.bit = self.free_bit()
+            if self.bit is None:
+                return super().save(*args, **kwargs)
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                taken = Amenity.objects.filter(bit=self.bit).exclude(pk=self.pk).exists()
+                if not taken:
+                    self.bit = None
+                    raise
+
+    @property
+    def mask(self):
+        return 0 if self.bit is None else 1 << self.bit
+
 
 class Room(models.Model):
     room_type = models.ForeignKey(
@@ -94,6 +139,9 @@ class Room(models.Model):
     maintenance_notes = models.TextField(blank=True)
     is_out_of_order = models.BooleanField(default=False)
 
+    # One bit (Amenity.bit) per available amenity, kept in sync by signals
+    amenity_mask = models.BigIntegerField(default=0, db_index=True, editable=False)
+
     # Meta information
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
@@ -128,11 +176,11 @@ class Room(models.Model):
 
     @property
     def total_price_with_fees(self):
-        """Calculate total price including service fees and taxes"""
-        base_price = self.room_type.price_per_night
-        service_fee = 15
-        taxes = 12
-        return base_price + service_fee + taxes
+        """Tonight's price including service fees and taxes"""
+        from .rates import nightly_price, fees
+
+        service_fee, taxes = fees(1)
+        return nightly_price(self.room_type_id) + service_fee + taxes
 
     def get_available_amenities(self):
         """Get all available amenities for this room"""
@@ -185,6 +233,9 @@ class Room(models.Model):
 class RoomImage(models.Model):
     room = models.ForeignKey(Room, related_name="room_images", on_delete=models.CASCADE)
     image = models.ImageField(upload_to="room/")
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     alt_text = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
 
@@ -277,12 +328,21 @@ class Booking(models.Model):
     special_requests = models.TextField(blank=True)
 
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    idempotency_key = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Client supplied key that makes retried booking requests safe",
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["room", "check_in_date", "check_out_date"])]
         verbose_name = "Booking"
         verbose_name_plural = "Bookings"
 
@@ -294,6 +354,97 @@ class Booking(models.Model):
         return (self.check_out_date - self.check_in_date).days
 
 
+class RateRule(models.Model):
+    """
+    Seasonal and weekday pricing. A rule changes the nightly price of the
+    nights it matches; rules are applied in priority order on top of
+    RoomType.price_per_night by hotel.rates.
+    """
+
+    ADJUSTMENT_CHOICES = [
+        ("fixed", "Fixed nightly price"),
+        ("percent", "Percent change"),
+        ("amount", "Amount change"),
+    ]
+
+    name = models.CharField(max_length=100)
+    room_type = models.ForeignKey(
+        RoomType,
+        on_delete=models.CASCADE,
+        related_name="rate_rules",
+        null=True,
+        blank=True,
+        help_text="Leave empty to apply to every room type",
+    )
+    start_date = models.DateField(null=True, blank=True, help_text="First night, leave empty for no start")
+    end_date = models.DateField(null=True, blank=True, help_text="Last night, leave empty for no end")
+
+    # Nights of the week the rule applies to
+    on_monday = models.BooleanField(default=True)
+    on_tuesday = models.BooleanField(default=True)
+    on_wednesday = models.BooleanField(default=True)
+    on_thursday = models.BooleanField(default=True)
+    on_friday = models.BooleanField(default=True)
+    on_saturday = models.BooleanField(default=True)
+    on_sunday = models.BooleanField(default=True)
+
+    adjustment_type = models.CharField(max_length=10, choices=ADJUSTMENT_CHOICES, default="percent")
+    value = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text="Nightly price, percent (e.g. 20 or -10) or amount (e.g. 5 or -5)",
+    )
+    priority = models.PositiveIntegerField(default=0, help_text="Higher priorities are applied last")
+    is_active = models.BooleanField(default=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["priority", "id"]
+        verbose_name = "Rate Rule"
+        verbose_name_plural = "Rate Rules"
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def weekdays(self):
+        """Weekday numbers (0 = Monday) the rule applies to"""
+        flags = (
+            self.on_monday,
+            self.on_tuesday,
+            self.on_wednesday,
+            self.on_thursday,
+            self.on_friday,
+            self.on_saturday,
+            self.on_sunday,
+        )
+        return [day for day, applies in enumerate(flags) if applies]
+
+
+class RoomOccupancy(models.Model):
+    """
+    Booked nights of a room in one calendar year as a bitmap, bit N set when
+    the night starting on day N (0 = January 1st) is taken. Built from
+    Booking rows by hotel.availability, never edited by hand.
+    """
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="occupancy")
+    year = models.PositiveSmallIntegerField()
+    nights = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("room", "year")
+        indexes = [models.Index(fields=["year"])]
+        verbose_name = "Room Occupancy"
+        verbose_name_plural = "Room Occupancy"
+
+    def __str__(self):
+        return f"Room {self.room_id} - {self.year}"
+
+
 class Review(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField()
@@ -360,7 +511,10 @@ class ReviewCategory(models.Model):
 
 
 class PlatformRating(models.Model):
-    """Overall ratings for each platform"""
+    """
+    Overall ratings for each platform, kept up to date from the platform's
+    active GuestReviews (see hotel.review_aggregates)
+    """
 
     platform = models.OneToOneField(
         ReviewPlatform, on_delete=models.CASCADE, related_name="rating"
@@ -368,12 +522,16 @@ class PlatformRating(models.Model):
     overall_rating = models.DecimalField(
         max_digits=4,
         decimal_places=1,
+        default=Decimal("0.0"),
         validators=[
             MinValueValidator(Decimal("0.0")),
             MaxValueValidator(Decimal("10.0")),
         ],
     )
     total_reviews = models.PositiveIntegerField(default=0)
+    rating_sum = models.DecimalField(
+        max_digits=12, decimal_places=1, default=Decimal("0.0"), editable=False
+    )
     last_updated = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -384,6 +542,50 @@ class PlatformRating(models.Model):
         return f"{self.platform.display_name} - {self.overall_rating}/10.0"
 
 
+class RatingBucket(models.Model):
+    """
+    Number of active reviews of a platform whose rating rounds down to
+    ``rating``, one row per platform and whole point of the 0-10 scale
+    """
+
+    platform = models.ForeignKey(
+        ReviewPlatform, on_delete=models.CASCADE, related_name="rating_buckets"
+    )
+    rating = models.PositiveSmallIntegerField()
+    review_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["platform", "rating"]
+        unique_together = ["platform", "rating"]
+
+    def __str__(self):
+        return f"{self.platform.display_name} - {self.rating}: {self.review_count}"
+
+
+class RatingDay(models.Model):
+    """
+    Number and rating sum of the active reviews of a platform dated ``day``
+    (in the site's time zone), the input of the rating trends (see
+    hotel.review_trends)
+    """
+
+    platform = models.ForeignKey(
+        ReviewPlatform, on_delete=models.CASCADE, related_name="rating_days"
+    )
+    day = models.DateField()
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.DecimalField(
+        max_digits=12, decimal_places=1, default=Decimal("0.0")
+    )
+
+    class Meta:
+        ordering = ["platform", "day"]
+        unique_together = ["platform", "day"]
+
+    def __str__(self):
+        return f"{self.platform.display_name} - {self.day}: {self.review_count}"
+
+
 class CategoryRating(models.Model):
     """Ratings for specific categories within each platform"""
 
@@ -414,6 +616,35 @@ class CategoryRating(models.Model):
         return (self.rating / 10.0) * 100
 
 
+# Fields that review_content_hash() covers
+HASHED_REVIEW_FIELDS = {"platform", "platform_id", "reviewer_name", "review_text", "external_id"}
+
+
+def _normalize_review_text(text):
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def review_content_hash(platform_id, reviewer_name, review_text, external_id=""):
+    """
+    Identity of a review: a SHA-256 of its platform and its id on the
+    platform when known (synced reviews), otherwise its reviewer name and
+    text normalized for case, Unicode form and whitespace. The rating and
+    dates are left out, so a re-imported review that was edited on the
+    platform matches the stored one.
+    """
+    if external_id:
+        content = f"{platform_id}\x1fid:{external_id}"
+    else:
+        content = "\x1f".join(
+            [
+                str(platform_id),
+                _normalize_review_text(reviewer_name),
+                _normalize_review_text(review_text),
+            ]
+        )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
 class GuestReview(models.Model):
     """Individual guest reviews"""
 
@@ -457,14 +688,54 @@ class GuestReview(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Review id on the platform, set by review syncs (see hotel.review_sync)
+    external_id = models.CharField(max_length=100, blank=True, editable=False)
+    # Deduplicates imports, see review_content_hash()
+    content_hash = models.CharField(max_length=64, unique=True, editable=False)
+
     class Meta:
         ordering = ["-review_date", "-created_at"]
         verbose_name = "Guest Review"
         verbose_name_plural = "Guest Reviews"
+        # Active reviews of a platform newest first, as platform_detail lists them
+        indexes = [models.Index(fields=["platform", "is_active", "review_date"])]
 
     def __str__(self):
         return f"{self.reviewer_name} - {self.platform.display_name} ({self.rating}/10)"
 
+    def set_content_hash(self):
+        self.content_hash = review_content_hash(
+            self.platform_id, self.reviewer_name, self.review_text, self.external_id
+        )
+
+    def clean(self):
+        self.set_content_hash()
+        duplicates = GuestReview.objects.filter(content_hash=self.content_hash)
+        if duplicates.exclude(pk=self.pk).exists():
+            raise ValidationError("This reviewer already has this review on this platform.")
+
+    def save(self, *args, **kwargs):
+        """Save and update the rating aggregates in the same transaction"""
+        from .review_aggregates import record
+
+        self.set_content_hash()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & HASHED_REVIEW_FIELDS:
+            kwargs["update_fields"] = {*update_fields, "content_hash"}
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = (
+                    GuestReview.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list("platform_id", "rating", "review_date", "is_active")
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            removed = [previous[:3]] if previous and previous[3] else []
+            added = [(self.platform_id, self.rating, self.review_date)] if self.is_active else []
+            record(removed=removed, added=added)
+
     @property
     def days_ago(self):
         """Calculate days since review was posted"""
@@ -504,8 +775,56 @@ class GuestReview(models.Model):
         return (self.rating % 1) >= 0.5
 
 
+class ReviewSearchEntry(models.Model):
+    """
+    A review in the SQLite full-text index (see hotel.review_search), only
+    for joining the index in review queries
+    """
+
+    review = models.OneToOneField(
+        GuestReview,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="search_entry",
+    )
+    # Comparing the column named after the FTS5 table is a MATCH
+    match = models.TextField(db_column="hotel_guestreview_fts")
+    # bm25() of the match, lower is better
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "hotel_guestreview_fts"
+
+
+class ReviewSyncState(models.Model):
+    """
+    High-water mark of a platform's review sync (see hotel.review_sync):
+    export rows last changed before it were ingested by earlier syncs
+    """
+
+    platform = models.OneToOneField(
+        ReviewPlatform, on_delete=models.CASCADE, related_name="sync_state"
+    )
+    last_changed_at = models.DateTimeField(null=True, blank=True)
+    last_external_id = models.CharField(max_length=100, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Review Sync State"
+        verbose_name_plural = "Review Sync States"
+
+    def __str__(self):
+        return f"{self.platform.display_name} synced up to {self.last_changed_at}"
+
+
 class ReviewSummary(models.Model):
-    """Overall review summary across all platforms"""
+    """
+    Overall review summary across all platforms; the statistics are kept up
+    to date from the active GuestReviews (see hotel.review_aggregates)
+    """
 
     total_reviews = models.PositiveIntegerField(default=0)
     average_rating = models.DecimalField(
@@ -517,6 +836,9 @@ class ReviewSummary(models.Model):
             MaxValueValidator(Decimal("10.0")),
         ],
     )
+    rating_sum = models.DecimalField(
+        max_digits=12, decimal_places=1, default=Decimal("0.0"), editable=False
+    )
     last_updated = models.DateTimeField(auto_now=True)
 
     # Featured statistics
@@ -539,29 +861,3 @@ class ReviewSummary(models.Model):
 
     def __str__(self):
         return f"Overall: {self.average_rating}/10.0 ({self.total_reviews} reviews)"
-
-    def save(self, *args, **kwargs):
-        # Auto-calculate summary stats
-        self.calculate_summary()
-        super().save(*args, **kwargs)
-
-    def calculate_summary(self):
-        """Calculate overall statistics from all platforms"""
-        from django.db.models import Avg, Sum
-
-        # Calculate total reviews
-        self.total_reviews = (
-            PlatformRating.objects.aggregate(total=Sum("total_reviews"))["total"] or 0
-        )
-
-        # Calculate weighted average rating
-        if self.total_reviews > 0:
-            platform_ratings = PlatformRating.objects.filter(total_reviews__gt=0)
-            total_weighted_score = sum(
-                float(pr.overall_rating) * pr.total_reviews for pr in platform_ratings
-            )
-            self.average_rating = Decimal(
-                str(total_weighted_score / self.total_reviews)
-            )
-        else:
-            self.average_rating = Decimal("0.0")
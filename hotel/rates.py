@@ -0,0 +1,207 @@
+"""
+Nightly rate engine.
+
+Every room type gets one price per night (in cents) for a window of days
+starting on January 1st of the current year: the room type's base price
+with the active RateRule rows applied in priority order. Prices are kept as
+running totals, so the room charge of any stay is the difference of two
+array entries and many stays are priced with one vectorised lookup.
+
+The table is built once per process and rebuilt after a rule or room type
+changes (signals bump a version number in the shared cache). Stays must be
+at most HOTEL_MAX_STAY_NIGHTS long and lie within HOTEL_RATE_HORIZON_DAYS
+of today, which also bounds the tables built for stays outside the window.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import RateRule, RoomType
+
+RATES_VERSION_CACHE_KEY = "hotel:rates_version"
+
+# numpy counts days from 1970-01-01, a Thursday
+EPOCH_WEEKDAY = 3
+
+
+@dataclass(frozen=True)
+class Quote:
+    nights: int
+    room_total: Decimal
+    service_fee: Decimal
+    taxes: Decimal
+
+    @property
+    def total(self):
+        return self.room_total + self.service_fee + self.taxes
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    return (Decimal(int(cents)) / 100).quantize(Decimal("0.01"))
+
+
+def fees(nights):
+    """(service fee, taxes) charged for a stay of ``nights`` nights"""
+    return (
+        Decimal(settings.HOTEL_SERVICE_FEE_PER_NIGHT) * nights,
+        Decimal(settings.HOTEL_TAX_PER_NIGHT) * nights,
+    )
+
+
+class RateTable:
+    """Nightly prices of every room type for the days start..start + days"""
+
+    def __init__(self, start, days, room_types, rules):
+        self.start = start
+        self.days = days
+        self.rows = {room_type_id: row for row, (room_type_id, _price) in enumerate(room_types)}
+
+        prices = np.empty((len(room_types), days), dtype=np.int64)
+        prices[:] = np.array([to_cents(price) for _id, price in room_types], dtype=np.int64)[:, None]
+
+        nights = np.datetime64(start, "D") + np.arange(days)
+        weekdays = (nights.astype(np.int64) + EPOCH_WEEKDAY) % 7
+        for rule in rules:
+            self.apply(prices, nights, weekdays, rule)
+
+        # cumulative[row, n] is the price of the first n nights
+        self.cumulative = np.zeros((len(room_types), days + 1), dtype=np.int64)
+        np.cumsum(prices, axis=1, out=self.cumulative[:, 1:])
+
+    def apply(self, prices, nights, weekdays, rule):
+        mask = np.isin(weekdays, rule.weekdays)
+        if rule.start_date:
+            mask &= nights >= np.datetime64(rule.start_date, "D")
+        if rule.end_date:
+            mask &= nights <= np.datetime64(rule.end_date, "D")
+        if rule.room_type_id is None:
+            rows = slice(None)
+        elif rule.room_type_id in self.rows:
+            rows = self.rows[rule.room_type_id]
+        else:
+            return
+
+        selected = prices[rows]
+        if rule.adjustment_type == "fixed":
+            selected[..., mask] = to_cents(rule.value)
+        elif rule.adjustment_type == "percent":
+            factor = 1 + float(rule.value) / 100
+            selected[..., mask] = np.rint(selected[..., mask] * factor).astype(np.int64)
+        else:
+            selected[..., mask] += to_cents(rule.value)
+        np.maximum(selected, 0, out=selected)
+        prices[rows] = selected
+
+    @classmethod
+    def build(cls, start, days):
+        room_types = list(RoomType.objects.values_list("id", "price_per_night"))
+        rules = RateRule.objects.filter(is_active=True).order_by("priority", "id")
+        return cls(start, days, room_types, list(rules))
+
+    def covers(self, check_in, check_out):
+        return self.start <= check_in and (check_out - self.start).days <= self.days
+
+    def offsets(self, dates):
+        """Day offsets of an array of dates (datetime64[D] or date objects)"""
+        return (np.asarray(dates, dtype="datetime64[D]") - np.datetime64(self.start, "D")).astype(np.int64)
+
+    def room_totals(self, room_type_ids, check_ins, check_outs):
+        """
+        Room charge in cents of many stays at once; the three arguments are
+        equally long sequences. Unknown room types price at 0.
+        """
+        rows = np.array([self.rows.get(room_type_id, -1) for room_type_id in room_type_ids], dtype=np.int64)
+        if not self.rows:
+            return np.zeros(len(rows), dtype=np.int64)
+        starts = self.offsets(check_ins)
+        ends = self.offsets(check_outs)
+        known = np.maximum(rows, 0)
+        totals = self.cumulative[known, ends] - self.cumulative[known, starts]
+        return np.where(rows >= 0, totals, 0)
+
+
+_table = None
+_table_version = None
+
+
+def bump_version():
+    """Make every process rebuild its rate table on next use"""
+    try:
+        cache.incr(RATES_VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(RATES_VERSION_CACHE_KEY, 1, None)
+
+
+def _check_dates(first, last):
+    horizon = timedelta(days=settings.HOTEL_RATE_HORIZON_DAYS)
+    today = date.today()
+    if first < today - horizon or last > today + horizon:
+        raise ValueError(
+            f"Dates must be within {settings.HOTEL_RATE_HORIZON_DAYS} days of today."
+        )
+
+
+def check_stay(check_in, check_out):
+    """Raise ValueError for a stay that is too long or too far from today"""
+    if (check_out - check_in).days > settings.HOTEL_MAX_STAY_NIGHTS:
+        raise ValueError(f"Stays are limited to {settings.HOTEL_MAX_STAY_NIGHTS} nights.")
+    _check_dates(check_in, check_out)
+
+
+def rate_table(check_in=None, check_out=None):
+    """
+    The current rate table. Stays outside its window get a table built
+    just for them; raises ValueError for dates too far from today.
+    """
+    global _table, _table_version
+
+    version = cache.get(RATES_VERSION_CACHE_KEY, 0)
+    if _table is None or _table_version != version or _table.start.year != date.today().year:
+        _table = RateTable.build(date(date.today().year, 1, 1), settings.HOTEL_RATE_HORIZON_DAYS)
+        _table_version = version
+
+    if check_in and check_out and not _table.covers(check_in, check_out):
+        _check_dates(check_in, check_out)
+        start = min(check_in, _table.start)
+        return RateTable.build(start, (max(check_out, check_in + timedelta(days=1)) - start).days)
+    return _table
+
+
+def quote(room_type_id, check_in, check_out):
+    """Price a stay of a room type, raises ValueError for stays check_stay() rejects"""
+    check_stay(check_in, check_out)
+    nights = (check_out - check_in).days
+    table = rate_table(check_in, check_out)
+    room_total = table.room_totals([room_type_id], [check_in], [check_out])[0]
+    service_fee, taxes = fees(nights)
+    return Quote(nights, from_cents(room_total), service_fee, taxes)
+
+
+def quote_many(room_type_ids, check_ins, check_outs):
+    """quote() for many stays at once, one Quote per stay"""
+    if not room_type_ids:
+        return []
+    for check_in, check_out in zip(check_ins, check_outs):
+        check_stay(check_in, check_out)
+    table = rate_table(min(check_ins), max(check_outs))
+    room_totals = table.room_totals(room_type_ids, check_ins, check_outs)
+    quotes = []
+    for room_total, check_in, check_out in zip(room_totals, check_ins, check_outs):
+        nights = (check_out - check_in).days
+        service_fee, taxes = fees(nights)
+        quotes.append(Quote(nights, from_cents(room_total), service_fee, taxes))
+    return quotes
+
+
+def nightly_price(room_type_id, night=None):
+    """Price of a single night, tonight by default"""
+    night = night or date.today()
+    return quote(room_type_id, night, night + timedelta(days=1)).room_total
@@ -0,0 +1,333 @@
+"""
+Review rating aggregates.
+
+PlatformRating (per platform) and ReviewSummary (all platforms) hold the
+number and rating sum of the active GuestReviews, and RatingBucket their
+histogram by whole rating point, and RatingDay their number and rating sum
+by review day (the input of hotel.review_trends). Each change to a review adjusts them by
+its delta with ``SET x = x + n`` updates in the same transaction as the
+change, so pages read the figures directly and they never drift from the
+reviews. The average is recomputed from the new count and sum in the same
+UPDATE.
+
+GuestReview.save() and deletes keep them in step by themselves; bulk
+writes that skip save() (QuerySet.update(), bulk_create()) must go through
+update_reviews() or upsert_reviews(), or call record().
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast, Floor, TruncDate
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from . import review_cache
+from .models import (
+    GuestReview,
+    PlatformRating,
+    RatingBucket,
+    RatingDay,
+    ReviewPlatform,
+    ReviewSummary,
+)
+
+MAX_RATING = 10
+
+
+def bucket(rating):
+    """Histogram bucket of a rating: its whole points"""
+    return min(int(rating), MAX_RATING)
+
+
+def review_day(review_date):
+    """RatingDay of a review date: its day in the site's time zone"""
+    if timezone.is_aware(review_date):
+        return timezone.localdate(review_date)
+    return review_date.date()
+
+
+def average(count, rating_sum):
+    if not count:
+        return Decimal("0.0")
+    return (Decimal(rating_sum) / count).quantize(Decimal("0.1"))
+
+
+def _adjust(totals, average_field, count, rating_sum):
+    """
+    Add ``count`` reviews rating ``rating_sum`` in total to ``totals`` rows,
+    returns the number of rows updated
+    """
+    new_count = F("total_reviews") + count
+    new_sum = F("rating_sum") + rating_sum
+    return totals.update(
+        total_reviews=new_count,
+        rating_sum=new_sum,
+        **{
+            average_field: Case(
+                When(GreaterThan(new_count, 0), then=Cast(new_sum, FloatField()) / new_count),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        },
+    )
+
+
+def record(removed=(), added=()):
+    """
+    Adjust the aggregates for reviews leaving (``removed``) or joining
+    (``added``) the active reviews, both given as (platform_id, rating,
+    review_date) triples. An edited review is removed with its old values
+    and added with its new ones.
+    """
+    platforms = defaultdict(lambda: [0, Decimal(0)])
+    buckets = defaultdict(int)
+    days = defaultdict(lambda: [0, Decimal(0)])
+    for sign, reviews in ((-1, removed), (1, added)):
+        for platform_id, rating, review_date in reviews:
+            rating = Decimal(str(rating))
+            platforms[platform_id][0] += sign
+            platforms[platform_id][1] += sign * rating
+            buckets[platform_id, bucket(rating)] += sign
+            day = days[platform_id, review_day(review_date)]
+            day[0] += sign
+            day[1] += sign * rating
+
+    platforms = {key: value for key, value in platforms.items() if any(value)}
+    buckets = {key: count for key, count in buckets.items() if count}
+    # A review moved to another day changes the days alone
+    days = {key: value for key, value in days.items() if any(value)}
+    if not platforms and not days:
+        return
+
+    # Rows missing for a platform or rating are created on the first review
+    # that needs them. Rows are updated in a fixed order so that concurrent
+    # writers cannot deadlock.
+    with transaction.atomic(savepoint=False):
+        for platform_id, (count, rating_sum) in sorted(platforms.items()):
+            totals = PlatformRating.objects.filter(platform_id=platform_id)
+            if not _adjust(totals, "overall_rating", count, rating_sum) and count > 0:
+                PlatformRating.objects.get_or_create(platform_id=platform_id)
+                _adjust(totals, "overall_rating", count, rating_sum)
+        for (platform_id, rating), count in sorted(buckets.items()):
+            rows = RatingBucket.objects.filter(platform_id=platform_id, rating=rating)
+            if not rows.update(review_count=F("review_count") + count) and count > 0:
+                _row, created = RatingBucket.objects.get_or_create(
+                    platform_id=platform_id, rating=rating, defaults={"review_count": count}
+                )
+                if not created:
+                    rows.update(review_count=F("review_count") + count)
+
+        # Reviews span many days, so the missing day rows are inserted at once
+        RatingDay.objects.bulk_create(
+            [
+                RatingDay(platform_id=platform_id, day=day)
+                for (platform_id, day), (count, _sum) in sorted(days.items())
+                if count > 0
+            ],
+            ignore_conflicts=True,
+        )
+        for (platform_id, day), (count, rating_sum) in sorted(days.items()):
+            RatingDay.objects.filter(platform_id=platform_id, day=day).update(
+                review_count=F("review_count") + count,
+                rating_sum=F("rating_sum") + rating_sum,
+            )
+
+        if not platforms:
+            return
+        count = sum(count for count, _sum in platforms.values())
+        rating_sum = sum(rating_sum for _count, rating_sum in platforms.values())
+        summary = ReviewSummary.objects.all()
+        if not _adjust(summary, "average_rating", count, rating_sum) and count > 0:
+            ReviewSummary.objects.create()
+            _adjust(summary, "average_rating", count, rating_sum)
+
+
+def update_reviews(reviews, **values):
+    """
+    QuerySet.update() for GuestReviews that keeps the aggregates in step,
+    returns the number of reviews updated
+    """
+    fields = ("platform_id", "rating", "review_date", "is_active")
+    with transaction.atomic():
+        ids = list(reviews.values_list("pk", flat=True))
+        locked = GuestReview.objects.select_for_update().filter(pk__in=ids)
+        before = list(locked.values_list(*fields))
+        updated = locked.update(**values)
+        after = GuestReview.objects.filter(pk__in=ids).values_list(*fields)
+        record(
+            removed=[values[:3] for values in before if values[3]],
+            added=[values[:3] for values in after if values[3]],
+        )
+        review_cache.touch()
+    return updated
+
+
+# Fields an import updates on a review it already holds. Curation by staff
+# (is_active, is_featured) and helpful votes are kept.
+UPSERT_FIELDS = (
+    "reviewer_name",
+    "review_text",
+    "rating",
+    "trip_type",
+    "review_date",
+    "is_verified",
+    "is_superhost_review",
+)
+
+
+def _changed(review, stored, fields):
+    return any(
+        GuestReview._meta.get_field(name).to_python(getattr(review, name)) != stored[name]
+        for name in fields
+    )
+
+
+def upsert_reviews(reviews, update_fields=UPSERT_FIELDS, batch_size=1000):
+    """
+    Insert unsaved GuestReviews, or update the ``update_fields`` of the
+    stored reviews with the same content hash, keeping the aggregates in
+    step. Reviews equal to the stored ones are not written at all, so
+    re-importing costs only the changed rows. Reviews are written
+    ``batch_size`` at a time, the aggregates adjusted once for all of them.
+    Returns (created, updated).
+    """
+    reviews_by_hash = {}
+    for review in reviews:
+        review.set_content_hash()
+        reviews_by_hash[review.content_hash] = review
+    hashes = list(reviews_by_hash)
+
+    fields = ("content_hash", "rating", "review_date", "is_active", *update_fields)
+    created = updated = 0
+    removed, added = [], []
+    with transaction.atomic():
+        for start in range(0, len(hashes), batch_size):
+            stored_reviews = {
+                stored["content_hash"]: stored
+                for stored in GuestReview.objects.select_for_update()
+                .filter(content_hash__in=hashes[start : start + batch_size])
+                .values(*dict.fromkeys(fields))
+            }
+            changed = [
+                reviews_by_hash[content_hash]
+                for content_hash in hashes[start : start + batch_size]
+                if content_hash not in stored_reviews
+                or _changed(reviews_by_hash[content_hash], stored_reviews[content_hash], update_fields)
+            ]
+            if not changed:
+                continue
+            GuestReview.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=["content_hash"],
+                update_fields=[*update_fields, "updated_at"],
+            )
+
+            for review in changed:
+                stored = stored_reviews.get(review.content_hash)
+                if stored is None:
+                    created += 1
+                    if review.is_active:
+                        added.append((review.platform_id, review.rating, review.review_date))
+                    continue
+                updated += 1
+                if stored["is_active"]:
+                    # The platform is part of the hash, only the rating and
+                    # date can change
+                    removed.append((review.platform_id, stored["rating"], stored["review_date"]))
+                    added.append(
+                        (
+                            review.platform_id,
+                            *(
+                                getattr(review, name) if name in update_fields else stored[name]
+                                for name in ("rating", "review_date")
+                            ),
+                        )
+                    )
+
+        if created or updated:
+            record(removed=removed, added=added)
+            review_cache.touch()
+    return created, updated
+
+
+def rebuild_all():
+    """
+    Recompute every aggregate from the active reviews, returns the number
+    of platforms
+    """
+    active = GuestReview.objects.filter(is_active=True).order_by()
+    totals = {
+        platform_id: (count, rating_sum)
+        for platform_id, count, rating_sum in active.values("platform_id")
+        .annotate(count=Count("id"), rating_sum=Sum("rating"))
+        .values_list("platform_id", "count", "rating_sum")
+    }
+    buckets = defaultdict(int)
+    histogram_rows = (
+        active.annotate(bucket=Floor("rating"))
+        .values("platform_id", "bucket")
+        .annotate(count=Count("id"))
+        .values_list("platform_id", "bucket", "count")
+    )
+    for platform_id, rating, count in histogram_rows:
+        buckets[platform_id, bucket(rating)] += count
+    day_rows = (
+        active.annotate(day=TruncDate("review_date"))
+        .values("platform_id", "day")
+        .annotate(count=Count("id"), rating_sum=Sum("rating"))
+        .values_list("platform_id", "day", "count", "rating_sum")
+    )
+
+    platform_ids = list(ReviewPlatform.objects.values_list("id", flat=True))
+    with transaction.atomic():
+        for platform_id in platform_ids:
+            count, rating_sum = totals.get(platform_id, (0, Decimal(0)))
+            PlatformRating.objects.update_or_create(
+                platform_id=platform_id,
+                defaults={
+                    "total_reviews": count,
+                    "rating_sum": rating_sum,
+                    "overall_rating": average(count, rating_sum),
+                },
+            )
+        RatingBucket.objects.all().delete()
+        RatingBucket.objects.bulk_create(
+            RatingBucket(platform_id=platform_id, rating=rating, review_count=count)
+            for (platform_id, rating), count in buckets.items()
+        )
+        RatingDay.objects.all().delete()
+        RatingDay.objects.bulk_create(
+            RatingDay(platform_id=platform_id, day=day, review_count=count, rating_sum=rating_sum)
+            for platform_id, day, count, rating_sum in day_rows
+        )
+
+        count = sum(count for count, _sum in totals.values())
+        rating_sum = sum((rating_sum for _count, rating_sum in totals.values()), Decimal(0))
+        if not ReviewSummary.objects.exists():
+            ReviewSummary.objects.create()
+        ReviewSummary.objects.update(
+            total_reviews=count,
+            rating_sum=rating_sum,
+            average_rating=average(count, rating_sum),
+        )
+        review_cache.touch()
+    return len(platform_ids)
+
+
+def histogram(platform_id=None):
+    """
+    Active review counts by whole rating point, of one platform or of all:
+    a list whose item i counts the ratings from i up to i + 1
+    """
+    buckets = RatingBucket.objects.order_by()
+    if platform_id is not None:
+        buckets = buckets.filter(platform_id=platform_id)
+    counts = [0] * (MAX_RATING + 1)
+    for rating, count in (
+        buckets.values("rating").annotate(count=Sum("review_count")).values_list("rating", "count")
+    ):
+        counts[rating] = count
+    return counts
@@ -0,0 +1,77 @@
+"""
+Review API caching.
+
+Reviews change a few times a day while rating widgets poll the review API.
+Once a change to a review, platform or rating is committed, signals store
+its time in the shared cache as the "reviews changed at" stamp. Responses
+are cached under keys containing the stamp, and the stamp is their
+Last-Modified and part of their ETag, so a poll with If-None-Match or
+If-Modified-Since gets a 304 without touching the database until the
+reviews change.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import widget
+
+CHANGED_AT_CACHE_KEY = "hotel:reviews_changed_at"
+
+# Query parameters that select a review API response, anything else is ignored
+API_PARAMS = ("action", "platform", "platform_id", "limit", "cursor", "q")
+
+
+def changed_at():
+    """When the reviews last changed, as a POSIX timestamp"""
+    stamp = cache.get(CHANGED_AT_CACHE_KEY)
+    if stamp is None:
+        # Lost stamp (cache cleared): the newest review edit may predate a
+        # delete, so only the current time is safe against stale 304s
+        stamp = timezone.now().timestamp()
+        cache.add(CHANGED_AT_CACHE_KEY, stamp, None)
+        stamp = cache.get(CHANGED_AT_CACHE_KEY, stamp)
+    return stamp
+
+
+def _touch():
+    cache.set(CHANGED_AT_CACHE_KEY, timezone.now().timestamp(), None)
+
+
+def touch():
+    """
+    Mark the reviews changed once the current transaction commits, which
+    also re-renders the static rating widget
+    """
+    transaction.on_commit(_touch)
+    widget.publish_on_commit()
+
+
+def _params(request):
+    return "&".join(
+        f"{name}={request.GET[name]}" for name in API_PARAMS if name in request.GET
+    )
+
+
+def cache_key(request):
+    """Cache key of the review API response to ``request``"""
+    digest = hashlib.md5(_params(request).encode()).hexdigest()
+    return f"hotel:review_api:{changed_at()!r}:{digest}"
+
+
+def last_modified(request):
+    """
+    Last-Modified of a review API response. "N days ago" labels age with
+    the clock, so a response is never older than the current day.
+    """
+    stamp = datetime.fromtimestamp(changed_at(), tz=dt_timezone.utc)
+    today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(stamp, today)
+
+
+def etag(request):
+    """ETag of a review API response"""
+    version = f"{changed_at()!r}:{timezone.now().date()}:{_params(request)}"
+    return hashlib.md5(version.encode()).hexdigest()
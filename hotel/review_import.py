@@ -0,0 +1,221 @@
+"""
+CSV import of guest reviews.
+
+The upload is decoded and parsed as a stream, so memory use stays flat
+however large the file. Platforms are looked up once. Valid rows are
+inserted with batches with review_aggregates.upsert_reviews(), each batch in its own
+transaction together with its rating aggregates. Rows that match a stored
+review by content hash update it, or are skipped when unchanged. A row
+without a review_date keeps the date of the review it updates, so
+re-importing it changes nothing. Invalid rows go with their line number and
+error into a CSV report that staff can download after the import.
+
+Columns: platform, reviewer_name, review_text and rating are required;
+trip_type, is_verified and review_date (ISO date or date-time) are optional.
+"""
+import csv
+import io
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, time as dt_time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from . import review_aggregates
+from .models import GuestReview, ReviewPlatform
+
+BATCH_SIZE = 1000
+REQUIRED_COLUMNS = ("platform", "reviewer_name", "review_text", "rating")
+TRUE_VALUES = ("true", "1", "yes", "y")
+# Error reports are deleted after a week
+REPORT_MAX_AGE = 7 * 24 * 3600
+
+MAX_RATING = Decimal("10.0")
+TRIP_TYPES = {value for value, _label in GuestReview.TRIP_TYPE_CHOICES}
+REVIEWER_NAME_LENGTH = GuestReview._meta.get_field("reviewer_name").max_length
+# Rows without a review_date insert the current time but never overwrite a stored date
+DATELESS_UPSERT_FIELDS = tuple(
+    name for name in review_aggregates.UPSERT_FIELDS if name != "review_date"
+)
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: int = 0
+    # Token of the error report, when there were errors
+    report: str = None
+
+
+def report_path(token):
+    return Path(settings.REVIEW_IMPORT_REPORT_DIR) / f"{token}.csv"
+
+
+def _prune_reports(directory):
+    cutoff = time.time() - REPORT_MAX_AGE
+    for path in directory.glob("*.csv"):
+        if path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+
+
+def parse_review_date(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError
+        parsed = datetime.combine(day, dt_time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_row(row, platforms):
+    """
+    Unsaved GuestReview for a CSV row, given {platform name: platform id}.
+    Raises InvalidRow with the reason when the row cannot be imported.
+    """
+    name = (row.get("platform") or "").strip()
+    if name not in platforms:
+        raise InvalidRow(f"Unknown platform '{name}'")
+
+    reviewer_name = (row.get("reviewer_name") or "").strip()
+    if not reviewer_name:
+        raise InvalidRow("Missing reviewer_name")
+    if len(reviewer_name) > REVIEWER_NAME_LENGTH:
+        raise InvalidRow(f"reviewer_name is longer than {REVIEWER_NAME_LENGTH} characters")
+
+    review_text = (row.get("review_text") or "").strip()
+    if not review_text:
+        raise InvalidRow("Missing review_text")
+
+    try:
+        rating = Decimal((row.get("rating") or "").strip())
+    except InvalidOperation:
+        raise InvalidRow(f"Invalid rating '{row.get('rating')}'")
+    if not rating.is_finite() or not 0 <= rating <= MAX_RATING:
+        raise InvalidRow(f"Rating must be between 0 and {MAX_RATING}")
+
+    trip_type = (row.get("trip_type") or "").strip() or "other"
+    if trip_type not in TRIP_TYPES:
+        raise InvalidRow(f"Unknown trip_type '{trip_type}'")
+
+    review = GuestReview(
+        platform_id=platforms[name],
+        reviewer_name=reviewer_name,
+        review_text=review_text,
+        rating=rating.quantize(Decimal("0.1")),
+        trip_type=trip_type,
+        is_verified=(row.get("is_verified") or "true").strip().lower() in TRUE_VALUES,
+    )
+    review_date = (row.get("review_date") or "").strip()
+    if review_date:
+        try:
+            review.review_date = parse_review_date(review_date)
+        except ValueError:
+            raise InvalidRow(f"Invalid review_date '{review_date}'")
+    return review
+
+
+def _update_fields(row):
+    if (row.get("review_date") or "").strip():
+        return review_aggregates.UPSERT_FIELDS
+    return DATELESS_UPSERT_FIELDS
+
+
+def _upsert(batch, update_fields, result):
+    created, updated = review_aggregates.upsert_reviews(batch, update_fields)
+    result.created += created
+    result.updated += updated
+    result.unchanged += len(batch) - created - updated
+
+
+class _Report:
+    """Error report CSV, created on the first error"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.token = None
+        self.file = None
+        self.writer = None
+
+    def add(self, line, error, row):
+        if self.writer is None:
+            self.token = str(uuid.uuid4())
+            path = report_path(self.token)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _prune_reports(path.parent)
+            self.file = open(path, "w", encoding="utf-8", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(["line", "error", *self.columns])
+        self.writer.writerow([line, error, *(row.get(column, "") for column in self.columns)])
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def import_reviews(upload, batch_size=BATCH_SIZE):
+    """
+    Import the reviews of an uploaded CSV file, returns an ImportResult.
+    Raises ValueError when the file is not UTF-8 encoded or lacks a
+    required column.
+    """
+    text = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    try:
+        try:
+            columns = reader.fieldnames or []
+        except UnicodeDecodeError:
+            raise ValueError("The file is not UTF-8 encoded")
+        missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+        platforms = dict(ReviewPlatform.objects.values_list("name", "id"))
+        result = ImportResult()
+        report = _Report(columns)
+        # Dated and dateless rows are upserted apart, by the fields they update
+        batches = {review_aggregates.UPSERT_FIELDS: [], DATELESS_UPSERT_FIELDS: []}
+        try:
+            try:
+                # Line the next record starts on, quoted values may span lines
+                line = reader.line_num + 1
+                for row in reader:
+                    row_line, line = line, reader.line_num + 1
+                    try:
+                        review = parse_row(row, platforms)
+                    except InvalidRow as e:
+                        result.errors += 1
+                        report.add(row_line, str(e), row)
+                        continue
+                    update_fields = _update_fields(row)
+                    batch = batches[update_fields]
+                    batch.append(review)
+                    if len(batch) >= batch_size:
+                        _upsert(batch, update_fields, result)
+                        batches[update_fields] = []
+            except UnicodeDecodeError:
+                result.errors += 1
+                report.add(line, "The file is not UTF-8 encoded from here on, import stopped", {})
+            for update_fields, batch in batches.items():
+                if batch:
+                    _upsert(batch, update_fields, result)
+        finally:
+            report.close()
+        result.report = report.token
+    finally:
+        # Leave the upload open for Django to close
+        text.detach()
+    return result
@@ -0,0 +1,144 @@
+"""
+Full-text search over guest reviews.
+
+LIKE '%term%' cannot use an index, so review search would scan the whole
+table. Instead reviewer names and review texts are indexed for full-text
+search by the database itself:
+
+* PostgreSQL: a generated ``search_vector`` tsvector column, names weighted
+  above texts, with a GIN index.
+* SQLite: an FTS5 table holding the names and texts, kept in step with the
+  reviews by triggers and joined in queries through ReviewSearchEntry.
+
+Either way the index follows every write, bulk ones included. Neither is a
+model field: migrations create them with install(). On SQLite, a migration
+that rebuilds the review table drops its triggers, so run the
+rebuild_review_search command after one.
+
+Reviews are in several languages (English, Lao), so words are not stemmed.
+"""
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import GuestReview, ReviewSearchEntry
+
+TABLE = GuestReview._meta.db_table
+FTS_TABLE = ReviewSearchEntry._meta.db_table
+SEARCH_CONFIG = "simple"
+
+POSTGRESQL_INSTALL = [
+    f"""
+    ALTER TABLE "{TABLE}" ADD COLUMN IF NOT EXISTS "search_vector" tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce("reviewer_name", '')), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce("review_text", '')), 'B')
+    ) STORED
+    """,
+    f'CREATE INDEX IF NOT EXISTS "{TABLE}_search_idx" ON "{TABLE}" USING gin ("search_vector")',
+]
+POSTGRESQL_UNINSTALL = [
+    f'DROP INDEX IF EXISTS "{TABLE}_search_idx"',
+    f'ALTER TABLE "{TABLE}" DROP COLUMN IF EXISTS "search_vector"',
+]
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5(
+        reviewer_name, review_text,
+        content='{TABLE}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # Rank names above texts
+    f"""INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rank) VALUES ('rank', 'bm25(2.0, 1.0)')""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_insert" AFTER INSERT ON "{TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"(rowid, reviewer_name, review_text)
+        VALUES (new.id, new.reviewer_name, new.review_text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_delete" AFTER DELETE ON "{TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, reviewer_name, review_text)
+        VALUES ('delete', old.id, old.reviewer_name, old.review_text);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS "{FTS_TABLE}_update"
+    AFTER UPDATE OF reviewer_name, review_text ON "{TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, reviewer_name, review_text)
+        VALUES ('delete', old.id, old.reviewer_name, old.review_text);
+        INSERT INTO "{FTS_TABLE}"(rowid, reviewer_name, review_text)
+        VALUES (new.id, new.reviewer_name, new.review_text);
+    END
+    """,
+    # Index the reviews written before the triggers existed
+    f"""INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}") VALUES ('rebuild')""",
+]
+SQLITE_UNINSTALL = [
+    f'DROP TRIGGER IF EXISTS "{FTS_TABLE}_insert"',
+    f'DROP TRIGGER IF EXISTS "{FTS_TABLE}_delete"',
+    f'DROP TRIGGER IF EXISTS "{FTS_TABLE}_update"',
+    f'DROP TABLE IF EXISTS "{FTS_TABLE}"',
+]
+
+INSTALL = {"postgresql": POSTGRESQL_INSTALL, "sqlite": SQLITE_INSTALL}
+UNINSTALL = {"postgresql": POSTGRESQL_UNINSTALL, "sqlite": SQLITE_UNINSTALL}
+
+
+def _execute(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def install(connection):
+    """Create (or complete) the search index of the reviews"""
+    _execute(connection, INSTALL.get(connection.vendor, []))
+
+
+def uninstall(connection):
+    _execute(connection, UNINSTALL.get(connection.vendor, []))
+
+
+def _fts_query(text):
+    """FTS5 query matching all words of ``text``, each quoted as a literal"""
+    return " ".join('"{}"'.format(word.replace('"', '""')) for word in text.split())
+
+
+def search(queryset, text):
+    """
+    The reviews of ``queryset`` matching every word of ``text`` in their
+    reviewer name or text, annotated with a ``search_rank`` (higher is a
+    better match; names count more than texts)
+    """
+    if not text.split():
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        tsquery = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.filter(
+            RawSQL(
+                f'"{TABLE}"."search_vector" @@ {tsquery}', (text,), output_field=BooleanField()
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f'ts_rank_cd("{TABLE}"."search_vector", {tsquery})',
+                (text,),
+                output_field=FloatField(),
+            )
+        )
+
+    if vendor == "sqlite":
+        # A join, so that the index is searched and ranked once per query
+        return queryset.filter(search_entry__match=_fts_query(text)).annotate(
+            search_rank=-F("search_entry__rank")
+        )
+
+    # No full-text index on other databases
+    for word in text.split():
+        queryset = queryset.filter(
+            Q(reviewer_name__icontains=word) | Q(review_text__icontains=word)
+        )
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
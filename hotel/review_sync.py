@@ -0,0 +1,316 @@
+"""
+Incremental review sync from platform export files.
+
+Review exports of each platform are dropped as JSON or CSV files into
+``<REVIEW_SYNC_DIR>/<platform name>/``. A JSON file holds a list of review
+objects, or an object with one under "reviews". An adapter per platform
+maps its export's fields onto GuestReview.
+
+Each platform's ReviewSyncState remembers the newest change time (and its
+review id) of the rows ingested so far. Later syncs skip the rows changed
+before it, and hand the remaining rows to review_aggregates.upsert_reviews(),
+which writes only new or changed reviews in bulk and adjusts the aggregates
+once. A review found in several rows (e.g. in two exports) is taken from
+the row changed last. Synced reviews are identified by their platform
+review id, so reviews edited on the platform are updated rather than
+duplicated. Reviews stored before without one (by the CSV import or the
+sample commands) are matched on their reviewer name and text and given
+the platform id first, so syncing does not duplicate them either.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import GuestReview, ReviewSyncState, review_content_hash
+from .review_aggregates import upsert_reviews
+from .review_import import BATCH_SIZE, TRIP_TYPES, InvalidRow, parse_review_date, parse_row
+
+EXTERNAL_ID_LENGTH = GuestReview._meta.get_field("external_id").max_length
+
+# Words of platform traveller types, in order, and the trip type they mean
+TRIP_TYPE_WORDS = [
+    ("business", "business"),
+    ("family", "family"),
+    ("couple", "couple"),
+    ("partner", "traveled"),
+    ("solo", "solo"),
+    ("friend", "friends"),
+    ("group", "friends"),
+]
+
+
+class ExportAdapter:
+    """
+    Reads a platform's export files. The default columns are those of the
+    CSV review import plus ``review_id`` and ``updated_at``; subclasses map
+    the fields of a platform's own export.
+    """
+
+    platform = None
+    # Export field of each GuestReview value
+    fields = {
+        "external_id": "review_id",
+        "reviewer_name": "reviewer_name",
+        "review_text": "review_text",
+        "rating": "rating",
+        "review_date": "review_date",
+        "changed_at": "updated_at",
+        "trip_type": "trip_type",
+    }
+    # Multiplier from the platform's rating scale to 0-10
+    rating_scale = Decimal(1)
+
+    def __init__(self, platform=None):
+        if platform is not None:
+            self.platform = platform
+
+    def files(self, directory):
+        platform_dir = Path(directory) / self.platform
+        return sorted(
+            path for path in platform_dir.glob("*") if path.suffix.lower() in (".json", ".csv")
+        )
+
+    def records(self, path):
+        """(location, record) of each review in an export file"""
+        if path.suffix.lower() == ".csv":
+            with open(path, encoding="utf-8-sig", newline="") as export:
+                reader = csv.DictReader(export)
+                line = reader.line_num + 1
+                for record in reader:
+                    yield f"{path.name}:{line}", record
+                    line = reader.line_num + 1
+            return
+
+        with open(path, encoding="utf-8") as export:
+            data = json.load(export)
+        if isinstance(data, dict):
+            data = data.get("reviews", [])
+        if not isinstance(data, list):
+            raise ValueError("Expected a list of reviews")
+        for index, record in enumerate(data):
+            yield f"{path.name}[{index}]", record
+
+    def value(self, record, name):
+        value = record.get(self.fields[name]) if self.fields.get(name) else None
+        return "" if value is None else str(value).strip()
+
+    def review_text(self, record):
+        return self.value(record, "review_text")
+
+    def rating(self, record):
+        value = self.value(record, "rating")
+        try:
+            return str(Decimal(value) * self.rating_scale)
+        except InvalidOperation:
+            return value
+
+    def trip_type(self, record):
+        value = self.value(record, "trip_type").lower()
+        # Values of the CSV import are GuestReview trip types already
+        if value in TRIP_TYPES:
+            return value
+        for word, trip_type in TRIP_TYPE_WORDS:
+            if word in value:
+                return trip_type
+        return "other"
+
+    def row(self, record):
+        """A record as a row of the CSV review import"""
+        if not isinstance(record, dict):
+            raise InvalidRow("Not a review object")
+        return {
+            "platform": self.platform,
+            "reviewer_name": self.value(record, "reviewer_name"),
+            "review_text": self.review_text(record),
+            "rating": self.rating(record),
+            "trip_type": self.trip_type(record),
+            "review_date": self.value(record, "review_date"),
+        }
+
+
+class AgodaAdapter(ExportAdapter):
+    platform = "agoda"
+    fields = {
+        "external_id": "reviewId",
+        "reviewer_name": "reviewerName",
+        "review_text": "reviewComments",
+        "rating": "rating",
+        "review_date": "reviewDate",
+        "changed_at": "lastUpdated",
+        "trip_type": "travelerType",
+    }
+
+
+class BookingAdapter(ExportAdapter):
+    """Booking.com reviews come as separate liked and disliked texts"""
+
+    platform = "booking"
+    fields = {
+        "external_id": "review_id",
+        "reviewer_name": "guest_name",
+        "rating": "average_score",
+        "review_date": "review_date",
+        "changed_at": "last_modified",
+        "trip_type": "traveller_type",
+    }
+
+    def review_text(self, record):
+        parts = [
+            f"{label}: {str(record.get(key) or '').strip()}"
+            for label, key in (("Liked", "positive"), ("Disliked", "negative"))
+            if str(record.get(key) or "").strip()
+        ]
+        return "\n".join(parts)
+
+
+class AirbnbAdapter(ExportAdapter):
+    platform = "airbnb"
+    fields = {
+        "external_id": "id",
+        "reviewer_name": "reviewer_name",
+        "review_text": "comments",
+        "rating": "rating",
+        "review_date": "created_at",
+        "changed_at": "updated_at",
+        "trip_type": None,
+    }
+    # Stars out of 5
+    rating_scale = Decimal(2)
+
+
+ADAPTERS = {adapter.platform: adapter for adapter in (AgodaAdapter, BookingAdapter, AirbnbAdapter)}
+
+
+def adapter_for(platform_name):
+    """The export adapter of a platform, the default one without its own"""
+    adapter = ADAPTERS.get(platform_name)
+    return adapter() if adapter else ExportAdapter(platform_name)
+
+
+@dataclass
+class SyncResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    # Rows changed before the high-water mark
+    skipped: int = 0
+    # Rows of reviews also found in a row changed later
+    superseded: int = 0
+    # Reviews stored without a platform id that were matched to an export row
+    adopted: int = 0
+    # (location, error) of the rows that could not be read
+    errors: list = field(default_factory=list)
+
+
+def _read(adapter, record, platform_ids):
+    """(unsaved GuestReview, change time) of an export record"""
+    row = adapter.row(record)
+    if not row["review_date"]:
+        raise InvalidRow("Missing review date")
+    review = parse_row(row, platform_ids)
+    review.external_id = adapter.value(record, "external_id")
+    if len(review.external_id) > EXTERNAL_ID_LENGTH:
+        raise InvalidRow(f"Review id is longer than {EXTERNAL_ID_LENGTH} characters")
+    changed_at = adapter.value(record, "changed_at")
+    if not changed_at:
+        return review, review.review_date
+    try:
+        return review, parse_review_date(changed_at)
+    except ValueError:
+        raise InvalidRow(f"Invalid change date '{changed_at}'")
+
+
+def _adopt_imported(platform_id, reviews):
+    """
+    Give the stored reviews of a platform that have no platform id the id
+    of the synced review with their reviewer name and text, so that the
+    upsert updates them. Returns the number of reviews adopted.
+    """
+    by_text_hash = {
+        review_content_hash(platform_id, review.reviewer_name, review.review_text): review
+        for review in reviews
+        if review.external_id
+    }
+    text_hashes = list(by_text_hash)
+    adopted = 0
+    for start in range(0, len(text_hashes), BATCH_SIZE):
+        chunk = text_hashes[start : start + BATCH_SIZE]
+        stored = list(
+            GuestReview.objects.select_for_update()
+            .filter(platform_id=platform_id, external_id="", content_hash__in=chunk)
+            .values_list("pk", "content_hash")
+        )
+        # Reviews synced before keep their row, the import's copy stays apart
+        synced_hashes = set(
+            GuestReview.objects.filter(
+                content_hash__in=[by_text_hash[text_hash].content_hash for _pk, text_hash in stored]
+            ).values_list("content_hash", flat=True)
+        )
+        for pk, text_hash in stored:
+            review = by_text_hash[text_hash]
+            if review.content_hash in synced_hashes:
+                continue
+            GuestReview.objects.filter(pk=pk).update(
+                external_id=review.external_id, content_hash=review.content_hash
+            )
+            adopted += 1
+    return adopted
+
+
+def sync_platform(platform, directory=None, full=False):
+    """
+    Ingest the reviews of ``platform``'s export files changed since its
+    last sync, or all of them with ``full``. Returns a SyncResult.
+    """
+    directory = directory or settings.REVIEW_SYNC_DIR
+    adapter = adapter_for(platform.name)
+    state, _created = ReviewSyncState.objects.get_or_create(platform=platform)
+    mark = None if full else state.last_changed_at
+    platform_ids = {platform.name: platform.id}
+
+    result = SyncResult()
+    # (change time, review) by review identity, the latest change wins
+    reviews = {}
+    newest = None
+    for path in adapter.files(directory):
+        try:
+            for location, record in adapter.records(path):
+                try:
+                    review, changed_at = _read(adapter, record, platform_ids)
+                except InvalidRow as e:
+                    result.errors.append((location, str(e)))
+                    continue
+
+                # Rows changed at the mark itself may be new, the upsert
+                # skips those already stored
+                if mark and changed_at < mark:
+                    result.skipped += 1
+                    continue
+                review.set_content_hash()
+                if review.content_hash in reviews:
+                    result.superseded += 1
+                    if changed_at < reviews[review.content_hash][0]:
+                        continue
+                reviews[review.content_hash] = (changed_at, review)
+                if newest is None or changed_at > newest[0]:
+                    newest = (changed_at, review.external_id)
+        except (OSError, ValueError) as e:
+            # Unreadable file: not UTF-8, malformed JSON or CSV
+            result.errors.append((path.name, f"Could not read the file: {e}"))
+
+    reviews = [review for _changed_at, review in reviews.values()]
+    with transaction.atomic():
+        result.adopted = _adopt_imported(platform.id, reviews)
+        result.created, result.updated = upsert_reviews(reviews)
+        result.unchanged = len(reviews) - result.created - result.updated
+        if newest and (state.last_changed_at is None or newest[0] >= state.last_changed_at):
+            state.last_changed_at, state.last_external_id = newest
+        state.last_synced_at = timezone.now()
+        state.save()
+    return result
@@ -0,0 +1,144 @@
+"""
+Rating trends of the review platforms.
+
+For charts of how each platform's ratings develop, every platform gets a
+monthly series of its review count and mean rating, and of its mean rating
+over the 90 days up to each month's end (up to today for the current
+month).
+
+The series are computed from RatingDay rows, the number and rating sum of
+the active reviews per platform and day, which hotel.review_aggregates
+adjusts with every review change. A build reads those rows once and does
+all sums with NumPy: daily arrays per platform, their monthly totals, and
+running totals whose differences give the 90-day windows. Ratings are kept
+in tenths, so the sums are exact integers.
+
+The trends are built once per process and rebuilt after the reviews change
+(the review_cache stamp) or the day rolls over, so requests never aggregate
+reviews themselves.
+"""
+import numpy as np
+from django.utils import timezone
+
+from . import review_cache
+from .models import RatingDay, ReviewPlatform
+
+ROLLING_DAYS = 90
+
+
+def _means(rating_tenths, counts):
+    """Mean ratings of ``counts`` reviews totalling ``rating_tenths``, NaN without reviews"""
+    means = np.full(counts.shape, np.nan)
+    np.divide(rating_tenths, counts * 10, out=means, where=counts > 0)
+    return means
+
+
+def _json_list(values):
+    """Rounded floats of an array, None for NaN"""
+    return [None if np.isnan(value) else value for value in np.round(values, 2).tolist()]
+
+
+class RatingTrends:
+    """
+    Monthly rating series of the active platforms: ``count``, ``mean`` and
+    ``rolling_mean`` hold one row per platform and one column per month of
+    ``months``
+    """
+
+    def __init__(self, platforms, months, count, mean, rolling_mean):
+        self.platforms = platforms
+        self.months = months
+        self.count = count
+        self.mean = mean
+        self.rolling_mean = rolling_mean
+
+    @classmethod
+    def build(cls, today=None):
+        today = np.datetime64(today or timezone.localdate(), "D")
+        platforms = list(
+            ReviewPlatform.objects.filter(is_active=True)
+            .order_by("display_order", "display_name")
+            .values("id", "name", "display_name", "brand_color")
+        )
+        rows = {platform["id"]: index for index, platform in enumerate(platforms)}
+        days = (
+            RatingDay.objects.filter(platform_id__in=rows, review_count__gt=0)
+            .order_by()
+            .values_list("platform_id", "day", "review_count", "rating_sum")
+        )
+        platform_rows, dates, counts, tenths = [], [], [], []
+        for platform_id, day, count, rating_sum in days:
+            platform_rows.append(rows[platform_id])
+            dates.append(day)
+            counts.append(count)
+            tenths.append(int(rating_sum * 10))
+
+        if not dates:
+            empty = np.zeros((len(platforms), 0))
+            return cls(
+                platforms, np.array([], dtype="datetime64[M]"), empty.astype(np.int64), empty, empty
+            )
+
+        dates = np.array(dates, dtype="datetime64[D]")
+        first = dates.min()
+        last = max(dates.max(), today)
+        length = (last - first).astype(np.int64) + 1
+        offsets = (dates - first).astype(np.int64)
+
+        # Daily totals, one row per platform
+        daily_counts = np.zeros((len(platforms), length), dtype=np.int64)
+        daily_tenths = np.zeros((len(platforms), length), dtype=np.int64)
+        daily_counts[platform_rows, offsets] = counts
+        daily_tenths[platform_rows, offsets] = tenths
+
+        months = np.arange(first.astype("datetime64[M]"), last.astype("datetime64[M]") + 1)
+        # First and one past the last day of each month, within the days
+        starts = np.maximum((months.astype("datetime64[D]") - first).astype(np.int64), 0)
+        ends = np.minimum(((months + 1).astype("datetime64[D]") - first).astype(np.int64), length)
+
+        count = np.add.reduceat(daily_counts, starts, axis=1)
+        mean = _means(np.add.reduceat(daily_tenths, starts, axis=1), count)
+
+        # Running totals with a leading zero: the total of days [a, b) is
+        # running[b] - running[a]
+        running_counts = np.pad(np.cumsum(daily_counts, axis=1), ((0, 0), (1, 0)))
+        running_tenths = np.pad(np.cumsum(daily_tenths, axis=1), ((0, 0), (1, 0)))
+        window_starts = np.maximum(ends - ROLLING_DAYS, 0)
+        rolling_mean = _means(
+            running_tenths[:, ends] - running_tenths[:, window_starts],
+            running_counts[:, ends] - running_counts[:, window_starts],
+        )
+        return cls(platforms, months, count, mean, rolling_mean)
+
+    def as_json(self):
+        """The series as compact JSON data for charts, months as "YYYY-MM" """
+        return {
+            "months": np.datetime_as_string(self.months).tolist(),
+            "rolling_days": ROLLING_DAYS,
+            "platforms": [
+                {
+                    "name": platform["name"],
+                    "display_name": platform["display_name"],
+                    "color": platform["brand_color"],
+                    "count": self.count[index].tolist(),
+                    "mean": _json_list(self.mean[index]),
+                    "rolling_mean": _json_list(self.rolling_mean[index]),
+                }
+                for index, platform in enumerate(self.platforms)
+            ],
+        }
+
+
+_trends = None
+_trends_version = None
+
+
+def rating_trends():
+    """The current RatingTrends, rebuilt after the reviews change"""
+    global _trends, _trends_version
+
+    version = (review_cache.changed_at(), timezone.localdate())
+    if _trends is None or _trends_version != version:
+        _trends = RatingTrends.build(version[1])
+        _trends_version = version
+    return _trends
@@ -0,0 +1,101 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+from . import amenities, availability, catalog, rates, review_aggregates, review_cache
+from .models import (
+    Amenity,
+    Booking,
+    CategoryRating,
+    GuestReview,
+    PlatformRating,
+    RateRule,
+    ReviewCategory,
+    ReviewPlatform,
+    Room,
+    RoomAmenity,
+    RoomImage,
+    RoomType,
+)
+
+# Models held in the in-process room catalog
+CATALOG_MODELS = (Room, RoomType, RoomImage, RoomAmenity, Amenity)
+
+# Models whose changes show in review API responses
+REVIEW_MODELS = (GuestReview, ReviewPlatform, PlatformRating, ReviewCategory, CategoryRating)
+
+
+def remember_booking_room(sender, instance, **kwargs):
+    """Keep the room a booking is moved away from, so it gets rebuilt too"""
+    if instance.pk:
+        instance._previous_room_id = (
+            Booking.objects.filter(pk=instance.pk).values_list("room_id", flat=True).first()
+        )
+
+
+def clear_rate_table(sender, **kwargs):
+    rates.bump_version()
+
+
+def clear_catalog(sender, **kwargs):
+    catalog.bump_version()
+
+
+def touch_reviews(sender, **kwargs):
+    review_cache.touch()
+
+
+def rebuild_amenity_mask(sender, instance, **kwargs):
+    amenities.rebuild_room(instance.room_id)
+
+
+def rebuild_amenity_masks(sender, instance, action, reverse, pk_set, **kwargs):
+    """Room.amenities.add()/remove()/clear() bypass RoomAmenity signals"""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        amenities.rebuild_room(instance.pk)
+        return
+    if pk_set is None:
+        # Clearing an amenity: its bit is set exactly on the rooms that had it
+        rooms = Room.objects.annotate(has_amenity=F("amenity_mask").bitand(instance.mask))
+        pk_set = rooms.exclude(has_amenity=0).values_list("pk", flat=True)
+    for room_id in pk_set:
+        amenities.rebuild_room(room_id)
+
+
+def rebuild_booking_occupancy(sender, instance, **kwargs):
+    room_ids = {instance.room_id, getattr(instance, "_previous_room_id", None)}
+    for room_id in room_ids - {None}:
+        availability.rebuild_room(room_id)
+
+
+def remove_review_from_aggregates(sender, instance, **kwargs):
+    """Deletes run this inside their transaction, also for QuerySet.delete()"""
+    if instance.is_active:
+        review_aggregates.record(
+            removed=[(instance.platform_id, instance.rating, instance.review_date)]
+        )
+
+
+pre_save.connect(remember_booking_room, sender=Booking)
+post_save.connect(rebuild_booking_occupancy, sender=Booking)
+post_delete.connect(rebuild_booking_occupancy, sender=Booking)
+
+for model in (RateRule, RoomType):
+    post_save.connect(clear_rate_table, sender=model)
+    post_delete.connect(clear_rate_table, sender=model)
+
+for model in CATALOG_MODELS:
+    post_save.connect(clear_catalog, sender=model)
+    post_delete.connect(clear_catalog, sender=model)
+m2m_changed.connect(clear_catalog, sender=Room.amenities.through)
+
+post_save.connect(rebuild_amenity_mask, sender=RoomAmenity)
+post_delete.connect(rebuild_amenity_mask, sender=RoomAmenity)
+m2m_changed.connect(rebuild_amenity_masks, sender=Room.amenities.through)
+
+post_delete.connect(remove_review_from_aggregates, sender=GuestReview)
+
+for model in REVIEW_MODELS:
+    post_save.connect(touch_reviews, sender=model)
+    post_delete.connect(touch_reviews, sender=model)
@@ -1,3 +1,1054 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    amenities,
+    availability,
+    catalog,
+    facets,
+    rates,
+    review_aggregates,
+    review_import,
+    review_search,
+    widget,
+)
+from .bookings import create_booking
+from .models import (
+    Amenity,
+    Booking,
+    GuestReview,
+    PlatformRating,
+    RatingBucket,
+    RatingDay,
+    ReviewPlatform,
+    ReviewSummary,
+    ReviewSyncState,
+    Room,
+    RoomAmenity,
+    RoomType,
+)
+from .review_sync import sync_platform
+from .review_trends import RatingTrends
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class AvailabilityTests(TestCase):
+    def test_night_masks(self):
+        self.assertEqual(
+            availability.night_masks(date(2025, 1, 1), date(2025, 1, 4)), {2025: 0b111}
+        )
+        self.assertEqual(
+            availability.night_masks(date(2024, 12, 30), date(2025, 1, 2)),
+            {2024: 0b11 << 364, 2025: 0b1},
+        )
+        # The leap day is night 59
+        self.assertEqual(
+            availability.night_masks(date(2024, 2, 29), date(2024, 3, 1)), {2024: 1 << 59}
+        )
+        self.assertEqual(
+            availability.night_masks(date(9999, 12, 29), date.max), {9999: 0b11 << 362}
+        )
+        self.assertEqual(
+            availability.night_masks(date(9998, 12, 31), date(9999, 1, 1)), {9998: 1 << 364}
+        )
+
+
+class BookingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.room_type = RoomType.objects.create(
+            name="Double", description="", price_per_night=Decimal("100.00"), capacity=2
+        )
+        cls.room = Room(room_type=cls.room_type)
+        cls.room.save()
+        cls.other_room = Room(room_type=cls.room_type)
+        cls.other_room.save()
+
+    def setUp(self):
+        self.check_in = date.today() + timedelta(days=7)
+        self.check_out = self.check_in + timedelta(days=2)
+
+    def book(self, room=None, check_in=None, check_out=None, key=None, **fields):
+        values = {
+            "guest_name": "Ann",
+            "guest_email": "ann@example.com",
+            "guests_count": 2,
+            "total_amount": Decimal("254.00"),
+        }
+        values.update(fields)
+        return create_booking(
+            room or self.room,
+            check_in or self.check_in,
+            check_out or self.check_out,
+            idempotency_key=key,
+            **values,
+        )
+
+    def test_replaying_a_key_returns_the_first_booking(self):
+        booking, created = self.book(key="abc")
+        self.assertTrue(created)
+        self.assertNotEqual(booking.idempotency_key, "abc")
+
+        replay, created = self.book(key=" abc ", guest_email="Ann@Example.com ")
+        self.assertFalse(created)
+        self.assertEqual(replay.pk, booking.pk)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_a_key_reused_for_another_booking_is_rejected(self):
+        self.book(key="abc")
+        changes = [
+            {"room": self.other_room},
+            {"check_out": self.check_out + timedelta(days=1)},
+            {"guests_count": 1},
+        ]
+        for change in changes:
+            with self.subTest(change=change):
+                with self.assertRaisesMessage(ValueError, "different details"):
+                    self.book(key="abc", **change)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_keys_are_scoped_to_the_guest_email(self):
+        booking, _created = self.book(key="abc")
+        # Another guest's key never finds this booking, even for the same stay
+        with self.assertRaisesMessage(ValueError, "already booked"):
+            self.book(key="abc", guest_email="bob@example.com")
+        other, created = self.book(
+            room=self.other_room, key="abc", guest_email="bob@example.com"
+        )
+        self.assertTrue(created)
+        self.assertNotEqual(other.pk, booking.pk)
+
+    def test_overlapping_stays_are_rejected(self):
+        self.book()
+        stays = [
+            (self.check_in, self.check_out),
+            (self.check_in - timedelta(days=1), self.check_in + timedelta(days=1)),
+            (self.check_out - timedelta(days=1), self.check_out + timedelta(days=3)),
+            (self.check_in - timedelta(days=3), self.check_out + timedelta(days=3)),
+        ]
+        for check_in, check_out in stays:
+            with self.subTest(check_in=check_in, check_out=check_out):
+                with self.assertRaisesMessage(ValueError, "already booked"):
+                    self.book(check_in=check_in, check_out=check_out)
+
+        # Checking in on the day the last guest checks out is fine
+        _booking, created = self.book(
+            check_in=self.check_out, check_out=self.check_out + timedelta(days=1)
+        )
+        self.assertTrue(created)
+        _booking, created = self.book(room=self.other_room)
+        self.assertTrue(created)
+
+    def test_cancelled_bookings_release_their_nights(self):
+        booking, _created = self.book()
+        booking.status = "cancelled"
+        booking.save()
+        _booking, created = self.book()
+        self.assertTrue(created)
+
+    def test_the_room_is_locked_before_checking_overlaps(self):
+        with mock.patch.object(
+            Room.objects, "select_for_update", wraps=Room.objects.select_for_update
+        ) as select_for_update, CaptureQueriesContext(connection) as queries:
+            self.book()
+        select_for_update.assert_called_once_with()
+        sql = [query["sql"] for query in queries.captured_queries]
+        lock = next(i for i, query in enumerate(sql) if '"hotel_room"' in query)
+        overlap = next(i for i, query in enumerate(sql) if '"check_out_date" >' in query)
+        self.assertLess(lock, overlap)
+
+    def test_out_of_order_rooms_are_rejected(self):
+        Room.objects.filter(pk=self.room.pk).update(is_out_of_order=True)
+        with self.assertRaisesMessage(ValueError, "not available"):
+            self.book()
+
+    def test_booking_view_retries_with_the_same_key(self):
+        data = {
+            "check_in": self.check_in.isoformat(),
+            "check_out": self.check_out.isoformat(),
+            "guests": "2",
+            "guest_name": "Ann",
+            "guest_email": "ann@example.com",
+        }
+        url = reverse("room-booking-page", args=[self.room.slug])
+        for _attempt in range(2):
+            self.client.post(url, data, HTTP_USER_AGENT="Mozilla", HTTP_IDEMPOTENCY_KEY="k1")
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(Booking.objects.get().total_amount, Decimal("254.00"))
+
+        for guests in ("0", "-1", "3"):
+            with self.subTest(guests=guests):
+                self.client.post(url, {**data, "guests": guests}, HTTP_USER_AGENT="Mozilla")
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class RateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.room_type = RoomType.objects.create(
+            name="Double", description="", price_per_night=Decimal("100.00"), capacity=2
+        )
+
+    def setUp(self):
+        self.today = date.today()
+
+    def test_check_stay_limits(self):
+        horizon = timedelta(days=settings.HOTEL_RATE_HORIZON_DAYS)
+        longest = timedelta(days=settings.HOTEL_MAX_STAY_NIGHTS)
+        rates.check_stay(self.today, self.today + longest)
+        rates.check_stay(self.today + horizon - timedelta(days=1), self.today + horizon)
+        rates.check_stay(self.today - horizon, self.today - horizon + timedelta(days=1))
+        stays = [
+            (self.today, self.today + longest + timedelta(days=1)),
+            (self.today + horizon, self.today + horizon + timedelta(days=1)),
+            (self.today - horizon - timedelta(days=1), self.today - horizon),
+            (date(9999, 12, 30), date(9999, 12, 31)),
+        ]
+        for check_in, check_out in stays:
+            with self.subTest(check_in=check_in, check_out=check_out):
+                with self.assertRaises(ValueError):
+                    rates.check_stay(check_in, check_out)
+
+    def test_quote(self):
+        check_in = self.today + timedelta(days=10)
+        quote = rates.quote(self.room_type.id, check_in, check_in + timedelta(days=3))
+        self.assertEqual(quote.nights, 3)
+        self.assertEqual(quote.room_total, Decimal("300.00"))
+        with self.assertRaises(ValueError):
+            rates.quote(self.room_type.id, check_in, check_in + timedelta(days=400))
+
+    def test_quote_outside_the_cached_table(self):
+        # Stays last year lie before the table, which starts on January 1st
+        check_in = date(self.today.year - 1, 12, 30)
+        quote = rates.quote(self.room_type.id, check_in, check_in + timedelta(days=4))
+        self.assertEqual(quote.room_total, Decimal("400.00"))
+
+    def test_quote_many_rejects_any_bad_stay(self):
+        check_in = self.today + timedelta(days=1)
+        with self.assertRaises(ValueError):
+            rates.quote_many(
+                [self.room_type.id] * 2,
+                [check_in, date(9998, 1, 1)],
+                [check_in + timedelta(days=1), date(9999, 1, 1)],
+            )
+
+
+class StayApiTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+
+    def test_parse_stay(self):
+        check_in = self.today + timedelta(days=5)
+        self.assertEqual(
+            availability.parse_stay(
+                check_in.isoformat(), (check_in + timedelta(days=2)).isoformat()
+            ),
+            (check_in, check_in + timedelta(days=2)),
+        )
+        stays = [
+            ("", ""),
+            ("2025-02-30", "2025-03-02"),
+            ("01/02/2025", "03/02/2025"),
+            (check_in.isoformat(), check_in.isoformat()),
+            ((check_in + timedelta(days=1)).isoformat(), check_in.isoformat()),
+            (check_in.isoformat(), (check_in + timedelta(days=91)).isoformat()),
+            ("9999-12-30", "9999-12-31"),
+        ]
+        for stay in stays:
+            with self.subTest(stay=stay):
+                with self.assertRaises(ValueError):
+                    availability.parse_stay(*stay)
+
+    def get_json(self, name, params):
+        return self.client.get(reverse(name), params, HTTP_USER_AGENT="Mozilla")
+
+    def test_availability_api_rejects_bad_stays(self):
+        check_in = self.today + timedelta(days=1)
+        too_long = check_in + timedelta(days=91)
+        for check_out in ["tomorrow", check_in.isoformat(), too_long.isoformat()]:
+            with self.subTest(check_out=check_out):
+                response = self.get_json(
+                    "room-availability-api-page",
+                    {"check_in": check_in.isoformat(), "check_out": check_out},
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+        response = self.get_json(
+            "room-availability-api-page", {"check_in": "9998-01-01", "check_out": "9998-01-02"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_quotes_api_rejects_bad_stays(self):
+        check_in = self.today + timedelta(days=1)
+        good = f"{check_in}..{check_in + timedelta(days=2)}"
+        bad_stays = [
+            "9998-12-01..9999-12-31",
+            f"{good},9999-12-30..9999-12-31",
+            "2025-01-01",
+            "a..b",
+        ]
+        for stays in bad_stays:
+            with self.subTest(stays=stays):
+                response = self.get_json("room-quotes-api-page", {"stays": stays})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("error", response.json())
+
+        response = self.get_json("room-quotes-api-page", {"stays": good})
+        self.assertEqual(response.status_code, 200)
+
+
+class CatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Snapshots of earlier tests may carry the same version
+        catalog._snapshot = None
+        self.room_type = RoomType.objects.create(
+            name="Double", description="", price_per_night=Decimal("100.00"), capacity=2
+        )
+        self.room = Room(room_type=self.room_type)
+        self.room.save()
+
+    def test_snapshot_is_reused_until_a_change_commits(self):
+        snapshot = catalog.get_catalog()
+        self.assertEqual([room.pk for room in snapshot.rooms], [self.room.pk])
+        with self.assertNumQueries(0):
+            self.assertIs(catalog.get_catalog(), snapshot)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.room_type.price_per_night = Decimal("120.00")
+            self.room_type.save()
+            # Not committed yet
+            self.assertIs(catalog.get_catalog(), snapshot)
+        for callback in callbacks:
+            callback()
+
+        fresh = catalog.get_catalog()
+        self.assertIsNot(fresh, snapshot)
+        self.assertEqual(fresh.rooms[0].room_type.price_per_night, Decimal("120.00"))
+        self.assertEqual(fresh.price_range["max_price"], Decimal("120.00"))
+
+    def test_amenity_changes_refresh_the_snapshot(self):
+        wifi = Amenity.objects.create(name="WiFi", icon="fas fa-wifi")
+        catalog.get_catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.amenities.add(wifi)
+        room = catalog.get_catalog().rooms[0]
+        self.assertEqual(room.amenity_ids, {wifi.pk})
+        self.assertEqual([amenity.name for amenity in room.available_amenities], ["WiFi"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            wifi.is_active = False
+            wifi.save()
+        room = catalog.get_catalog().rooms[0]
+        self.assertEqual(room.available_amenities, ())
+
+
+def catalog_room(room_type_id, capacity, price, amenity_ids=()):
+    room_type = SimpleNamespace(capacity=capacity, price_per_night=Decimal(price))
+    return SimpleNamespace(
+        room_type_id=room_type_id, room_type=room_type, amenity_ids=frozenset(amenity_ids)
+    )
+
+
+class FacetTests(SimpleTestCase):
+    rooms = [
+        catalog_room(1, 2, "50", {10}),
+        catalog_room(1, 4, "120", {10, 11}),
+        catalog_room(2, 2, "80", {11}),
+        catalog_room(2, 4, "200"),
+    ]
+    filters = {
+        "room_type": lambda room: room.room_type_id == 1,
+        "amenity": lambda room: 11 in room.amenity_ids,
+    }
+
+    def test_price_buckets(self):
+        self.assertEqual(
+            facets.price_buckets(Decimal("50"), Decimal("200")),
+            [(50, 88), (88, 126), (126, 164), (164, 202)],
+        )
+        self.assertEqual(
+            facets.price_buckets(Decimal("1000"), Decimal("38512")),
+            [(1000, 10400), (10400, 19800), (19800, 29200), (29200, 38600)],
+        )
+        self.assertEqual(facets.price_buckets(Decimal("90"), Decimal("90")), [(90, 90)])
+        self.assertEqual(facets.price_buckets(None, None), [])
+
+    def test_each_facet_counts_the_rooms_of_the_other_filters(self):
+        buckets = facets.price_buckets(Decimal("50"), Decimal("200"))
+        matched, counts = facets.search(self.rooms, self.filters, buckets)
+
+        self.assertEqual(matched, [self.rooms[1]])
+        # Room types count the rooms with amenity 11, amenities the type 1 rooms
+        self.assertEqual(counts["room_type"], {1: 1, 2: 1})
+        self.assertEqual(counts["amenity"], {10: 2, 11: 1})
+        self.assertEqual(counts["capacity"], {4: 1})
+        self.assertEqual(counts["price"], {1: 1})
+
+    def test_conjunctive_facets_count_only_full_matches(self):
+        _matched, counts = facets.search(self.rooms, self.filters, conjunctive=("amenity",))
+        self.assertEqual(counts["amenity"], {10: 1, 11: 1})
+
+    def test_no_filters(self):
+        matched, counts = facets.search(self.rooms, {})
+        self.assertEqual(matched, self.rooms)
+        self.assertEqual(counts["room_type"], {1: 2, 2: 2})
+        self.assertEqual(counts["capacity"], {2: 2, 4: 2})
+        self.assertEqual(facets.at_least(counts["capacity"], 3), 2)
+        self.assertEqual(facets.at_least(counts["capacity"], 5), 0)
+
+
+class AmenityMaskTests(TestCase):
+    def setUp(self):
+        room_type = RoomType.objects.create(
+            name="Double", description="", price_per_night=Decimal("100.00"), capacity=2
+        )
+        self.rooms = []
+        for _index in range(3):
+            room = Room(room_type=room_type)
+            room.save()
+            self.rooms.append(room)
+        self.wifi, self.balcony, self.minibar = (
+            Amenity.objects.create(name=name, icon="fas fa-star")
+            for name in ("WiFi", "Balcony", "Minibar")
+        )
+
+    def mask(self, room):
+        return Room.objects.get(pk=room.pk).amenity_mask
+
+    def test_new_amenities_take_the_lowest_free_bit(self):
+        self.assertEqual([self.wifi.bit, self.balcony.bit, self.minibar.bit], [0, 1, 2])
+        self.balcony.delete()
+        self.assertEqual(Amenity.objects.create(name="Safe", icon="fas fa-lock").bit, 1)
+
+    def test_amenities_created_at_once_get_different_bits(self):
+        # The other amenity took bit 2 between reading and saving
+        with mock.patch.object(Amenity, "free_bit", side_effect=[2, 3]):
+            safe = Amenity.objects.create(name="Safe", icon="fas fa-lock")
+        self.assertEqual(safe.bit, 3)
+        self.assertEqual(Amenity.objects.filter(bit=2).get(), self.minibar)
+
+    def test_other_integrity_errors_are_raised(self):
+        amenity = Amenity(name="Safe", icon="fas fa-lock", bit=None)
+        with mock.patch.object(Amenity, "free_bit", return_value=3):
+            amenity.pk = self.wifi.pk
+            with self.assertRaises(IntegrityError):
+                amenity.save(force_insert=True)
+        self.assertIsNone(amenity.bit)
+
+    def test_masks_follow_the_room_amenities(self):
+        room = self.rooms[0]
+        link = RoomAmenity.objects.create(room=room, amenity=self.wifi)
+        self.assertEqual(self.mask(room), self.wifi.mask)
+        link.is_available = False
+        link.save()
+        self.assertEqual(self.mask(room), 0)
+
+        room.amenities.add(self.balcony, self.minibar)
+        self.assertEqual(self.mask(room), self.balcony.mask | self.minibar.mask)
+        room.amenities.remove(self.minibar)
+        self.assertEqual(self.mask(room), self.balcony.mask)
+        self.balcony.rooms.clear()
+        self.assertEqual(self.mask(room), 0)
+
+    def test_filter_rooms(self):
+        # Beyond the bits of the mask
+        safe = Amenity.objects.create(name="Safe", icon="fas fa-lock")
+        Amenity.objects.filter(pk=safe.pk).update(bit=None)
+        first, second, third = self.rooms
+        first.amenities.add(self.wifi, safe)
+        second.amenities.add(self.wifi, self.balcony)
+        third.amenities.add(self.balcony)
+
+        cases = [
+            ([self.wifi.pk], True, {first, second}),
+            ([self.wifi.pk, self.balcony.pk], True, {second}),
+            ([self.wifi.pk, safe.pk], True, {first}),
+            ([self.minibar.pk], True, set()),
+            ([self.minibar.pk, safe.pk], False, {first}),
+            ([self.balcony.pk, safe.pk], False, {first, second, third}),
+            ([], True, {first, second, third}),
+        ]
+        snapshot = catalog.load_snapshot(0)
+        for amenity_ids, match_all, expected in cases:
+            with self.subTest(amenity_ids=amenity_ids, match_all=match_all):
+                rooms = amenities.filter_rooms(Room.objects.all(), amenity_ids, match_all)
+                self.assertEqual(set(rooms), expected)
+                if amenity_ids:
+                    mask, unmasked = amenities.split(amenity_ids)
+                    self.assertEqual(
+                        {
+                            room.pk
+                            for room in snapshot.rooms
+                            if amenities.matches(room, mask, unmasked, match_all)
+                        },
+                        {room.pk for room in expected},
+                    )
+
+    def test_rebuild_all(self):
+        self.rooms[0].amenities.add(self.wifi, self.minibar)
+        Room.objects.update(amenity_mask=0)
+        self.assertEqual(amenities.rebuild_all(), 3)
+        self.assertEqual(self.mask(self.rooms[0]), self.wifi.mask | self.minibar.mask)
+
+
+class AggregateTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.google = ReviewPlatform.objects.create(name="google", display_name="Google")
+        cls.agoda = ReviewPlatform.objects.create(name="agoda", display_name="Agoda")
+
+    def review(self, **fields):
+        values = {
+            "platform": self.google,
+            "reviewer_name": "Ann",
+            "review_text": "Lovely garden",
+            "rating": Decimal("8.0"),
+            "review_date": aware(2025, 3, 10, 12),
+        }
+        values.update(fields)
+        return GuestReview(**values)
+
+    def aggregates(self):
+        """The aggregates as rebuild_all() would leave them"""
+        return {
+            "platforms": sorted(
+                PlatformRating.objects.filter(total_reviews__gt=0).values_list(
+                    "platform_id", "total_reviews", "rating_sum", "overall_rating"
+                )
+            ),
+            "buckets": sorted(
+                RatingBucket.objects.filter(review_count__gt=0).values_list(
+                    "platform_id", "rating", "review_count"
+                )
+            ),
+            "days": sorted(
+                RatingDay.objects.filter(review_count__gt=0).values_list(
+                    "platform_id", "day", "review_count", "rating_sum"
+                )
+            ),
+            "summary": list(
+                ReviewSummary.objects.values_list("total_reviews", "rating_sum", "average_rating")
+            ),
+        }
+
+    def assertAggregatesConsistent(self):
+        kept = self.aggregates()
+        review_aggregates.rebuild_all()
+        self.assertEqual(kept, self.aggregates())
+
+
+class ReviewAggregateTests(AggregateTestCase):
+    def test_save_edit_and_delete(self):
+        review = self.review()
+        review.save()
+        self.review(reviewer_name="Bob", rating=Decimal("6.5")).save()
+        self.assertAggregatesConsistent()
+        self.assertEqual(PlatformRating.objects.get(platform=self.google).total_reviews, 2)
+
+        review.rating = Decimal("9.5")
+        review.review_date = aware(2025, 4, 1, 23, 30)
+        review.save()
+        self.assertAggregatesConsistent()
+
+        review.platform = self.agoda
+        review.save()
+        self.assertAggregatesConsistent()
+
+        review.is_active = False
+        review.save(update_fields=["is_active"])
+        self.assertAggregatesConsistent()
+
+        review.is_active = True
+        review.save()
+        review.delete()
+        self.assertAggregatesConsistent()
+        self.assertEqual(ReviewSummary.objects.get().total_reviews, 1)
+
+    def test_upsert_reviews(self):
+        created, updated = review_aggregates.upsert_reviews(
+            [self.review(), self.review(reviewer_name="Bob", rating=Decimal("4.0"))]
+        )
+        self.assertEqual((created, updated), (2, 0))
+        self.assertAggregatesConsistent()
+
+        # Same reviews again, one re-rated and moved to another day
+        created, updated = review_aggregates.upsert_reviews(
+            [
+                self.review(),
+                self.review(
+                    reviewer_name="bob",
+                    rating=Decimal("7.0"),
+                    review_date=aware(2025, 2, 1),
+                ),
+                self.review(reviewer_name="Cy", is_active=False),
+            ]
+        )
+        self.assertEqual((created, updated), (1, 1))
+        self.assertEqual(GuestReview.objects.count(), 3)
+        self.assertAggregatesConsistent()
+        self.assertEqual(
+            PlatformRating.objects.get(platform=self.google).rating_sum, Decimal("15.0")
+        )
+
+    def test_upsert_keeps_deactivated_reviews_out(self):
+        review = self.review()
+        review.save()
+        review_aggregates.update_reviews(GuestReview.objects.all(), is_active=False)
+        review_aggregates.upsert_reviews([self.review(rating=Decimal("2.0"))])
+        self.assertAggregatesConsistent()
+        self.assertFalse(PlatformRating.objects.filter(total_reviews__gt=0).exists())
+
+    def test_update_reviews(self):
+        for index in range(5):
+            self.review(reviewer_name=f"Guest {index}", rating=Decimal(index * 2)).save()
+        reviews = GuestReview.objects.filter(rating__gte=4)
+
+        self.assertEqual(review_aggregates.update_reviews(reviews, rating=Decimal("10.0")), 3)
+        self.assertAggregatesConsistent()
+        review_aggregates.update_reviews(
+            GuestReview.objects.filter(rating__lt=4),
+            platform=self.agoda,
+            review_date=aware(2024, 12, 31),
+        )
+        self.assertAggregatesConsistent()
+        review_aggregates.update_reviews(
+            GuestReview.objects.filter(platform=self.agoda), is_active=False
+        )
+        self.assertAggregatesConsistent()
+
+    def test_record_after_bulk_create(self):
+        reviews = [
+            self.review(
+                reviewer_name=f"Guest {index}",
+                rating=Decimal("7.5"),
+                review_date=aware(2025, 1, index + 1),
+            )
+            for index in range(3)
+        ]
+        for review in reviews:
+            review.set_content_hash()
+        GuestReview.objects.bulk_create(reviews)
+        review_aggregates.record(
+            added=[(review.platform_id, review.rating, review.review_date) for review in reviews]
+        )
+        self.assertAggregatesConsistent()
+
+    def test_review_day_is_the_local_day(self):
+        # 20:00 UTC is the next morning in Bangkok
+        review = self.review(review_date=datetime(2025, 5, 1, 20, tzinfo=dt_timezone.utc))
+        review.save()
+        self.assertEqual(RatingDay.objects.get(review_count=1).day, date(2025, 5, 2))
+        self.assertAggregatesConsistent()
+
+
+class ReviewApiCacheTests(AggregateTestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first = self.review()
+            self.first.save()
+
+    def get(self, params, **headers):
+        return self.client.get(
+            reverse("review-api-page"), params, HTTP_USER_AGENT="Mozilla", **headers
+        )
+
+    def test_repeat_requests_get_304(self):
+        params = {"action": "recent_reviews", "limit": "5"}
+        response = self.get(params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["reviews"]), 1)
+
+        not_modified = self.get(params, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], response["ETag"])
+        not_modified = self.get(params, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        other = self.get({**params, "limit": "1"}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(other.status_code, 200)
+        self.assertNotEqual(other["ETag"], response["ETag"])
+        # Parameters the API does not read do not split the cache
+        ignored = self.get({**params, "utm_source": "x"}, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(ignored.status_code, 304)
+
+    def test_review_changes_produce_a_new_etag(self):
+        params = {"action": "recent_reviews"}
+        response = self.get(params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review(reviewer_name="Bob", review_date=aware(2025, 4, 1)).save()
+        changed = self.get(params, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], response["ETag"])
+        self.assertEqual(
+            [review["reviewer_name"] for review in changed.json()["reviews"]], ["Bob", "Ann"]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review_aggregates.update_reviews(
+                GuestReview.objects.filter(reviewer_name="Bob"), is_active=False
+            )
+        hidden = self.get(params, HTTP_IF_NONE_MATCH=changed["ETag"])
+        self.assertEqual(hidden.status_code, 200)
+        self.assertEqual(len(hidden.json()["reviews"]), 1)
+
+    def test_uncommitted_changes_keep_the_etag(self):
+        params = {"action": "recent_reviews"}
+        response = self.get(params)
+        with self.captureOnCommitCallbacks(execute=False):
+            self.review(reviewer_name="Bob").save()
+            self.assertEqual(
+                self.get(params, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304
+            )
+
+
+class RatingWidgetTests(AggregateTestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        override = override_settings(RATING_WIDGET_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def pointer(self):
+        return json.loads((self.directory / widget.POINTER_NAME).read_text())
+
+    def files(self):
+        return {
+            path.name: path.stat().st_mtime_ns for path in self.directory.iterdir()
+        }
+
+    def test_publish_writes_versioned_files_and_the_pointer(self):
+        self.review().save()
+        version = widget.publish()
+
+        pointer = self.pointer()
+        self.assertEqual(pointer["version"], version)
+        self.assertEqual(pointer["total_reviews"], 1)
+        self.assertTrue(pointer["html"].endswith(f"rating-{version}.html"))
+        data = json.loads((self.directory / f"rating-{version}.json").read_text())
+        self.assertEqual(data["platforms"][0]["name"], "google")
+        self.assertIn("Google", (self.directory / f"rating-{version}.html").read_text())
+        self.assertEqual(widget.current_html_url(), pointer["html"])
+
+    def test_publishing_unchanged_reviews_is_a_no_op(self):
+        self.review().save()
+        version = widget.publish()
+        files = self.files()
+
+        self.assertEqual(widget.publish(), version)
+        self.assertEqual(self.files(), files)
+
+    def test_review_changes_publish_a_new_version_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review().save()
+        first = self.pointer()["version"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.review(reviewer_name="Bob", rating=Decimal("10.0")).save()
+        pointer = self.pointer()
+        self.assertNotEqual(pointer["version"], first)
+        self.assertEqual(pointer["total_reviews"], 2)
+        # Pages that cached a link to the old version still find it
+        self.assertTrue((self.directory / f"rating-{first}.html").exists())
+
+        response = self.client.get(reverse("reviews-widget-page"), HTTP_USER_AGENT="Mozilla")
+        self.assertRedirects(response, pointer["html"], fetch_redirect_response=False)
+
+
+def csv_upload(*lines):
+    return io.BytesIO("\n".join(lines).encode() + b"\n")
+
+
+class ReviewImportTests(AggregateTestCase):
+    columns = "platform,reviewer_name,review_text,rating,trip_type,review_date"
+
+    def test_invalid_rows_go_to_the_error_report(self):
+        result = review_import.import_reviews(
+            csv_upload(
+                self.columns,
+                "google,Ann,Lovely garden,9,family,2025-03-01",
+                "google,Bob,Noisy,eleven,,",
+                "booking,Cid,Fine,8,,",
+                'agoda,Dee,"Quiet,\nclean",8,honeymoon,',
+                "agoda,Eve,Clean,7.25,solo,2025-03-02T10:00:00",
+            )
+        )
+        self.assertEqual((result.created, result.updated, result.errors), (2, 0, 3))
+        self.assertEqual(
+            sorted(GuestReview.objects.values_list("reviewer_name", "rating")),
+            [("Ann", Decimal("9.0")), ("Eve", Decimal("7.2"))],
+        )
+        self.assertAggregatesConsistent()
+
+        with open(review_import.report_path(result.report), encoding="utf-8") as report:
+            rows = list(csv.reader(report))
+        self.assertEqual(rows[0], ["line", "error", *self.columns.split(",")])
+        self.assertEqual(
+            [row[:3] for row in rows[1:]],
+            [
+                ["3", "Invalid rating 'eleven'", "google"],
+                ["4", "Unknown platform 'booking'", "booking"],
+                ["5", "Unknown trip_type 'honeymoon'", "agoda"],
+            ],
+        )
+
+    def test_reimporting_dateless_rows_changes_nothing(self):
+        lines = (self.columns, "google,Ann,Lovely garden,9,,", "agoda,Bob,Quiet,8,,2025-03-01")
+        result = review_import.import_reviews(csv_upload(*lines))
+        self.assertEqual((result.created, result.updated), (2, 0))
+        dates = dict(GuestReview.objects.values_list("reviewer_name", "review_date"))
+
+        result = review_import.import_reviews(csv_upload(*lines))
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 0, 2))
+        self.assertEqual(
+            dict(GuestReview.objects.values_list("reviewer_name", "review_date")), dates
+        )
+
+        # Dateless rows still update the other fields, and a date given later is taken
+        result = review_import.import_reviews(
+            csv_upload(self.columns, "google,Ann,Lovely garden,10,,", "agoda,Bob,Quiet,8,,")
+        )
+        self.assertEqual((result.updated, result.unchanged), (1, 1))
+        ann = GuestReview.objects.get(reviewer_name="Ann")
+        self.assertEqual((ann.rating, ann.review_date), (Decimal("10.0"), dates["Ann"]))
+        review_import.import_reviews(
+            csv_upload(self.columns, "google,Ann,Lovely garden,10,,2025-02-01")
+        )
+        ann.refresh_from_db()
+        self.assertEqual(timezone.localdate(ann.review_date), date(2025, 2, 1))
+        self.assertAggregatesConsistent()
+
+    def test_clean_imports_write_no_report(self):
+        result = review_import.import_reviews(
+            csv_upload(self.columns, "google,Ann,Lovely garden,9,,")
+        )
+        self.assertEqual((result.created, result.errors, result.report), (1, 0, None))
+
+    def test_missing_columns_are_rejected(self):
+        with self.assertRaisesMessage(ValueError, "Missing column(s): rating"):
+            review_import.import_reviews(csv_upload("platform,reviewer_name,review_text"))
+
+    def test_staff_download_the_report_by_token(self):
+        result = review_import.import_reviews(
+            csv_upload(self.columns, "booking,Cid,Fine,8,,")
+        )
+        url = reverse("bulk_import-report-page", args=[result.report])
+
+        response = self.client.get(url, HTTP_USER_AGENT="Mozilla")
+        self.assertEqual(response.status_code, 302)
+
+        staff = get_user_model().objects.create_user("staff", password="x", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url, HTTP_USER_AGENT="Mozilla")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(result.report, response["Content-Disposition"])
+        self.assertIn(b"Unknown platform 'booking'", b"".join(response.streaming_content))
+
+        missing = reverse("bulk_import-report-page", args=[uuid.uuid4()])
+        self.assertEqual(self.client.get(missing, HTTP_USER_AGENT="Mozilla").status_code, 404)
+
+
+class ReviewSearchTests(AggregateTestCase):
+    def found(self, text):
+        return list(
+            review_search.search(GuestReview.objects.all(), text)
+            .order_by("-search_rank", "id")
+            .values_list("reviewer_name", flat=True)
+        )
+
+    def test_index_follows_review_writes(self):
+        ann = self.review(review_text="Lovely garden by the river")
+        ann.save()
+        self.assertEqual(self.found("garden"), ["Ann"])
+
+        ann.review_text = "Quiet rooms near the market"
+        ann.save()
+        self.assertEqual(self.found("garden"), [])
+        self.assertEqual(self.found("market quiet"), ["Ann"])
+
+        # Bulk writes skip the model but not the triggers
+        GuestReview.objects.filter(pk=ann.pk).update(reviewer_name="Anna")
+        review_aggregates.upsert_reviews([self.review(reviewer_name="Bob", review_text="Market")])
+        self.assertEqual(self.found("anna"), ["Anna"])
+        self.assertEqual(sorted(self.found("market")), ["Anna", "Bob"])
+
+        ann.delete()
+        self.assertEqual(self.found("market"), ["Bob"])
+        self.assertEqual(self.found("anna"), [])
+
+    def test_matching_and_ranking(self):
+        self.review(reviewer_name="Café Lover", review_text="Good breakfast").save()
+        self.review(reviewer_name="Dee", review_text="The cafe lover in me was happy").save()
+        # Names rank above texts, accents are ignored
+        self.assertEqual(self.found("cafe lover"), ["Café Lover", "Dee"])
+        self.assertEqual(self.found('breakfast "lover'), ["Café Lover"])
+        self.assertFalse(review_search.search(GuestReview.objects.all(), "   ").exists())
+
+    def test_review_api_search(self):
+        self.review(review_text="Lovely garden").save()
+        self.review(reviewer_name="Bob", review_text="Garden view", is_active=False).save()
+        response = self.client.get(
+            reverse("review-api-page"),
+            {"action": "search", "q": "garden"},
+            HTTP_USER_AGENT="Mozilla",
+        )
+        self.assertEqual(
+            [review["reviewer_name"] for review in response.json()["reviews"]], ["Ann"]
+        )
+
+
+class ReviewSyncTests(AggregateTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        (Path(self.directory) / "google").mkdir()
+
+    def export(self, filename, *rows):
+        with open(Path(self.directory) / "google" / filename, "w", encoding="utf-8") as export:
+            json.dump(
+                [
+                    {
+                        "review_date": "2025-03-01",
+                        "reviewer_name": "Ann",
+                        "review_text": "Lovely garden",
+                        "rating": "8",
+                        **row,
+                    }
+                    for row in rows
+                ],
+                export,
+            )
+
+    def sync(self, full=False):
+        return sync_platform(self.google, self.directory, full=full)
+
+    def mark(self):
+        return ReviewSyncState.objects.get(platform=self.google).last_changed_at
+
+    def test_high_water_mark(self):
+        self.export(
+            "a.json",
+            {"review_id": "1", "updated_at": "2025-03-02T10:00:00"},
+            {"review_id": "2", "reviewer_name": "Bob", "updated_at": "2025-03-05T10:00:00"},
+        )
+        result = self.sync()
+        self.assertEqual((result.created, result.skipped), (2, 0))
+        self.assertEqual(self.mark(), aware(2025, 3, 5, 10))
+        self.assertEqual(ReviewSyncState.objects.get(platform=self.google).last_external_id, "2")
+
+        # Rows changed before the mark are skipped, those at it are re-read
+        self.export(
+            "b.json",
+            {"review_id": "3", "reviewer_name": "Cy", "updated_at": "2025-03-05T10:00:00"},
+            {"review_id": "1", "rating": "9", "updated_at": "2025-03-06T08:00:00"},
+        )
+        result = self.sync()
+        self.assertEqual(
+            (result.created, result.updated, result.unchanged, result.skipped), (1, 1, 1, 1)
+        )
+        self.assertEqual(self.mark(), aware(2025, 3, 6, 8))
+        self.assertEqual(GuestReview.objects.get(external_id="1").rating, Decimal("9.0"))
+
+        result = self.sync()
+        self.assertEqual(
+            (result.created, result.updated, result.unchanged, result.skipped), (0, 0, 1, 3)
+        )
+        self.assertEqual(self.mark(), aware(2025, 3, 6, 8))
+
+        result = self.sync(full=True)
+        self.assertEqual((result.created, result.updated, result.unchanged), (0, 0, 3))
+        self.assertAggregatesConsistent()
+
+    def test_mark_does_not_move_back(self):
+        self.export("a.json", {"review_id": "1", "updated_at": "2025-03-09"})
+        self.sync()
+        self.export("a.json", {"review_id": "1", "rating": "2", "updated_at": "2025-03-01"})
+        result = self.sync(full=True)
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(self.mark(), aware(2025, 3, 9))
+
+    def test_latest_change_wins_in_any_file_order(self):
+        # The older copy sorts last
+        self.export("a.json", {"review_id": "1", "rating": "10", "updated_at": "2025-03-08"})
+        self.export("b.json", {"review_id": "1", "rating": "3", "updated_at": "2025-03-02"})
+        result = self.sync()
+        self.assertEqual((result.created, result.superseded), (1, 1))
+        self.assertEqual(GuestReview.objects.get().rating, Decimal("10.0"))
+        self.assertAggregatesConsistent()
+
+    def test_unreadable_rows_and_files(self):
+        self.export(
+            "a.json",
+            {"review_id": "1", "rating": "eleven"},
+            {"review_id": "2", "reviewer_name": "Bob"},
+        )
+        (Path(self.directory) / "google" / "b.json").write_text('{"reviews": 5}')
+        (Path(self.directory) / "google" / "c.json").write_text("[")
+        result = self.sync()
+        self.assertEqual(result.created, 1)
+        self.assertEqual(
+            [location for location, _error in result.errors], ["a.json[0]", "b.json", "c.json"]
+        )
+
+    def test_imported_reviews_are_matched_not_duplicated(self):
+        review_aggregates.upsert_reviews([self.review(review_text="Lovely  garden")])
+        self.export(
+            "a.json",
+            {"review_id": "G1", "reviewer_name": "ann", "rating": "9", "updated_at": "2025-03-02"},
+        )
+        result = self.sync()
+        self.assertEqual((result.adopted, result.created, result.updated), (1, 0, 1))
+        review = GuestReview.objects.get()
+        self.assertEqual((review.external_id, review.rating), ("G1", Decimal("9.0")))
+        self.assertAggregatesConsistent()
+
+        result = self.sync(full=True)
+        self.assertEqual((result.adopted, result.unchanged), (0, 1))
+
+
+class RatingTrendTests(AggregateTestCase):
+    def test_trends_follow_the_review_days(self):
+        self.review(rating=Decimal("8.0"), review_date=aware(2025, 1, 15)).save()
+        self.review(
+            reviewer_name="Bob", rating=Decimal("6.0"), review_date=aware(2025, 1, 20)
+        ).save()
+        self.review(
+            reviewer_name="Cy", rating=Decimal("9.0"), review_date=aware(2025, 3, 5)
+        ).save()
+
+        trends = RatingTrends.build(date(2025, 3, 31))
+        row = [platform["id"] for platform in trends.platforms].index(self.google.id)
+        self.assertEqual(
+            [str(month) for month in trends.months], ["2025-01", "2025-02", "2025-03"]
+        )
+        self.assertEqual(trends.count[row].tolist(), [2, 0, 1])
+        self.assertEqual(trends.mean[row][0], 7.0)
+        # The 90 days up to March 31st include the January reviews
+        self.assertAlmostEqual(trends.rolling_mean[row][2], 23 / 3)
@@ -30,6 +30,11 @@ urlpatterns = [
     path(
         "admin/bulk-import/", views.bulk_import_reviews, name="bulk_import-reviews-page"
     ),
+    path(
+        "admin/bulk-import/<uuid:token>/report/",
+        views.bulk_import_report,
+        name="bulk_import-report-page",
+    ),
     # Room detail and booking
     path("room/<slug:slug>/", views.room_detail_view, name="room-detail-page"),
     # Room listings
@@ -44,4 +49,5 @@ urlpatterns = [
         views.room_availability_api,
         name="room-availability-api-page",
     ),
+    path("api/room-quotes/", views.room_quotes_api, name="room-quotes-api-page"),
 ]
@@ -1,14 +1,54 @@
 from .models import *
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.db.models import Prefetch
 from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
 from django.core.mail import send_mail
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from home.pagination import CURSOR_PARAM, InvalidCursor, keyset_page, paginate
+
+from . import (
+    amenities,
+    availability,
+    catalog,
+    facets,
+    rates,
+    review_aggregates,
+    review_cache,
+    review_import,
+    review_search,
+    review_trends,
+    widget,
+)
+from .bookings import create_booking
+
+# Sort keys of the paginated lists (see home.pagination), each ending in a unique key
+ROOM_LIST_KEYS = ("room_type__price_per_night", "room_type__name", "id")
+REVIEW_LIST_KEYS = ("-review_date", "-id")
+REVIEW_SEARCH_KEYS = ("-search_rank", "-id")
+
+
+def _decimal_or_none(value):
+    try:
+        number = Decimal(value) if value else None
+    except InvalidOperation:
+        return None
+    return number if number is not None and number.is_finite() else None
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
 
 
 def hotel(request):
@@ -16,100 +56,138 @@ def hotel(request):
 
     # Get query parameters for filtering
     room_type_filter = request.GET.get("room_type")
-    min_price = request.GET.get("min_price")
-    max_price = request.GET.get("max_price")
+    min_price_filter = request.GET.get("min_price")
+    max_price_filter = request.GET.get("max_price")
     capacity_filter = request.GET.get("capacity")
     view_type_filter = request.GET.get("view_type")
-    amenity_filter = request.GET.get("amenity")
-
-    # Base queryset - available rooms only
-    rooms = (
-        Room.objects.filter(is_out_of_order=False, check_in_date="")
-        .select_related("room_type")
-        .prefetch_related("amenities", "room_images", "roomamenity_set__amenity")
-    )
+    amenity_filter = request.GET.getlist("amenity")
+    amenity_match = request.GET.get("amenity_match", "all")
+    check_in_filter = request.GET.get("check_in")
+    check_out_filter = request.GET.get("check_out")
 
-    # Apply filters
-    if room_type_filter:
-        rooms = rooms.filter(room_type__id=room_type_filter)
+    snapshot = catalog.get_catalog()
 
-    if min_price:
+    # With a stay, availability comes from the booking index; without one,
+    # show the rooms nobody is checked in to
+    stay = None
+    if check_in_filter or check_out_filter:
         try:
-            rooms = rooms.filter(room_type__price_per_night__gte=float(min_price))
-        except ValueError:
-            pass
-
-    if max_price:
-        try:
-            rooms = rooms.filter(room_type__price_per_night__lte=float(max_price))
-        except ValueError:
-            pass
-
-    if capacity_filter:
-        try:
-            rooms = rooms.filter(room_type__capacity__gte=int(capacity_filter))
-        except ValueError:
-            pass
-
-    # view_type filter removed as field no longer exists
-    # if view_type_filter:
-    #     rooms = rooms.filter(view_type=view_type_filter)
+            stay = availability.parse_stay(check_in_filter, check_out_filter)
+        except ValueError as e:
+            messages.error(request, f"Please provide valid check-in and check-out dates. {e}")
+    booked = availability.booked_room_ids(*stay) if stay else set()
+
+    min_price = _decimal_or_none(min_price_filter)
+    max_price = _decimal_or_none(max_price_filter)
+    capacity = _int_or_none(capacity_filter)
+    amenity_ids = {amenity_id for amenity_id in map(_int_or_none, amenity_filter) if amenity_id}
+
+    # Rooms that can be shown at all; the sidebar filters narrow them down
+    candidates = [
+        room
+        for room in snapshot.rooms
+        if not room.is_out_of_order
+        and room.id not in booked
+        and (stay or not room.check_in_date)
+    ]
+
+    filters = {}
+    if room_type_filter:
+        filters["room_type"] = lambda room: str(room.room_type_id) == room_type_filter
+    if min_price is not None or max_price is not None:
+        filters["price"] = lambda room: (
+            (min_price is None or room.room_type.price_per_night >= min_price)
+            and (max_price is None or room.room_type.price_per_night <= max_price)
+        )
+    if capacity is not None:
+        filters["capacity"] = lambda room: room.room_type.capacity >= capacity
+    if amenity_ids:
+        selected = [amenity for amenity in snapshot.amenities if amenity.id in amenity_ids]
+        amenity_mask = sum(amenity.mask for amenity in selected)
+        unmasked = [amenity.id for amenity in selected if amenity.bit is None]
+        filters["amenity"] = lambda room: amenities.matches(
+            room, amenity_mask, unmasked, match_all=amenity_match != "any"
+        )
 
-    if amenity_filter:
-        rooms = rooms.filter(amenities__id=amenity_filter)
+    # Get price range for slider
+    price_range = snapshot.price_range
+    price_buckets = facets.price_buckets(price_range["min_price"], price_range["max_price"])
+
+    # Filtered rooms and the counts shown next to every filter value
+    rooms, facet_counts = facets.search(
+        candidates,
+        filters,
+        price_buckets,
+        # With "all", an amenity count is what ticking one more box would show
+        conjunctive=("amenity",) if amenity_match != "any" else (),
+    )
 
-    # Order by featured rooms first, then by price
-    rooms = rooms.order_by("-room_type__is_featured", "room_type__price_per_night")
+    # Featured rooms first, then by price
+    rooms.sort(key=lambda room: (not room.room_type.is_featured, room.room_type.price_per_night))
 
     # Get data for filter dropdowns
-    room_types = RoomType.objects.all().order_by("name")
-    available_amenities = (
-        Amenity.objects.filter(
-            is_active=True, rooms__is_out_of_order=False
-        )
-        .distinct()
-        .order_by("name")
-    )
-
-    # Get price range for slider
-    price_range = RoomType.objects.aggregate(
-        min_price=models.Min("price_per_night"), max_price=models.Max("price_per_night")
+    room_types = snapshot.room_types
+    room_type_facets = [
+        (room_type, facet_counts["room_type"][room_type.id]) for room_type in room_types
+    ]
+    in_service_amenities = set().union(
+        *(room.amenity_ids for room in snapshot.rooms if not room.is_out_of_order)
     )
+    amenity_facets = [
+        (amenity, facet_counts["amenity"][amenity.id])
+        for amenity in snapshot.amenities
+        if amenity.id in in_service_amenities
+    ]
+    capacity_choices = [
+        (i, f"{i}+ Guests", facets.at_least(facet_counts["capacity"], i)) for i in range(1, 11)
+    ]
+    price_bucket_facets = [
+        {
+            "min_price": low,
+            # Bounds are inclusive, so stop a cent short of the next bucket
+            "max_price": high if index == len(price_buckets) - 1 else high - Decimal("0.01"),
+            "count": facet_counts["price"][index],
+        }
+        for index, (low, high) in enumerate(price_buckets)
+    ]
 
     # Get featured rooms for highlights
-    featured_rooms = rooms.filter(room_type__is_featured=True)[:3]
+    featured_rooms = [room for room in rooms if room.room_type.is_featured][:3]
 
     # Get reviews (keeping your original logic)
     reviews = Review.objects.filter(is_approved=True).order_by("-date_posted")[:5]
 
     # Room statistics
     room_stats = {
-        "total_available": rooms.count(),
-        "room_types_count": room_types.count(),
-        "avg_price": RoomType.objects.aggregate(avg=models.Avg("price_per_night"))[
-            "avg"
-        ],
+        "total_available": len(rooms),
+        "room_types_count": len(room_types),
+        "avg_price": snapshot.average_price,
     }
 
     context = {
         "rooms": rooms,
         "featured_rooms": featured_rooms,
         "room_types": room_types,
-        "available_amenities": available_amenities,
+        "room_type_facets": room_type_facets,
+        "amenity_facets": amenity_facets,
+        "price_bucket_facets": price_bucket_facets,
         "reviews": reviews,
         "room_stats": room_stats,
         "price_range": price_range,
         # Current filter values for maintaining state
         "current_filters": {
             "room_type": room_type_filter,
-            "min_price": min_price,
-            "max_price": max_price,
+            "min_price": min_price_filter,
+            "max_price": max_price_filter,
             "capacity": capacity_filter,
             "view_type": view_type_filter,
             "amenity": amenity_filter,
+            "amenity_match": amenity_match,
+            "check_in": check_in_filter,
+            "check_out": check_out_filter,
         },
         # Choices for dropdowns
-        "capacity_choices": [(i, f"{i}+ Guests") for i in range(1, 11)],
+        "capacity_choices": capacity_choices,
     }
 
     return render(request, "hotel/hotel.html", context)
@@ -157,12 +235,8 @@ def rooms_list_view(request):
     # floors = Room.objects.values_list("floor", flat=True).distinct().order_by("floor")  # Removed as floor field no longer exists
     floors = []  # Empty list since floor field is removed
 
-    # Pagination
-    from django.core.paginator import Paginator
-
-    paginator = Paginator(rooms, 12)  # 12 rooms per page
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Pagination, numbered or by cursor
+    page_obj = paginate(request, rooms, ROOM_LIST_KEYS, 12)  # 12 rooms per page
 
     context = {
         "page_obj": page_obj,
@@ -250,12 +324,6 @@ def review(request):
         .prefetch_related(
             Prefetch("rating"),
             Prefetch("category_ratings__category"),
-            Prefetch(
-                "reviews",
-                queryset=GuestReview.objects.filter(is_active=True).order_by(
-                    "-review_date"
-                )[:1],
-            ),  # Latest review per platform
         )
         .order_by("display_order")
     )
@@ -296,6 +364,8 @@ def review(request):
         "recent_reviews": recent_reviews,
         "featured_reviews": featured_reviews,
         "review_summary": review_summary,
+        # Monthly rating series for charts, see hotel.review_trends
+        "rating_trends": review_trends.rating_trends().as_json(),
         "page_title": "Guest Reviews & Ratings",
     }
 
@@ -306,9 +376,9 @@ def review(request):
 def room_booking_view(request, slug):
     """Handle room booking form submission"""
 
-    room = get_object_or_404(Room, slug=slug)
+    room = get_object_or_404(Room.objects.select_related("room_type"), slug=slug)
 
-    if not room.is_available_for_booking:
+    if room.is_out_of_order:
         messages.error(request, "Sorry, this room is not available for booking.")
         return redirect("room-detail-page", slug=slug)
 
@@ -317,6 +387,21 @@ def room_booking_view(request, slug):
     check_out_str = request.POST.get("check_out")
     guests = request.POST.get("guests")
     special_requests = request.POST.get("special_requests", "")
+    guest_name = request.POST.get("guest_name", "").strip() or (
+        request.user.get_full_name() if request.user.is_authenticated else ""
+    )
+    guest_email = request.POST.get("guest_email", "").strip() or (
+        request.user.email if request.user.is_authenticated else ""
+    )
+    guest_phone = request.POST.get("guest_phone", "").strip()
+    # Sent by clients that may retry the same submission
+    idempotency_key = request.POST.get("idempotency_key") or request.headers.get(
+        "Idempotency-Key"
+    )
+
+    if not guest_name or not guest_email:
+        messages.error(request, "Please provide your name and email address.")
+        return redirect("room-detail-page", slug=slug)
 
     # Validate dates
     try:
@@ -331,7 +416,12 @@ def room_booking_view(request, slug):
             messages.error(request, "Check-out date must be after check-in date.")
             return redirect("room-detail-page", slug=slug)
 
-        if int(guests) > room.room_type.capacity:
+        guests_count = int(guests)
+        if guests_count < 1:
+            messages.error(request, "Please provide a valid number of guests.")
+            return redirect("room-detail-page", slug=slug)
+
+        if guests_count > room.room_type.capacity:
             messages.error(
                 request,
                 f"This room can accommodate maximum {room.room_type.capacity} guests.",
@@ -343,14 +433,40 @@ def room_booking_view(request, slug):
         return redirect("room-detail-page", slug=slug)
 
     # Calculate booking details
-    nights = (check_out - check_in).days
-    room_total = room.room_type.price_per_night * nights
-    service_fee = 15 * nights
-    taxes = 12 * nights
-    total_amount = room_total + service_fee + taxes
+    try:
+        stay_quote = rates.quote(room.room_type_id, check_in, check_out)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect("room-detail-page", slug=slug)
+    nights = stay_quote.nights
+    total_amount = stay_quote.total
 
-    # Here you would typically create a booking record
-    # For now, we'll just show a success message
+    try:
+        booking, created = create_booking(
+            room,
+            check_in,
+            check_out,
+            idempotency_key=idempotency_key,
+            guest_name=guest_name[:100],
+            guest_email=guest_email,
+            guest_phone=guest_phone[:20],
+            guests_count=guests_count,
+            total_amount=total_amount,
+            special_requests=special_requests,
+        )
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect("room-detail-page", slug=slug)
+
+    if not created:
+        # A retry of a request that already went through
+        messages.success(
+            request,
+            f"Booking request {booking.id} was already submitted. "
+            f"Total: ${booking.total_amount} for {booking.nights_count} "
+            f'night{"s" if booking.nights_count != 1 else ""}.',
+        )
+        return redirect("room-detail-page", slug=slug)
 
     # Send confirmation email (optional)
     if hasattr(settings, "EMAIL_HOST") and settings.EMAIL_HOST:
@@ -366,7 +482,7 @@ def room_booking_view(request, slug):
                 - Room: {room.room_type.name} (Room {room.id})
                 - Check-in: {check_in.strftime('%B %d, %Y')}
                 - Check-out: {check_out.strftime('%B %d, %Y')}
-                - Guests: {guests}
+                - Guests: {guests_count}
                 - Total Amount: ${total_amount}
                 
                 We will contact you shortly to confirm your reservation.
@@ -375,13 +491,7 @@ def room_booking_view(request, slug):
                 Hotel Management
                 """,
                 from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[
-                    (
-                        request.user.email
-                        if request.user.is_authenticated
-                        else "guest@example.com"
-                    )
-                ],
+                recipient_list=[booking.guest_email],
                 fail_silently=True,
             )
         except:
@@ -389,7 +499,7 @@ def room_booking_view(request, slug):
 
     messages.success(
         request,
-        f"Booking request submitted successfully! "
+        f"Booking request {booking.id} submitted successfully! "
         f'Total: ${total_amount} for {nights} night{"s" if nights != 1 else ""}. '
         f"We will contact you shortly to confirm your reservation.",
     )
@@ -443,34 +553,173 @@ def room_check_out_view(request, slug):
 
 
 def room_availability_api(request):
-    """API endpoint to check room availability"""
+    """
+    API endpoint to check room availability.
+    With room_id, reports on that room; without it, lists every room that is
+    free from check_in to check_out.
+    """
 
     if request.method == "GET":
         room_id = request.GET.get("room_id")
         check_in = request.GET.get("check_in")
         check_out = request.GET.get("check_out")
 
-        try:
-            room = Room.objects.get(id=room_id)
-
-            # Here you would implement actual availability checking
-            # For now, we'll just return the room's current availability status
-
+        stay = None
+        if check_in or check_out:
+            try:
+                stay = availability.parse_stay(check_in, check_out)
+            except ValueError as e:
+                return JsonResponse({"error": str(e)}, status=400)
+
+        if not room_id:
+            if not stay:
+                return JsonResponse({"error": "check_in and check_out are required"}, status=400)
+            rooms = availability.available_rooms(
+                Room.objects.filter(is_out_of_order=False).select_related("room_type"),
+                *stay,
+            )
             return JsonResponse(
                 {
-                    "available": not room.is_out_of_order,
-                    "room_id": room.id,
-                    "room_type": room.room_type.name,
-                    "price_per_night": float(room.room_type.price_per_night),
+                    "check_in": stay[0].isoformat(),
+                    "check_out": stay[1].isoformat(),
+                    "rooms": [
+                        {
+                            "room_id": room.id,
+                            "slug": room.slug,
+                            "room_type": room.room_type.name,
+                            "price_per_night": float(room.room_type.price_per_night),
+                        }
+                        for room in rooms
+                    ],
                 }
             )
 
-        except Room.DoesNotExist:
+        try:
+            room = Room.objects.select_related("room_type").get(id=room_id)
+        except (Room.DoesNotExist, ValueError):
             return JsonResponse({"error": "Room not found"}, status=404)
 
+        if stay:
+            available = availability.is_room_available(room, *stay)
+        else:
+            available = not room.is_out_of_order
+
+        return JsonResponse(
+            {
+                "available": available,
+                "room_id": room.id,
+                "room_type": room.room_type.name,
+                "price_per_night": float(room.room_type.price_per_night),
+            }
+        )
+
     return JsonResponse({"error": "Invalid request method"}, status=405)
 
 
+# Limits of a single room_quotes_api request
+MAX_QUOTE_ROOMS = 100
+MAX_QUOTE_STAYS = 10
+
+
+def _id_list(value):
+    return [int(part) for part in (value or "").split(",") if part.strip()]
+
+
+def room_quotes_api(request):
+    """
+    Availability and price breakdown of many rooms for one or more stays.
+
+    ?room_ids=1,2,3 and/or ?room_types=1,2 select the rooms (every room
+    when both are missing), ?amenities=1,2 keeps those with all of the
+    amenities (any of them with ?amenity_match=any); ?stays=2025-12-01..2025-12-04,2026-01-10..2026-01-12
+    lists the stays. Rooms, occupancy and prices are each fetched once.
+    """
+
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method"}, status=405)
+
+    try:
+        room_ids = _id_list(request.GET.get("room_ids"))
+        room_type_ids = _id_list(request.GET.get("room_types"))
+        amenity_ids = _id_list(request.GET.get("amenities"))
+    except ValueError:
+        return JsonResponse(
+            {"error": "room_ids, room_types and amenities must be comma separated ids"}, status=400
+        )
+
+    stays = []
+    for stay in request.GET.get("stays", "").split(","):
+        if not stay.strip():
+            continue
+        check_in, _separator, check_out = stay.partition("..")
+        try:
+            stays.append(availability.parse_stay(check_in, check_out))
+        except ValueError as e:
+            return JsonResponse({"error": f"Invalid stay {stay}: {e}"}, status=400)
+    if not stays:
+        return JsonResponse({"error": "stays is required"}, status=400)
+    if len(stays) > MAX_QUOTE_STAYS:
+        return JsonResponse({"error": f"At most {MAX_QUOTE_STAYS} stays per request"}, status=400)
+
+    rooms = Room.objects.select_related("room_type").order_by("id")
+    if room_ids or room_type_ids:
+        selection = models.Q(id__in=room_ids) | models.Q(room_type_id__in=room_type_ids)
+        rooms = rooms.filter(selection)
+    rooms = amenities.filter_rooms(
+        rooms, amenity_ids, match_all=request.GET.get("amenity_match") != "any"
+    )
+    rooms = list(rooms[: MAX_QUOTE_ROOMS + 1])
+    if len(rooms) > MAX_QUOTE_ROOMS:
+        return JsonResponse({"error": f"At most {MAX_QUOTE_ROOMS} rooms per request"}, status=400)
+
+    booked = availability.booked_room_ids_by_stay(stays, room_ids=[room.id for room in rooms])
+    pairs = [(room, stay) for room in rooms for stay in stays]
+    try:
+        quotes = rates.quote_many(
+            [room.room_type_id for room, _stay in pairs],
+            [check_in for _room, (check_in, _check_out) in pairs],
+            [check_out for _room, (_check_in, check_out) in pairs],
+        )
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    # One list of quotes per room, in the order of stays
+    room_quotes = [quotes[i : i + len(stays)] for i in range(0, len(quotes), len(stays))]
+
+    return JsonResponse(
+        {
+            "stays": [
+                {"check_in": check_in.isoformat(), "check_out": check_out.isoformat()}
+                for check_in, check_out in stays
+            ],
+            "rooms": [
+                {
+                    "room_id": room.id,
+                    "slug": room.slug,
+                    "room_type_id": room.room_type_id,
+                    "room_type": room.room_type.name,
+                    "capacity": room.room_type.capacity,
+                    "quotes": [
+                        {
+                            "check_in": check_in.isoformat(),
+                            "check_out": check_out.isoformat(),
+                            "available": not room.is_out_of_order and room.id not in stay_booked,
+                            "nights": quote.nights,
+                            "room_total": float(quote.room_total),
+                            "service_fee": float(quote.service_fee),
+                            "taxes": float(quote.taxes),
+                            "total": float(quote.total),
+                        }
+                        for (check_in, check_out), stay_booked, quote in zip(
+                            stays, booked, quotes
+                        )
+                    ],
+                }
+                for room, quotes in zip(rooms, room_quotes)
+            ],
+        }
+    )
+
+
 def featured_rooms_view(request):
     """Get featured rooms for homepage"""
 
@@ -502,17 +751,11 @@ def platform_detail(request, platform_name):
         .order_by("category__display_order")
     )
 
-    # Get reviews for this platform
-    reviews = GuestReview.objects.filter(platform=platform, is_active=True).order_by(
-        "-review_date"
-    )
+    # Get reviews for this platform, newest first
+    reviews = GuestReview.objects.filter(platform=platform, is_active=True)
 
-    # Pagination
-    from django.core.paginator import Paginator
-
-    paginator = Paginator(reviews, 10)  # 10 reviews per page
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Pagination, numbered or by cursor
+    page_obj = paginate(request, reviews, REVIEW_LIST_KEYS, 10)  # 10 reviews per page
 
     context = {
         "platform": platform,
@@ -525,86 +768,157 @@ def platform_detail(request, platform_name):
     return render(request, "hotel/platform-detail.html", context)
 
 
+@condition(etag_func=review_cache.etag, last_modified_func=review_cache.last_modified)
 def review_api(request):
-    """API endpoint for AJAX requests"""
+    """
+    API endpoint for AJAX requests. Responses are cached until the reviews
+    change and carry an ETag and Last-Modified for conditional requests.
+    """
 
-    if request.method == "GET":
-        action = request.GET.get("action")
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request"}, status=400)
 
-        if action == "platform_stats":
-            platform_id = request.GET.get("platform_id")
-            try:
-                platform = ReviewPlatform.objects.get(id=platform_id, is_active=True)
-                platform_rating = platform.rating
-                category_ratings = CategoryRating.objects.filter(
-                    platform=platform
-                ).select_related("category")
-
-                data = {
-                    "platform_name": platform.display_name,
-                    "overall_rating": float(platform_rating.overall_rating),
-                    "total_reviews": platform_rating.total_reviews,
-                    "categories": [
-                        {
-                            "name": cr.category.name,
-                            "rating": float(cr.rating),
-                            "percentage": cr.rating_percentage,
-                        }
-                        for cr in category_ratings
-                    ],
-                }
-                return JsonResponse(data)
-            except (ReviewPlatform.DoesNotExist, PlatformRating.DoesNotExist):
-                return JsonResponse({"error": "Platform not found"}, status=404)
+    key = review_cache.cache_key(request)
+    data = cache.get(key)
+    if data is None:
+        data, status = _review_api_data(request)
+        if status != 200:
+            return JsonResponse(data, status=status)
+        cache.set(key, data, settings.REVIEW_API_CACHE_TIMEOUT)
+    return JsonResponse(data)
 
-        elif action == "recent_reviews":
-            platform_name = request.GET.get("platform")
-            limit = int(request.GET.get("limit", 5))
 
-            reviews_query = GuestReview.objects.filter(
-                is_active=True, platform__is_active=True
-            ).select_related("platform")
+def _review_api_data(request):
+    """(response data, status code) of a review_api request"""
 
-            if platform_name:
-                reviews_query = reviews_query.filter(platform__name=platform_name)
+    action = request.GET.get("action")
 
-            reviews = reviews_query.order_by("-review_date")[:limit]
+    if action == "platform_stats":
+        platform_id = request.GET.get("platform_id")
+        try:
+            platform = ReviewPlatform.objects.get(id=platform_id, is_active=True)
+            platform_rating = platform.rating
+            category_ratings = CategoryRating.objects.filter(
+                platform=platform
+            ).select_related("category")
 
             data = {
-                "reviews": [
+                "platform_name": platform.display_name,
+                "overall_rating": float(platform_rating.overall_rating),
+                "total_reviews": platform_rating.total_reviews,
+                "histogram": review_aggregates.histogram(platform.id),
+                "categories": [
                     {
-                        "reviewer_name": review.reviewer_name,
-                        "rating": float(review.rating),
-                        "review_text": review.review_text,
-                        "trip_type": review.get_trip_type_display(),
-                        "days_ago": review.days_ago,
-                        "platform_name": review.platform.display_name,
-                        "platform_color": review.platform.brand_color,
-                        "is_superhost": review.is_superhost_review,
+                        "name": cr.category.name,
+                        "rating": float(cr.rating),
+                        "percentage": cr.rating_percentage,
                     }
-                    for review in reviews
-                ]
+                    for cr in category_ratings
+                ],
             }
-            return JsonResponse(data)
+            return data, 200
+        except (ValueError, ReviewPlatform.DoesNotExist, PlatformRating.DoesNotExist):
+            return {"error": "Platform not found"}, 404
 
-    return JsonResponse({"error": "Invalid request"}, status=400)
+    elif action == "recent_reviews":
+        platform_name = request.GET.get("platform")
+        try:
+            limit = int(request.GET.get("limit", 5))
+        except ValueError:
+            return {"error": "Invalid limit"}, 400
+        # Larger pages are cut down; the cursor continues where a page ends
+        limit = min(max(limit, 1), settings.REVIEW_API_MAX_LIMIT)
 
+        reviews_query = GuestReview.objects.filter(
+            is_active=True, platform__is_active=True
+        ).select_related("platform")
 
-# Additional utility views
+        if platform_name:
+            reviews_query = reviews_query.filter(platform__name=platform_name)
 
+        try:
+            page = keyset_page(
+                reviews_query, REVIEW_LIST_KEYS, limit, request.GET.get(CURSOR_PARAM)
+            )
+        except InvalidCursor as e:
+            return {"error": str(e)}, 400
 
-def reviews_widget(request):
-    """Small widget showing overall rating for embedding"""
+        data = {
+            "reviews": [_review_data(review) for review in page],
+            "pagination": page.page_info(),
+        }
+        return data, 200
 
-    review_summary = ReviewSummary.objects.first()
-    if not review_summary:
-        review_summary = ReviewSummary.objects.create()
+    elif action == "search":
+        # Best matches first, see hotel.review_search
+        query = request.GET.get("q", "").strip()
+        if not query:
+            return {"error": "Missing search query"}, 400
+        try:
+            limit = int(request.GET.get("limit", 10))
+        except ValueError:
+            return {"error": "Invalid limit"}, 400
+        limit = min(max(limit, 1), settings.REVIEW_API_MAX_LIMIT)
 
-    context = {
-        "review_summary": review_summary,
+        reviews_query = GuestReview.objects.filter(
+            is_active=True, platform__is_active=True
+        ).select_related("platform")
+        platform_name = request.GET.get("platform")
+        if platform_name:
+            reviews_query = reviews_query.filter(platform__name=platform_name)
+
+        try:
+            page = keyset_page(
+                review_search.search(reviews_query, query),
+                REVIEW_SEARCH_KEYS,
+                limit,
+                request.GET.get(CURSOR_PARAM),
+            )
+        except InvalidCursor as e:
+            return {"error": str(e)}, 400
+
+        data = {
+            "query": query,
+            "reviews": [
+                {**_review_data(review), "rank": review.search_rank} for review in page
+            ],
+            "pagination": page.page_info(),
+        }
+        return data, 200
+
+    elif action == "trends":
+        # Monthly rating series per platform, see hotel.review_trends
+        return review_trends.rating_trends().as_json(), 200
+
+    return {"error": "Invalid request"}, 400
+
+
+def _review_data(review):
+    return {
+        "reviewer_name": review.reviewer_name,
+        "rating": float(review.rating),
+        "review_text": review.review_text,
+        "trip_type": review.get_trip_type_display(),
+        "days_ago": review.days_ago,
+        "platform_name": review.platform.display_name,
+        "platform_color": review.platform.brand_color,
+        "is_superhost": review.is_superhost_review,
     }
 
-    return render(request, "hotel/rating-widget.html", context)
+
+# Additional utility views
+
+
+def reviews_widget(request):
+    """
+    Small widget showing overall rating for embedding. The widget is a
+    pre-rendered static file (see hotel.widget), this only sends embeds to
+    its current version.
+    """
+
+    response = redirect(widget.current_html_url())
+    patch_cache_control(response, public=True, max_age=300)
+    return response
 
 
 def platform_redirect(request, platform_name):
@@ -629,29 +943,15 @@ from django.contrib import messages
 
 @staff_member_required
 def update_platform_stats(request, platform_id):
-    """Admin view to manually update platform statistics"""
+    """
+    Admin view to manually update platform category ratings. The overall
+    rating and review count follow the platform's reviews.
+    """
 
     platform = get_object_or_404(ReviewPlatform, id=platform_id)
 
     if request.method == "POST":
         try:
-            # Update platform rating
-            overall_rating = float(request.POST.get("overall_rating", 0))
-            total_reviews = int(request.POST.get("total_reviews", 0))
-
-            platform_rating, created = PlatformRating.objects.get_or_create(
-                platform=platform,
-                defaults={
-                    "overall_rating": overall_rating,
-                    "total_reviews": total_reviews,
-                },
-            )
-
-            if not created:
-                platform_rating.overall_rating = overall_rating
-                platform_rating.total_reviews = total_reviews
-                platform_rating.save()
-
             # Update category ratings
             categories = ReviewCategory.objects.filter(platform=platform)
             for category in categories:
@@ -663,11 +963,6 @@ def update_platform_stats(request, platform_id):
                         defaults={"rating": rating_value},
                     )
 
-            # Update review summary
-            summary = ReviewSummary.objects.first()
-            if summary:
-                summary.save()  # This will trigger the calculate_summary method
-
             messages.success(
                 request, f"{platform.display_name} stats updated successfully!"
             )
@@ -684,40 +979,29 @@ def update_platform_stats(request, platform_id):
 def bulk_import_reviews(request):
     """Admin view for bulk importing reviews from CSV"""
 
+    context = {}
     if request.method == "POST" and request.FILES.get("csv_file"):
-        import csv
-        import io
-
-        csv_file = request.FILES["csv_file"]
-        data_set = csv_file.read().decode("UTF-8")
-        io_string = io.StringIO(data_set)
-
-        reader = csv.DictReader(io_string)
+        try:
+            result = review_import.import_reviews(request.FILES["csv_file"])
+        except ValueError as e:
+            messages.error(request, f"Could not import reviews: {e}")
+        else:
+            messages.success(
+                request,
+                f"Successfully imported {result.created} new and {result.updated} updated "
+                f"reviews, {result.unchanged} unchanged. {result.errors} errors.",
+            )
+            context["result"] = result
 
-        created_count = 0
-        error_count = 0
+    return render(request, "hotel/bulk-import.html", context)
 
-        for row in reader:
-            try:
-                platform = ReviewPlatform.objects.get(name=row["platform"])
-
-                GuestReview.objects.create(
-                    platform=platform,
-                    reviewer_name=row["reviewer_name"],
-                    review_text=row["review_text"],
-                    rating=float(row["rating"]),
-                    trip_type=row.get("trip_type", "other"),
-                    is_verified=row.get("is_verified", "true").lower() == "true",
-                )
-                created_count += 1
-
-            except Exception as e:
-                error_count += 1
-                print(f"Error importing row: {e}")
 
-        messages.success(
-            request,
-            f"Successfully imported {created_count} reviews. {error_count} errors.",
-        )
+@staff_member_required
+def bulk_import_report(request, token):
+    """Download the error report of a bulk review import"""
 
-    return render(request, "hotel/bulk-import.html")
+    try:
+        report = open(review_import.report_path(token), "rb")
+    except FileNotFoundError:
+        raise Http404("Import report not found")
+    return FileResponse(report, as_attachment=True, filename=f"review-import-errors-{token}.csv")
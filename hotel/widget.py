@@ -0,0 +1,149 @@
+"""
+Pre-rendered rating widget.
+
+The embeddable rating widget is rendered to static files in the media
+directory whenever the reviews change, so partner sites embedding it are
+served by nginx and never reach Django:
+
+* ``rating-<version>.html`` and ``rating-<version>.json`` are named after a
+  hash of their content and never change, so they are cached for a year.
+* ``rating.json`` holds the current data and the URLs of the current
+  versioned files, for embeds that need a stable URL; nginx gives it a
+  short max-age.
+
+The reviews_widget view only redirects to the current versioned page.
+
+The widget is always rendered in the site's default language
+(LANGUAGE_CODE), whichever language the request or command that
+published it had active, so its content and version do not flip between
+languages.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import translation
+
+from .models import PlatformRating, ReviewSummary
+
+logger = logging.getLogger(__name__)
+
+VERSION_CACHE_KEY = "hotel:rating_widget_version"
+FILE_PREFIX = "rating-"
+POINTER_NAME = "rating.json"
+# Older versions are kept for pages that cached a link to them
+VERSIONS_KEPT = 10
+
+
+def widget_dir():
+    return Path(settings.RATING_WIDGET_DIR)
+
+
+def widget_url(name):
+    return f"{settings.RATING_WIDGET_URL}{name}"
+
+
+def widget_data():
+    summary = ReviewSummary.objects.first()
+    ratings = PlatformRating.objects.filter(platform__is_active=True).select_related(
+        "platform"
+    )
+    return {
+        "average_rating": str(summary.average_rating if summary else "0.0"),
+        "total_reviews": summary.total_reviews if summary else 0,
+        "platforms": [
+            {
+                "name": rating.platform.name,
+                "display_name": rating.platform.display_name,
+                "brand_color": rating.platform.brand_color,
+                "rating": str(rating.overall_rating),
+                "total_reviews": rating.total_reviews,
+            }
+            for rating in ratings.order_by("platform__display_order", "platform__display_name")
+        ],
+    }
+
+
+def _write(path, content):
+    """Replace ``path`` atomically, readers never see a partial file"""
+    handle, temp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(handle, "wb") as temp_file:
+        temp_file.write(content)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+
+def _prune(directory):
+    versions = sorted(
+        directory.glob(f"{FILE_PREFIX}*.html"), key=lambda path: path.stat().st_mtime
+    )
+    for html_path in versions[:-VERSIONS_KEPT]:
+        html_path.unlink(missing_ok=True)
+        html_path.with_suffix(".json").unlink(missing_ok=True)
+
+
+def publish():
+    """Render the widget files for the current reviews, returns the version"""
+    data = widget_data()
+    data_json = json.dumps(data, separators=(",", ":")).encode()
+    with translation.override(settings.LANGUAGE_CODE):
+        html = render_to_string("hotel/rating-widget.html", {"widget": data}).encode()
+    version = hashlib.sha256(html + data_json).hexdigest()[:12]
+
+    directory = widget_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    html_path = directory / f"{FILE_PREFIX}{version}.html"
+    if not html_path.exists():
+        _write(directory / f"{FILE_PREFIX}{version}.json", data_json)
+        _write(html_path, html)
+    pointer = {
+        "version": version,
+        "html": widget_url(html_path.name),
+        "json": widget_url(f"{FILE_PREFIX}{version}.json"),
+        **data,
+    }
+    pointer_json = json.dumps(pointer, separators=(",", ":")).encode()
+    pointer_path = directory / POINTER_NAME
+    # Unchanged reviews leave the files, and their mtimes and ETags, alone
+    if not pointer_path.exists() or pointer_path.read_bytes() != pointer_json:
+        _write(pointer_path, pointer_json)
+        _prune(directory)
+    cache.set(VERSION_CACHE_KEY, version, None)
+    return version
+
+
+def _publish_quietly():
+    # Runs after the commit of a review change, which must not fail on it
+    try:
+        publish()
+    except Exception:
+        logger.exception("Could not publish the rating widget")
+
+
+def publish_on_commit():
+    """Re-render the widget once the current transaction commits"""
+    transaction.on_commit(_publish_quietly)
+
+
+def current_version():
+    """Version of the published widget, publishing it if there is none"""
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        try:
+            with open(widget_dir() / POINTER_NAME, encoding="utf-8") as pointer:
+                version = json.load(pointer)["version"]
+        except (OSError, ValueError, KeyError):
+            return publish()
+        cache.set(VERSION_CACHE_KEY, version, None)
+    return version
+
+
+def current_html_url():
+    return widget_url(f"{FILE_PREFIX}{current_version()}.html")
@@ -7,6 +7,9 @@ import sys
 def main():
     """Run administrative tasks."""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.dev')
+    # Tests run on the dev settings with a local cache and scratch file dirs
+    if sys.argv[1:2] == ['test'] and os.environ['DJANGO_SETTINGS_MODULE'] == 'config.settings.dev':
+        os.environ['DJANGO_SETTINGS_MODULE'] = 'config.settings.test'
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -24,6 +24,9 @@ class Product(models.Model):
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to="products/", blank=True, null=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     is_available = models.BooleanField(default=True)
     slug = models.SlugField(max_length=200, unique=True, blank=True)
     category = models.ForeignKey(
@@ -49,6 +52,9 @@ class ProductImage(models.Model):
         Product, related_name="product_images", on_delete=models.CASCADE
     )
     image = models.ImageField(upload_to="products/")
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     alt_text = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
 
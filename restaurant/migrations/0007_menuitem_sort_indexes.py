@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0006_image_metadata'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['category', '-is_featured', 'name', 'id'], name='restaurant__categor_fe02e6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='menuitem',
+            index=models.Index(fields=['-is_featured', 'name', 'id'], name='restaurant__is_feat_64aa1a_idx'),
+        ),
+    ]
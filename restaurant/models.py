@@ -31,10 +31,21 @@ class MenuItem(models.Model):
     category = models.ForeignKey(MenuCategory, related_name='items', on_delete=models.SET_NULL, null=True, blank=True)
     is_featured = models.BooleanField(default=False)
     image = models.ImageField(upload_to="menu_items/", null=True, blank=True)
+    image_width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    image_placeholder = models.TextField(blank=True, editable=False)
     slug = models.SlugField(unique=True, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Sort keys of the menu lists (MENU_ITEM_KEYS in restaurant.views),
+        # within a category and across all of them
+        indexes = [
+            models.Index(fields=["category", "-is_featured", "name", "id"]),
+            models.Index(fields=["-is_featured", "name", "id"]),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.price} LAK"
 
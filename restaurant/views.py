@@ -1,9 +1,13 @@
 from django.shortcuts import render, get_object_or_404
 from .models import MenuItem, MenuCategory
 from django.http import JsonResponse
-from django.core.paginator import Paginator
 from django.db.models import Q
 from django.views.generic import DetailView, ListView
+from home.pagination import CURSOR_PARAM, InvalidCursor, keyset_page, paginate
+
+# Featured items first, then by name; the id keeps the order unique for
+# cursor pagination
+MENU_ITEM_KEYS = ("-is_featured", "name", "id")
 
 
 def restaurant(request):
@@ -72,14 +76,10 @@ def menu_by_category(request, category):
     category_obj = get_object_or_404(MenuCategory, slug__iexact=category)
 
     # Get all items in this category
-    menu_items = MenuItem.objects.filter(category=category_obj).order_by(
-        "-is_featured", "name"
-    )
+    menu_items = MenuItem.objects.filter(category=category_obj).order_by(*MENU_ITEM_KEYS)
 
-    # Pagination
-    paginator = Paginator(menu_items, 12)  # Show 12 items per page
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Pagination, numbered or by cursor
+    page_obj = paginate(request, menu_items, MENU_ITEM_KEYS, 12)  # Show 12 items per page
 
     # Get featured items from this category
     featured_items = menu_items.filter(is_featured=True)[:3]
@@ -117,12 +117,10 @@ def menu_search(request):
         menu_items = menu_items.filter(category=category_filter)
 
     # Order by featured items first, then by name
-    menu_items = menu_items.order_by("-is_featured", "name")
+    menu_items = menu_items.order_by(*MENU_ITEM_KEYS)
 
-    # Pagination
-    paginator = Paginator(menu_items, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Pagination, numbered or by cursor
+    page_obj = paginate(request, menu_items, MENU_ITEM_KEYS, 12)
 
     context = {
         "menu_items": page_obj,
@@ -190,13 +188,23 @@ def get_menu_item_ajax(request, slug):
 def get_category_items_ajax(request, category):
     """
     AJAX endpoint to get items by category
+
+    With a ``cursor`` parameter (empty for the first page) the items come in
+    pages of 12 and the response carries the cursors of the adjacent pages.
     """
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         try:
             category_obj = MenuCategory.objects.get(slug__iexact=category)
             items = MenuItem.objects.filter(category=category_obj).order_by(
-                "-is_featured", "name"
+                *MENU_ITEM_KEYS
             )
+            page = None
+            if CURSOR_PARAM in request.GET:
+                try:
+                    page = keyset_page(items, MENU_ITEM_KEYS, 12, request.GET[CURSOR_PARAM])
+                except InvalidCursor as e:
+                    return JsonResponse({"success": False, "error": str(e)}, status=400)
+                items = page
             data = []
             for item in items:
                 data.append(
@@ -210,6 +218,10 @@ def get_category_items_ajax(request, category):
                         "slug": item.slug,
                     }
                 )
+            if page is not None:
+                return JsonResponse(
+                    {"success": True, "data": data, "pagination": page.page_info()}
+                )
             return JsonResponse({"success": True, "data": data})
         except Exception as e:
             return JsonResponse({"success": False, "error": str(e)})